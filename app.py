@@ -2,9 +2,21 @@ import streamlit as st
 from supabase import create_client, Client
 import pandas as pd 
 import google.generativeai as genai
+import os
 import re
 import time
 import random
+from news_store import fetch_page, cursor_of
+from news_columns import ColumnarNewsStore
+from translation import needs_translation, translate_texts
+from vector_index import VectorIndex, GeminiEmbedder, refresh_from_db
+from token_estimate import estimate_tokens
+from sentiment_agg import load_series
+from render_profile import RerunProfiler
+from card_cache import CardCache
+from rate_limiter import RateLimiter, RetryScheduler, LimitedModel, PRIORITY_CHAT, PRIORITY_TRANSLATION
+from search_index import SearchIndex, refresh_from_db as refresh_search_index, search_db
+from chat_service import ChatService, snapshot_hash, cap_history
 
 # --- 1. 多语言配置 ---
 TRANSLATIONS = {
@@ -20,10 +32,14 @@ TRANSLATIONS = {
         "no_news": "📭 该板块暂无最新消息",
         "original_title": "**原标题**",
         "read_more": "🔗 阅读原文",
+        "also_reported": "📰 同时报道",
+        "load_more": "⬇️ 加载更多",
+        "no_more": "已经到底了",
         "expand_details": "展开详情",
         "latest_count": "最新收录",
         "market_sentiment": "当前市场情绪",
         "sentiment_trend": "情绪走势 (近30条)",
+        "sentiment_trend_daily": "情绪走势 (按日 EWMA, 近90天)",
         "chatbot_title": "🤖 AI 分析师 (Beta)",
         "chatbot_placeholder": "问我关于最近新闻的问题... (例如: 最近加密货币市场怎么样?)",
         "settings_title": "⚙️ 设置",
@@ -39,6 +55,13 @@ TRANSLATIONS = {
         "ai_error": "AI 思考超时或出错: ",
         "user_role": "用户",
         "assistant_role": "AI 助手",
+        "debug_title": "🛠️ 渲染耗时 (ms)",
+        "search_placeholder": "🔍 搜索标题 / 摘要 / 标签...",
+        "search_results": "🔍 找到 {count} 条 ({ms:.1f} ms)",
+        "clear_tag": "✖ #{tag}",
+        "no_results": "没有找到相关新闻",
+        "retrieval_info": "🔎 参考了 {count} 条相关新闻 (检索 {ms:.1f} ms, 约 {tokens} tokens, 首字 {ttft:.0f} ms)",
+        "cached_answer": "⚡ 相同问题的缓存回答 (新闻没有更新)",
         "prompt_template": """
         你是一个基于以下新闻数据的{role_type}助手。请用{language}回答。
         
@@ -62,10 +85,14 @@ TRANSLATIONS = {
         "no_news": "📭 No recent news in this section",
         "original_title": "**Original Title**",
         "read_more": "🔗 Read More",
+        "also_reported": "📰 Also reported by",
+        "load_more": "⬇️ Load more",
+        "no_more": "No more news",
         "expand_details": "Expand Details",
         "latest_count": "Latest News",
         "market_sentiment": "Market Sentiment",
         "sentiment_trend": "Sentiment Trend (Last 30)",
+        "sentiment_trend_daily": "Sentiment Trend (Daily EWMA, 90d)",
         "chatbot_title": "🤖 AI Analyst (Beta)",
         "chatbot_placeholder": "Ask me about recent news... (e.g., How is the crypto market?)",
         "settings_title": "⚙️ Settings",
@@ -81,6 +108,13 @@ TRANSLATIONS = {
         "ai_error": "AI Error: ",
         "user_role": "User",
         "assistant_role": "AI Assistant",
+        "debug_title": "🛠️ Render Timings (ms)",
+        "search_placeholder": "🔍 Search titles / summaries / tags...",
+        "search_results": "🔍 {count} results ({ms:.1f} ms)",
+        "clear_tag": "✖ #{tag}",
+        "no_results": "No matching news",
+        "retrieval_info": "🔎 Used {count} related articles (retrieval {ms:.1f} ms, ~{tokens} tokens, first token {ttft:.0f} ms)",
+        "cached_answer": "⚡ Cached answer for the same question (no new news since)",
         "prompt_template": """
         You are a financial assistant based on the following news data. Please answer in {language}.
         
@@ -94,9 +128,19 @@ TRANSLATIONS = {
     }
 }
 
+# 各板块包含的分类
+FINANCE_CATEGORIES = ["₿ Crypto", "💰 Macro & Market"]
+TECH_CATEGORIES = ["🤖 AI & Tech", "📱 Gadgets & Tech"]
+
 # 页面配置
 st.set_page_config(page_title="AI Financial Intelligence", page_icon="📈", layout="wide")
 
+# 每个会话一个 profiler，记录本次 rerun 各阶段耗时 (调试面板和 benchmarks/bench_app.py 读取)
+if "profiler" not in st.session_state:
+    st.session_state.profiler = RerunProfiler()
+profiler = st.session_state.profiler
+profiler.start()
+
 # --- Sidebar Settings ---
 with st.sidebar:
     st.title("⚙️ Settings")
@@ -144,278 +188,556 @@ with st.sidebar:
     st.write(f"**{t['theme_label']}**")
     st.info(t["theme_info"])
 
-# 从 Secrets 读取 Google Key (记得去 Streamlit 后台添加 GOOGLE_API_KEY)
-try:
+# 从 Secrets 读取配置：只在进程里读一次，rerun 不再重复 configure / 建连接
+@st.cache_resource
+def configure_genai():
+    # 记得去 Streamlit 后台添加 GOOGLE_API_KEY
     genai.configure(api_key=st.secrets["GOOGLE_API_KEY"])
-except:
-    pass # 如果没配 Key，对话功能就用不了，但不影响主程序
+    return True
 
-# 读取 Secrets
 try:
-    SUPABASE_URL = st.secrets["SUPABASE_URL"]
-    SUPABASE_KEY = st.secrets["SUPABASE_KEY"]
-except:
-    st.error("请在 Streamlit Cloud 配置 Secrets")
-    st.stop()
+    configure_genai()
+except Exception:
+    pass # 如果没配 Key，对话功能就用不了，但不影响主程序
 
+# 所有会话共用一个 Gemini 限流器：额度紧张时聊天优先于翻译；聊天是交互式的，重试次数少一些
 @st.cache_resource
-def init_connection():
-    return create_client(SUPABASE_URL, SUPABASE_KEY)
+def get_gemini():
+    limiter = RateLimiter(
+        rpm=int(os.environ.get("GEMINI_RPM", "15")),
+        tpm=int(os.environ.get("GEMINI_TPM", "1000000")),
+    )
+    return RetryScheduler(limiter, max_retries=2, base_delay=1.0, max_delay=8.0)
 
-supabase = init_connection()
+@st.cache_resource
+def init_connection():
+    return create_client(st.secrets["SUPABASE_URL"], st.secrets["SUPABASE_KEY"])
 
-def get_news():
-    try:
-        # 记得获取 tags 和 sentiment_score
-        response = supabase.table("news").select("*").order("created_at", desc=True).limit(30).execute()
-        return response.data
-    except Exception as e:
-        st.error(f"{t['db_error']}{e}")
-        return []
-# 获取数据
-news_list = get_news()
-if not news_list:
-    st.info(t["loading"])
+try:
+    supabase = init_connection()
+except Exception:
+    st.error("请在 Streamlit Cloud 配置 Secrets")
     st.stop()
-# --- UI 逻辑 ---
 
-st.title(f"📈 {t['page_title']}")
+# 每个板块 / Tab 第一屏显示的条数；进程内最多缓存的条数
+FIRST_PAGE = 30
+NEWS_STORE_LIMIT = int(os.environ.get("NEWS_STORE_LIMIT", "5000"))
+
+@st.cache_resource
+def get_news_store():
+    # 整个进程一份列式缓存，所有会话 / 板块 / Tab 共用；60 秒内的 rerun 不查库，过期后只拉新增的行
+    return ColumnarNewsStore(supabase, limit=NEWS_STORE_LIMIT, ttl=60)
 
-# 1. 定义标签页
-# 根据 Section 动态定义 Tabs
-if is_finance:
-    tabs = st.tabs([t["tab_all"], t["tab_crypto"], t["tab_macro"]])
-else:
-    # Tech Mode
-    tabs = st.tabs([t["tab_all"], t["tab_ai"], t["tab_consumer_tech"]])
+def get_news(categories, limit=FIRST_PAGE):
+    """所选分类最新的 limit 条 (按分类的行号数组切片，只把这几十行拼回 dict)"""
+    with profiler.span("fetch"):
+        try:
+            store = get_news_store()
+            store.refresh()
+            return store.latest(tuple(categories), limit)
+        except Exception as e:
+            st.error(f"{t['db_error']}{e}")
+            return []
 
 @st.cache_data(show_spinner=False)
-def translate_text(text, target_lang_code):
+def translate_batch(texts, target_lang_code):
     """
-    使用 Gemini 翻译文本，并缓存结果以提高性能。
+    老数据没有预翻译的列时，把一页需要翻译的摘要打包成一次 Gemini 调用，并缓存结果。
     自动检测源语言：
     - 如果目标是 CN，但文本不包含中文 -> 翻译成中文
     - 如果目标是 EN，但文本包含中文 -> 翻译成英文
     """
-    if not text:
-        return ""
-        
-    # 清理摘要中的多余标题 (翻译前也清理一次，以防万一)
-    # text = re.sub(r"⚡?\s*\*\*?一句话核心.*?\*\*?\s*", "", text, flags=re.IGNORECASE).strip()
-    # text = re.sub(r"核心摘要：?", "", text).strip()
+    pending = [text for text in texts if needs_translation(text, target_lang_code)]
+    if not pending:
+        return list(texts)
+    try:
+        model = LimitedModel(
+            genai.GenerativeModel('gemini-2.0-flash', generation_config={"response_mime_type": "application/json"}),
+            get_gemini(), PRIORITY_TRANSLATION,
+        )
+        translated = dict(zip(pending, translate_texts(model, pending, target_lang_code)))
+    except Exception:
+        return list(texts)
+    return [translated.get(text, text) for text in texts]
+
+def collapse_duplicates(news):
+    """
+    相似新闻只显示代表那一条，其余来源挂在代表下面。
+    返回 (代表列表, {代表 url: [(来源, url), ...]})
+    """
+    related = {}
+    for n in news:
+        if n.get('duplicate_of'):
+            related.setdefault(n['duplicate_of'], []).append((n.get('original_source') or "Web", n.get('url')))
+    shown_urls = {n.get('url') for n in news if not n.get('duplicate_of')}
+    # 代表不在当前列表里 (比如被分到别的 Tab) 时，关联行自己显示
+    visible = [n for n in news if not n.get('duplicate_of') or n['duplicate_of'] not in shown_urls]
+    return visible, related
+
+# 卡片内容按 (新闻 id, 语言, 显示模式) 缓存，所有会话共享
+@st.cache_resource
+def get_card_cache():
+    return CardCache(max_entries=2000)
+
+HIGHLIGHT_STYLE = "background-color: #FFC107; color: black; padding: 2px 6px; border-radius: 4px; font-weight: bold;"
+
+def split_summary(n):
+    """返回 (摘要, 详情, 是否已有当前语言的版本)；优先用入库时预翻译好的列"""
+    title = n.get('title')
+    full_summary = n.get('content_summary')
+    short_summary = title # 默认回退
+    details_text = full_summary
     
-    # 简单的语言检测：检查是否包含中文字符
-    has_chinese = bool(re.search(r'[\u4e00-\u9fff]', text))
+    if full_summary:
+        if "**关键数据:**" in full_summary:
+            parts = full_summary.split("**关键数据:**", 1)
+            short_summary = parts[0].strip()
+            details_text = f"{t['key_stats']} {parts[1].strip()}"
+        elif len(full_summary) > 0:
+            short_summary = full_summary
+            details_text = "" # 如果没有关键数据，详情区暂时为空，或者可以放其他信息
+
+    lang_suffix = lang_code.lower()
+    pre_summary = n.get(f'summary_{lang_suffix}')
+    pre_stats = n.get(f'key_stats_{lang_suffix}')
+    if pre_stats:
+        details_text = f"{t['key_stats']} {pre_stats}"
+    return pre_summary or short_summary, details_text, bool(pre_summary)
+
+def build_card(n, display_summary, details_text):
+    """把一条新闻整理成可以直接输出的字符串，结果进缓存"""
+    created_at = n.get('created_at')
+    date_str = created_at.split('T')[0] if created_at else ""
+    score = n.get('sentiment_score')
+    tags = n.get('tags')
     
-    # 简单的翻译逻辑
-    if target_lang_code == "CN" and not has_chinese:
-        try:
-            model = genai.GenerativeModel('gemini-2.0-flash')
-            response = model.generate_content(f"Translate to Chinese (Simplified): {text}")
-            return response.text.strip()
-        except:
-            return text
-    elif target_lang_code == "EN" and has_chinese:
-        try:
-            model = genai.GenerativeModel('gemini-2.0-flash')
-            response = model.generate_content(f"Translate to English: {text}")
-            return response.text.strip()
-        except:
-            return text
-            
-    return text
+    # 颜色逻辑
+    emoji = "⚪"
+    if score is not None:
+        if score >= 4: emoji = "🟢"
+        elif score <= -4: emoji = "🔴"
+
+    # 避免双重加粗 (如果原文已经包含加粗标记)
+    if not (display_summary.strip().startswith("**") or "**" in display_summary[:10]):
+        display_summary = f"**{display_summary}**"
+
+    # 替换 {{...}} 为 HTML 高亮样式 (橙黄色背景)
+    highlighted_details = ""
+    if details_text:
+        highlighted_details = re.sub(r"\{\{(.*?)\}\}", rf"<span style='{HIGHLIGHT_STYLE}'>\1</span>", details_text)
+
+    return {
+        "id": n.get('id'),
+        "caption": f"{emoji} {date_str}",
+        "summary": display_summary,
+        # 老数据的标签可能重复，按钮 key 不能重复
+        "tags": list(dict.fromkeys(tags)) if tags else [],
+        "original_title": f"{t['original_title']}: [{n.get('title')}]({n.get('url')})",
+        "details": highlighted_details,
+        "url": n.get('url'),
+    }
 
-def render_news_list(news):
+def render_news_list(news, context):
+    """context: 列表所在位置 (搜索结果 / 某个 Tab)，同一张卡片出现在多个列表里时按钮 key 不冲突"""
     if not news:
         st.info(t["no_news"])
         return
 
-    for n in news:
-        title = n.get('title')
-        url = n.get('url')
-        full_summary = n.get('content_summary')
-        created_at = n.get('created_at')
-        date_str = created_at.split('T')[0] if created_at else ""
-        score = n.get('sentiment_score')
-        tags = n.get('tags')
-        
-        # 颜色逻辑
-        emoji = "⚪"
-        if score is not None:
-            if score >= 4: emoji = "🟢"
-            elif score <= -4: emoji = "🔴"
-
-        # 1. 提取摘要和详情
-        short_summary = title # 默认回退
-        details_text = full_summary
+    cache = get_card_cache()
+    view_key = "expanded" if is_expanded else "compact"
+
+    # 1. 已经缓存的卡片直接用；没缓存的才拆分摘要，老数据收集起来一次性批量翻译
+    with profiler.span("filter"):
+        news, related = collapse_duplicates(news)
+        cards = [cache.get((n['id'], lang_code, view_key)) for n in news]
+        pending = [(i, *split_summary(n)) for i, (n, card) in enumerate(zip(news, cards)) if card is None]
+
+    # 2. 翻译摘要 (根据当前语言设置)，只有老数据需要
+    with profiler.span("translate"):
+        legacy_texts = tuple(summary for _, summary, _, ready in pending if not ready)
+        translated = iter(translate_batch(legacy_texts, lang_code)) if legacy_texts else iter(())
+        for i, summary, details_text, ready in pending:
+            card = build_card(news[i], summary if ready else next(translated), details_text)
+            cache.put((news[i]['id'], lang_code, view_key), card)
+            cards[i] = card
+
+    with profiler.span("render"):
+        for card in cards:
+            render_card(card, related, context)
+
+def render_card(card, related, context):
+    url = card["url"]
+    with st.container(border=True):
+        # 第一行：表情 + 日期
+        st.caption(card["caption"])
         
-        if full_summary:
-            if "**关键数据:**" in full_summary:
-                parts = full_summary.split("**关键数据:**", 1)
-                short_summary = parts[0].strip()
-                details_text = f"{t['key_stats']} {parts[1].strip()}"
-            elif len(full_summary) > 0:
-                short_summary = full_summary
-                details_text = "" # 如果没有关键数据，详情区暂时为空，或者可以放其他信息
+        # 主文本：显示翻译后的核心摘要 (替代原来的 Title 位置)
+        st.markdown(card["summary"])
         
-        # 清理摘要中的多余标题 (针对旧数据的特殊处理)
-        # 移除类似 "⚡ **一句话核心 (One-Liner)**" 或 "一句话核心：" 的前缀
-        # short_summary = re.sub(r"⚡?\s*\*\*?一句话核心.*?\*\*?\s*", "", short_summary, flags=re.IGNORECASE).strip()
-        # short_summary = re.sub(r"核心摘要：?", "", short_summary).strip()
-
-        # 2. 翻译摘要 (根据当前语言设置)
-        display_summary = translate_text(short_summary, lang_code)
+        # 标签：点击按标签筛选
+        if card["tags"]:
+            with tag_row():
+                for tag in card["tags"]:
+                    st.button(f"#{tag}", key=f"tag_{context}_{card['id']}_{tag}", on_click=set_search_tag,
+                              args=(tag,), type="tertiary")
         
-        # 3. 处理标签
-        tags_str = ""
-        if tags:
-            tags_str = " ".join([f"#{tag}" for tag in tags])
-
-        # 4. 渲染卡片
-        with st.container(border=True):
-            # 第一行：表情 + 日期
-            st.caption(f"{emoji} {date_str}")
+        # 详情折叠区
+        with st.expander(t["expand_details"], expanded=is_expanded):
+            # 里面显示原标题 (带链接)
+            st.markdown(card["original_title"])
             
-            # 主文本：显示翻译后的核心摘要 (替代原来的 Title 位置)
-            # 避免双重加粗 (如果原文已经包含加粗标记)
-            if display_summary.strip().startswith("**") or "**" in display_summary[:10]:
-                 st.markdown(display_summary)
-            else:
-                 st.markdown(f"**{display_summary}**")
+            # 渲染 Key Stats (支持高亮)
+            if card["details"]:
+                st.markdown(card["details"], unsafe_allow_html=True)
             
-            # 标签
-            if tags_str:
-                st.markdown(f"`{tags_str}`")
+            # 同一事件的其他来源
+            if related.get(url):
+                links = " · ".join(f"[{source}]({link})" for source, link in related[url])
+                st.caption(f"{t['also_reported']}: {links}")
             
-            # 详情折叠区
-            with st.expander(t["expand_details"], expanded=is_expanded):
-                # 里面显示原标题 (带链接)
-                st.markdown(f"{t['original_title']}: [{title}]({url})")
-                
-                # 渲染 Key Stats (支持高亮)
-                if details_text:
-                    # 替换 {{...}} 为 HTML 高亮样式 (橙黄色背景)
-                    highlighted_details = re.sub(
-                        r"\{\{(.*?)\}\}", 
-                        r"<span style='background-color: #FFC107; color: black; padding: 2px 6px; border-radius: 4px; font-weight: bold;'>\1</span>", 
-                        details_text
-                    )
-                    st.markdown(highlighted_details, unsafe_allow_html=True)
-                
-                st.link_button(t["read_more"], url)
-
-# 2. 在不同的 Tab 里筛选并显示数据
-# 逻辑拆分
-if is_finance:
-    with tabs[0]: # All Finance
-        # Filter for all finance related categories
-        finance_cats = ["₿ Crypto", "💰 Macro & Market"]
-        finance_news = [n for n in news_list if n.get('category') in finance_cats]
-        render_news_list(finance_news)
-        
-    with tabs[1]: # Crypto
-        crypto_news = [n for n in news_list if n.get('category') == "₿ Crypto"]
-        render_news_list(crypto_news)
-        
-    with tabs[2]: # Macro
-        macro_news = [n for n in news_list if n.get('category') == "💰 Macro & Market"]
-        render_news_list(macro_news)
-
-else: # Tech Mode
-    with tabs[0]: # All Tech
-        tech_cats = ["🤖 AI & Tech", "📱 Gadgets & Tech"]
-        tech_news = [n for n in news_list if n.get('category') in tech_cats]
-        render_news_list(tech_news)
-        
-    with tabs[1]: # AI
-        ai_news = [n for n in news_list if n.get('category') == "🤖 AI & Tech"]
-        render_news_list(ai_news)
-        
-    with tabs[2]: # Consumer Tech
-        consumer_news = [n for n in news_list if n.get('category') == "📱 Gadgets & Tech"]
-        render_news_list(consumer_news)
+            st.link_button(t["read_more"], url)
+
+def tag_row():
+    try:
+        return st.container(horizontal=True)
+    except TypeError:
+        # 老版本 Streamlit 没有横向容器，标签竖着排
+        return st.container()
+
+# --- 搜索: 标题 / 摘要 / 标签倒排索引，所有会话共享，定期增量加载新入库的行 ---
+# SEARCH_BACKEND=postgres 时改用数据库全文索引 (migrations/006_news_search.sql)
+SEARCH_BACKEND = os.environ.get("SEARCH_BACKEND", "local")
+SEARCH_LIMIT = 50
+
+if "search_tag" not in st.session_state:
+    st.session_state.search_tag = None
+
+def set_search_tag(tag):
+    st.session_state.search_tag = tag
+
+@st.cache_resource
+def get_search_index():
+    return SearchIndex()
+
+def search_news(query, tag):
+    """返回 (结果行, 耗时 ms)；数据库全文检索不可用时退回本地索引"""
+    started = time.perf_counter()
+    if SEARCH_BACKEND == "postgres":
+        try:
+            results = search_db(supabase, query, section_categories, tag, SEARCH_LIMIT)
+            return [row for _, row in results], (time.perf_counter() - started) * 1000
+        except Exception as e:
+            print(f"⚠️ 数据库搜索失败，使用本地索引: {e}")
+    index = get_search_index()
+    try:
+        refresh_search_index(index, supabase)
+    except Exception as e:
+        # 加载失败时用已经建好的索引继续搜
+        print(f"⚠️ 搜索索引更新失败: {e}")
+    results = index.search(query, categories=section_categories, tag=tag, limit=SEARCH_LIMIT)
+    return [row for _, row in results], index.last_search_ms
+
+def render_search():
+    """搜索框 + 当前标签筛选；有搜索条件时显示结果并返回 True，否则返回 False 照常显示 Tabs"""
+    query = st.text_input(t["search_placeholder"], key="search_query", label_visibility="collapsed",
+                          placeholder=t["search_placeholder"]).strip()
+    tag = st.session_state.search_tag
+    if tag:
+        st.button(t["clear_tag"].format(tag=tag), key="clear_tag", on_click=set_search_tag, args=(None,))
+    if not query and not tag:
+        return False
+
+    with profiler.span("search"):
+        rows, search_ms = search_news(query, tag)
+    st.caption(t["search_results"].format(count=len(rows), ms=search_ms))
+    if rows:
+        render_news_list(rows, "search")
+    else:
+        st.info(t["no_results"])
+    return True
+
+# 每个 Tab 从共享的列式缓存里切片；“加载更多”先在缓存里多切一页，缓存翻完了再用游标往数据库里翻
+PAGE_SIZE = 20
+
+if "pages" not in st.session_state:
+    st.session_state.pages = {}
+
+def new_page():
+    return {"limit": FIRST_PAGE, "rows": [], "cursor": None, "done": False}
+
+def load_more(categories):
+    page = st.session_state.pages.setdefault(categories, new_page())
+    store = get_news_store()
+    if page["limit"] < store.count(categories):
+        page["limit"] += PAGE_SIZE
+        return
+    # 还没往数据库翻过时，从缓存里最旧的一条接着往后翻
+    cursor = page["cursor"] or cursor_of(store.latest(categories, page["limit"]))
+    try:
+        rows, cursor = fetch_page(supabase, categories, cursor, PAGE_SIZE)
+    except Exception as e:
+        st.error(f"{t['db_error']}{e}")
+        return
+    known = {r["id"] for r in page["rows"]}
+    page["rows"].extend(r for r in rows if r["id"] not in known)
+    page["cursor"] = cursor
+    page["done"] = cursor is None
+
+def render_tab(categories):
+    categories = tuple(categories)
+    page = st.session_state.pages.setdefault(categories, new_page())
+    if categories == tuple(section_categories) and page["limit"] == FIRST_PAGE:
+        cached = news_list
+    else:
+        cached = get_news(categories, page["limit"])
+
+    shown = {n["id"] for n in cached}
+    rows = list(cached) + [n for n in page["rows"] if n["id"] not in shown]
+    render_news_list(rows, '|'.join(categories))
+
+    if page["done"] or not rows:
+        st.caption(t["no_more"])
+    else:
+        st.button(t["load_more"], key=f"more_{'|'.join(categories)}", on_click=load_more, args=(categories,))
+
+def open_tabs(labels, key):
+    """
+    只运行当前选中 Tab 的内容 (切换 Tab 触发 rerun)，渲染量只跟可见的卡片有关。
+    返回 [(tab, 是否选中), ...]；老版本 Streamlit 不支持懒加载时所有 Tab 都当作选中。
+    """
+    try:
+        tabs = st.tabs(labels, key=key, on_change="rerun")
+    except TypeError:
+        return [(tab, True) for tab in st.tabs(labels)]
+    return [(tab, tab.open) for tab in tabs]
+
+def render_tabs():
+    # 根据 Section 动态定义 Tabs
+    if is_finance:
+        labels = [t["tab_all"], t["tab_crypto"], t["tab_macro"]]
+        groups = [
+            FINANCE_CATEGORIES, # All Finance
+            ["₿ Crypto"],
+            ["💰 Macro & Market"],
+        ]
+    else: # Tech Mode
+        labels = [t["tab_all"], t["tab_ai"], t["tab_consumer_tech"]]
+        groups = [
+            TECH_CATEGORIES, # All Tech
+            ["🤖 AI & Tech"],
+            ["📱 Gadgets & Tech"],
+        ]
+
+    # 语言切换后标签文字变了，key 里带上板块和语言
+    for (tab, active), categories in zip(open_tabs(labels, key=f"tabs_{int(is_finance)}_{lang_code}"), groups):
+        if active:
+            with tab:
+                render_tab(categories)
 
 
 # --- 新增功能 1: 市场情绪看板 ---
 
-news_list = get_news() # 获取最新的30-50条数据
+@st.cache_data(ttl=300, show_spinner=False)
+def get_sentiment_series(categories):
+    """读取 news_cloud 预先聚合好的按日情绪统计 (几百个点)，聚合表不可用时返回空"""
+    try:
+        return load_series(supabase, categories, granularity="day", days=90)
+    except Exception:
+        return []
 
-if news_list:
-    # 1. 将数据转换为 Pandas DataFrame (表格处理神器)
-    df = pd.DataFrame(news_list)
-    
-    # 2. 处理时间格式
-    df['created_at'] = pd.to_datetime(df['created_at'])
-    df['date'] = df['created_at'].dt.date # 只取日期
-    
-    # 3. 处理分数 (有些旧数据是 None，填充为 0)
-    df['sentiment_score'] = df['sentiment_score'].fillna(0)
+def render_dashboard():
+    # 复用上面已经取到的数据，不再重复查库
+    series = get_sentiment_series(tuple(section_categories))
+    if series:
+        # 1. 优先用聚合表：按分类画每日 EWMA，情绪均值取最近一天 (按条数加权)
+        agg = pd.DataFrame(series)
+        agg['bucket_start'] = pd.to_datetime(agg['bucket_start'])
+        latest = agg[agg['bucket_start'] == agg['bucket_start'].max()]
+        avg_score = (latest['mean'] * latest['count']).sum() / max(latest['count'].sum(), 1)
+        trend_label = t["sentiment_trend_daily"]
+        trend_data = agg.pivot_table(index='bucket_start', columns='category', values='ewma')
+    else:
+        # 2. 聚合表还没数据时，退回用列式缓存最近 30 条现算 (没有分数的旧数据不计入)
+        stats = get_news_store().sentiment_stats(tuple(section_categories), last=30)
+        avg_score = stats["mean"]
+        trend_label = t["sentiment_trend"]
+        trend_data = pd.DataFrame(
+            {"sentiment_score": stats["scores"]},
+            index=pd.to_datetime(stats["timestamps"], utc=True),
+        )
     
-    # 4. 界面布局：上图下文
+    # 3. 界面布局：上图下文
     col1, col2, col3 = st.columns(3)
     with col1:
-        st.metric(t["latest_count"], f"{len(df)}")
+        st.metric(t["latest_count"], f"{len(news_list)}")
     with col2:
-        # 计算平均情绪
-        avg_score = df['sentiment_score'].mean()
+        # 平均情绪
         delta_color = "normal"
         if avg_score > 2: delta_color = "inverse" # 绿色
         elif avg_score < -2: delta_color = "off" # 红色
         st.metric(t["market_sentiment"], f"{avg_score:.1f}", delta=f"{avg_score:.1f}", delta_color=delta_color)
     with col3:
-        st.write(t["sentiment_trend"])
+        st.write(trend_label)
         # 画一个简单折线图
-        st.line_chart(df[['created_at', 'sentiment_score']].set_index('created_at'), height=100)
+        st.line_chart(trend_data, height=100)
 
     st.divider()
-    # ... (新闻列表渲染完毕后) ...
 
-st.divider()
-st.header(t["chatbot_title"])
 
-# 初始化聊天记录
-if "messages" not in st.session_state:
-    st.session_state.messages = []
+# --- 新增功能 2: AI 分析师 ---
+
+# 检索增强：所有会话共享一个内存向量索引，增量加载带 embedding 的新闻
+CHAT_TOP_K = 8
+CHAT_CONTEXT_TOKENS = 3000
+# 每个会话最多保留的聊天记录条数 (问 + 答各算一条)，历史太长会拖慢每次 rerun 的重绘
+CHAT_HISTORY_MAX = 20
 
-# 显示历史聊天记录
-for message in st.session_state.messages:
-    with st.chat_message(message["role"]):
-        st.markdown(message["content"])
+@st.cache_resource
+def get_vector_index():
+    return VectorIndex()
+
+@st.cache_resource
+def get_chat_service():
+    return ChatService()
 
-# 接收用户输入
-if prompt := st.chat_input(t["chatbot_placeholder"]):
-    # 1. 显示用户问题
-    st.chat_message("user").markdown(prompt)
-    st.session_state.messages.append({"role": "user", "content": prompt})
+@st.cache_resource
+def get_chat_model():
+    # 模型对象所有会话共用，不再每个问题新建一个
+    return LimitedModel(genai.GenerativeModel('gemini-2.0-flash'), get_gemini(), PRIORITY_CHAT)
+
+CHAT_FALLBACK_ROWS = 10
 
-    # 2. 准备上下文 (把最近的 10 条新闻标题和摘要拼起来)
-    # 这里的 news_list 是我们之前从数据库查出来的
-    context_text = ""
-    for n in news_list[:10]: # 只给AI看最近10条，省流量
-        context_text += f"- {n['created_at']}: {n['title']} (Summary: {n['content_summary']})\n"
+def context_snapshot():
+    """
+    回答缓存 key 里的新闻快照：先增量加载向量索引，再取索引的条数 + 最新一条的时间。
+    检索是在全部分类的索引上做的，任何分类有新闻入库都会让旧回答失效；索引为空时按退回用的最近几条算。
+    """
+    index = get_vector_index()
+    try:
+        refresh_from_db(index, supabase)
+    except Exception as e:
+        print(f"⚠️ 向量索引更新失败: {e}")
+    if len(index):
+        return f"index:{len(index)}:{index.latest_created_at}"
+    return snapshot_hash(news_list[:CHAT_FALLBACK_ROWS])
 
-    # 3. 调用 Gemini 回答
+def retrieve_context(question):
+    """
+    按问题检索最相关的新闻 (索引已由 context_snapshot 加载)；索引为空或检索失败时退回最近 10 条。
+    返回 (新闻列表, 检索耗时 ms)
+    """
+    index = get_vector_index()
+    rows = []
     try:
-        model = genai.GenerativeModel('gemini-2.0-flash')
-        
-        # 核心 Prompt (Inject Language)
-        language_name = "Chinese" if lang_code == "CN" else "English"
-        role_type = "金融" if is_finance else "科技" # Default to Finance/Tech
-        if lang_code == "EN":
-             role_type = "Financial" if is_finance else "Technology"
-        
-        full_prompt = t["prompt_template"].format(
-            role_type=role_type,
-            language=language_name,
-            context_text=context_text,
-            prompt=prompt
-        )
-        
-        with st.chat_message("assistant"):
-            stream = model.generate_content(full_prompt, stream=True)
-            response = st.write_stream(stream)
-            
-        st.session_state.messages.append({"role": "assistant", "content": response})
-        
+        query_vector = get_gemini().call(
+            GeminiEmbedder(genai), [question], task_type="retrieval_query",
+            tokens=estimate_tokens(question), priority=PRIORITY_CHAT,
+        )[0]
+        rows = [row for _, row in index.search(query_vector, k=CHAT_TOP_K)]
     except Exception as e:
-        st.error(f"{t['ai_error']}{e}")
\ No newline at end of file
+        print(f"⚠️ 向量检索失败，使用最近新闻: {e}")
+    if not rows:
+        rows = news_list[:CHAT_FALLBACK_ROWS] # 只给AI看最近10条，省流量
+    return rows, index.last_search_ms
+
+def render_chat():
+    st.divider()
+    st.header(t["chatbot_title"])
+
+    # 初始化聊天记录
+    if "messages" not in st.session_state:
+        st.session_state.messages = []
+
+    # 显示历史聊天记录
+    for message in st.session_state.messages:
+        with st.chat_message(message["role"]):
+            st.markdown(message["content"])
+
+    # 接收用户输入
+    if prompt := st.chat_input(t["chatbot_placeholder"]):
+        # 1. 显示用户问题
+        st.chat_message("user").markdown(prompt)
+        st.session_state.messages.append({"role": "user", "content": prompt})
+
+        # 2. 同一批新闻下问过的问题直接用缓存的回答 (板块只决定分析师角色，见下面的 prompt)
+        chat = get_chat_service()
+        snapshot = context_snapshot()
+        key = chat.answer_key(prompt, lang_code, int(is_finance), snapshot)
+        cached = chat.cached_answer(key)
+        if cached:
+            with st.chat_message("assistant"):
+                st.markdown(cached["text"])
+                st.caption(t["cached_answer"])
+            st.session_state.messages.append({"role": "assistant", "content": cached["text"]})
+            st.session_state.messages = cap_history(st.session_state.messages, CHAT_HISTORY_MAX)
+            return
+
+        # 3. 准备上下文 (按问题检索相关新闻，控制在 token 预算内；同一组新闻的上下文复用)
+        with profiler.span("chat_context"):
+            rows, retrieval_ms = retrieve_context(prompt)
+            context_text, context_tokens = chat.prepare_context(snapshot, rows, CHAT_CONTEXT_TOKENS)
+
+        # 4. 调用 Gemini 流式回答
+        try:
+            # 核心 Prompt (Inject Language)
+            language_name = "Chinese" if lang_code == "CN" else "English"
+            role_type = "金融" if is_finance else "科技" # Default to Finance/Tech
+            if lang_code == "EN":
+                 role_type = "Financial" if is_finance else "Technology"
+            
+            full_prompt = t["prompt_template"].format(
+                role_type=role_type,
+                language=language_name,
+                context_text=context_text,
+                prompt=prompt
+            )
+            
+            metrics = {}
+            with st.chat_message("assistant"):
+                response = st.write_stream(chat.stream(key, get_chat_model(), full_prompt, metrics))
+                st.caption(t["retrieval_info"].format(
+                    count=len(rows), ms=retrieval_ms, tokens=context_tokens, ttft=metrics.get("ttft_ms", 0.0)))
+                
+            st.session_state.messages.append({"role": "assistant", "content": response})
+            
+        except Exception as e:
+            st.error(f"{t['ai_error']}{e}")
+        st.session_state.messages = cap_history(st.session_state.messages, CHAT_HISTORY_MAX)
+
+
+# --- 调试面板: 各阶段渲染耗时 ---
+# URL 带 ?debug=1 或设置环境变量 APP_PROFILE=1 时显示在侧边栏
+
+def render_debug_panel():
+    summary = profiler.summary()
+    if not summary:
+        return
+    with st.sidebar:
+        st.divider()
+        with st.expander(t["debug_title"], expanded=True):
+            table = pd.DataFrame(summary).T[["last", "p50", "p95", "runs"]]
+            st.dataframe(table.round(1))
+            st.caption(f"card cache: {get_card_cache().stats()}")
+            st.caption(f"news store: {get_news_store().stats()}")
+            st.caption(f"chat: {get_chat_service().stats()}")
+
+
+# --- 页面流程 ---
+try:
+    # 获取数据 (分类直接下推到数据库，整页只取这一次)
+    section_categories = FINANCE_CATEGORIES if is_finance else TECH_CATEGORIES
+    news_list = get_news(section_categories)
+    if not news_list:
+        st.info(t["loading"])
+        st.stop()
+
+    st.title(f"📈 {t['page_title']}")
+    if not render_search():
+        render_tabs()
+    with profiler.span("dashboard"):
+        render_dashboard()
+    render_chat()
+finally:
+    profiler.finish()
+    if os.environ.get("APP_PROFILE") == "1" or st.query_params.get("debug") == "1":
+        render_debug_panel()
@@ -0,0 +1,160 @@
+import re
+import time
+from lxml import etree
+from requests.structures import CaseInsensitiveDict
+from batch_summarizer import MAX_CONTENT_CHARS
+
+# ================= 流式正文抽取 =================
+# 边下载边用 lxml 的 HTMLPullParser 解析：只收集正文段落，处理完的节点立即清掉，
+# 攒够给 AI 用的字数 (MAX_CONTENT_CHARS) 就停止，剩下的网页不再下载也不再解析。
+# 抽不出东西 (比如纯 JS 页面) 时由调用方退回 newspaper 全量解析。
+
+BODY_TAGS = {"p", "h2", "h3", "h4", "li", "blockquote", "pre"}
+SKIP_TAGS = {"script", "style", "noscript", "nav", "header", "footer", "aside", "form", "svg", "iframe", "button", "select"}
+ARTICLE_TAGS = {"article", "main"}
+# 这些节点结束时才取文本，里面的行内节点 (a / span / em ...) 要等它们结束后再清理
+TEXT_TAGS = BODY_TAGS | {"h1", "title"}
+MIN_BLOCK_CHARS = 25
+MAX_LINK_DENSITY = 0.5
+
+
+def _clean(text):
+    return " ".join((text or "").split())
+
+
+def _charset(headers):
+    content_type = CaseInsensitiveDict(headers or {}).get("Content-Type", "")
+    match = re.search(r"charset=([\w-]+)", content_type)
+    return match.group(1) if match else None
+
+
+class StreamingExtractor:
+    """
+    feed(chunk, headers) 每读到一块数据调用一次，返回 True 表示正文已经够了，可以断开下载。
+    优先使用 <article> / <main> / itemprop=articleBody 里的段落，没有时用整页通过过滤的段落。
+    """
+
+    def __init__(self, max_chars=MAX_CONTENT_CHARS):
+        self.max_chars = max_chars
+        self.parser = None
+        self.skip_depth = 0
+        self.text_depth = 0
+        self.article_depth = 0
+        self.blocks = {"article": [], "page": []}
+        self.chars = {"article": 0, "page": 0}
+        self.titles = {}
+        self.parse_seconds = 0.0
+        self.done = False
+
+    def feed(self, chunk, headers=None):
+        if self.done:
+            return True
+        started = time.perf_counter()
+        if self.parser is None:
+            self.parser = etree.HTMLPullParser(events=("start", "end"), encoding=_charset(headers))
+        self.parser.feed(chunk)
+        self._consume()
+        self.parse_seconds += time.perf_counter() - started
+        return self.done
+
+    def close(self):
+        """下载结束 (没有提前停止) 时调用，处理最后残留的事件"""
+        if self.parser is not None and not self.done:
+            started = time.perf_counter()
+            try:
+                self.parser.close()
+            except etree.XMLSyntaxError:
+                pass
+            self._consume()
+            self.parse_seconds += time.perf_counter() - started
+
+    def _is_article(self, element):
+        return element.tag in ARTICLE_TAGS or element.get("itemprop") == "articleBody"
+
+    def _consume(self):
+        for event, element in self.parser.read_events():
+            tag = element.tag if isinstance(element.tag, str) else ""
+            if event == "start":
+                if tag in SKIP_TAGS:
+                    self.skip_depth += 1
+                if tag in TEXT_TAGS:
+                    self.text_depth += 1
+                if self._is_article(element):
+                    self.article_depth += 1
+                if tag == "meta" and element.get("property") == "og:title":
+                    self.titles.setdefault("og", _clean(element.get("content")))
+                continue
+
+            if tag in TEXT_TAGS:
+                self.text_depth -= 1
+            if tag in SKIP_TAGS:
+                self.skip_depth -= 1
+            elif not self.skip_depth:
+                if tag == "title":
+                    self.titles.setdefault("title", _clean(element.text))
+                elif tag == "h1":
+                    self.titles.setdefault("h1", _clean("".join(element.itertext())))
+                elif tag in BODY_TAGS:
+                    self._add_block(element)
+            if self._is_article(element):
+                self.article_depth -= 1
+
+            # 处理完的节点清掉，并删掉已经处理过的兄弟节点，树的大小不随网页长度增长
+            if not self.text_depth:
+                element.clear(keep_tail=True)
+                parent = element.getparent()
+                if parent is not None:
+                    while element.getprevious() is not None:
+                        del parent[0]
+
+            if self.chars["article"] >= self.max_chars or (
+                    not self.blocks["article"] and self.chars["page"] >= self.max_chars * 2):
+                self.done = True
+                return
+
+    def _add_block(self, element):
+        text = _clean("".join(element.itertext()))
+        if len(text) < MIN_BLOCK_CHARS:
+            return
+        link_chars = sum(len(_clean("".join(a.itertext()))) for a in element.iter("a"))
+        if link_chars / len(text) > MAX_LINK_DENSITY:
+            return
+        scope = "article" if self.article_depth else "page"
+        self.blocks[scope].append(text)
+        self.chars[scope] += len(text) + 2
+
+    @property
+    def title(self):
+        return self.titles.get("og") or self.titles.get("h1") or self.titles.get("title")
+
+    @property
+    def text(self):
+        blocks = self.blocks["article"] or self.blocks["page"]
+        return "\n\n".join(blocks)[:self.max_chars]
+
+
+class ExtractResult:
+
+    def __init__(self, title, text, bytes_read, parse_ms, stopped_early, truncated):
+        self.title = title
+        self.text = text
+        self.bytes_read = bytes_read
+        self.parse_ms = parse_ms
+        self.stopped_early = stopped_early
+        self.truncated = truncated
+
+
+def extract_streaming(fetcher, url, max_chars=MAX_CONTENT_CHARS, max_bytes=None):
+    """下载并抽取正文，返回 ExtractResult (包含读取字节数和解析耗时)"""
+    extractor = StreamingExtractor(max_chars)
+    result = fetcher.stream(url, extractor.feed, max_bytes=max_bytes)
+    if not result.stopped_early:
+        extractor.close()
+    return ExtractResult(
+        extractor.title,
+        extractor.text,
+        result.bytes_read,
+        extractor.parse_seconds * 1000,
+        result.stopped_early,
+        result.truncated,
+    )
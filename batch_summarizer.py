@@ -0,0 +1,202 @@
+import re
+import json
+import threading
+from summary_cache import make_cache_key
+
+# ================= 批量 AI 摘要 =================
+# 多篇新闻打包成一次 generate_content 调用，要求返回以 id 为键的 JSON 数组，
+# 逐条按 summary / key_stats / sentiment_score / tags 结构校验，不合格的单篇重试。
+# model 只要有 generate_content(prompt) 并返回带 .text 的对象即可，方便用假模型测试。
+
+# 每篇正文截取的字符数，防止 Token 溢出
+MAX_CONTENT_CHARS = 6000
+
+
+def clean_json_text(text):
+    """清理 AI 可能返回的 Markdown 格式符号，提取纯 JSON"""
+    text = re.sub(r'```json\s*', '', text)
+    text = re.sub(r'```\s*', '', text)
+    return text.strip()
+
+
+def validate_summary(data):
+    """校验单条结果，能修正的就修正 (数字字符串、列表形式的 key_stats)，不合格返回 None"""
+    if not isinstance(data, dict):
+        return None
+
+    summary = data.get("summary")
+    if not isinstance(summary, str) or not summary.strip():
+        return None
+
+    key_stats = data.get("key_stats", "")
+    if isinstance(key_stats, list):
+        key_stats = "\n".join(str(item) for item in key_stats)
+    if not isinstance(key_stats, str):
+        return None
+
+    try:
+        score = int(round(float(data.get("sentiment_score"))))
+    except (TypeError, ValueError):
+        return None
+    score = max(-10, min(10, score))
+
+    tags = data.get("tags", [])
+    if isinstance(tags, str):
+        tags = [tag.strip() for tag in re.split(r"[,，]", tags) if tag.strip()]
+    if not isinstance(tags, list):
+        return None
+    # 去掉重复的标签 (保持顺序)，前端按标签生成按钮
+    tags = list(dict.fromkeys(str(tag).strip() for tag in tags if str(tag).strip()))
+
+    return {
+        "summary": summary.strip(),
+        "key_stats": key_stats.strip(),
+        "sentiment_score": score,
+        "tags": tags,
+    }
+
+
+def build_single_prompt(title, content):
+    return f"新闻标题：{title}\n\n内容：{content[:MAX_CONTENT_CHARS]}"
+
+
+def build_batch_prompt(articles):
+    parts = []
+    for article in articles:
+        parts.append(
+            f"=== 新闻 id: {article['id']} ===\n"
+            f"新闻标题：{article['title']}\n\n"
+            f"内容：{article['content'][:MAX_CONTENT_CHARS]}"
+        )
+    return "\n\n".join(parts)
+
+
+class BatchSummarizer:
+    """
+    batch_model: 使用批量 system prompt 的模型 (返回 JSON 数组)
+    single_model: 使用单篇 system prompt 的模型 (返回 JSON 对象)，用于校验失败后的单篇重试
+    cache: 可选的 SummaryCache，cache_scope = (模型名, system prompt) 参与缓存 key 计算
+    """
+
+    def __init__(self, batch_model, single_model, batch_size=5, cache=None, cache_scope=("", "")):
+        self.batch_model = batch_model
+        self.single_model = single_model
+        self.batch_size = batch_size
+        self.cache = cache
+        self.cache_scope = cache_scope
+        self.stats = {"api_calls": 0, "batch_calls": 0, "fallbacks": 0, "failed": 0, "api_errors": 0, "json_errors": 0}
+        # 流水线里多个批次会在不同线程同时调用
+        self.lock = threading.Lock()
+
+    def _count(self, key, n=1):
+        with self.lock:
+            self.stats[key] += n
+
+    def _cache_key(self, title, content):
+        model_name, system_prompt = self.cache_scope
+        return make_cache_key(model_name, system_prompt, title, content, MAX_CONTENT_CHARS)
+
+    def _cache_get(self, title, content):
+        if self.cache is None:
+            return None
+        return self.cache.get(self._cache_key(title, content))
+
+    def _cache_put(self, title, content, data):
+        if self.cache is not None and data is not None:
+            self.cache.put(self._cache_key(title, content), data)
+
+    def summarize_one(self, title, content):
+        cached = self._cache_get(title, content)
+        if cached is not None:
+            return cached
+        data = self._call_single(title, content)
+        self._cache_put(title, content, data)
+        return data
+
+    def _call_single(self, title, content):
+        self._count("api_calls")
+        try:
+            response = self.single_model.generate_content(build_single_prompt(title, content))
+        except Exception as e:
+            self._count("api_errors")
+            print(f"❌ AI 调用失败: {e}")
+            return None
+        try:
+            data = json.loads(clean_json_text(response.text))
+        except ValueError as e:
+            self._count("json_errors")
+            print(f"❌ JSON 解析失败: {e}")
+            return None
+        if isinstance(data, list) and len(data) == 1:
+            data = data[0]
+        return validate_summary(data)
+
+    def _summarize_batch(self, articles):
+        self._count("api_calls")
+        self._count("batch_calls")
+        try:
+            response = self.batch_model.generate_content(build_batch_prompt(articles))
+        except Exception as e:
+            self._count("api_errors")
+            print(f"❌ 批量 AI 调用失败，改为逐篇: {e}")
+            return {}
+        try:
+            items = json.loads(clean_json_text(response.text))
+        except ValueError as e:
+            self._count("json_errors")
+            print(f"❌ 批量 JSON 解析失败，改为逐篇: {e}")
+            return {}
+        if isinstance(items, dict):
+            # 有时模型会返回 {"id": {...}} 形式
+            items = [dict(value, id=key) for key, value in items.items() if isinstance(value, dict)]
+        if not isinstance(items, list):
+            return {}
+
+        results = {}
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            data = validate_summary(item)
+            if data is not None:
+                results[str(item.get("id"))] = data
+        return results
+
+    def summarize_many(self, articles):
+        """
+        articles: [{"id", "title", "content"}, ...]
+        返回与输入对齐的列表，失败的位置为 None
+        """
+        results = {}
+        pending = []
+        for article in articles:
+            cached = self._cache_get(article["title"], article["content"])
+            if cached is not None:
+                results[str(article["id"])] = cached
+            else:
+                pending.append(article)
+
+        batched = set()
+        for i in range(0, len(pending), self.batch_size):
+            chunk = pending[i:i + self.batch_size]
+            if len(chunk) == 1:
+                # 只剩一篇就直接走单篇
+                continue
+            batched.update(str(article["id"]) for article in chunk)
+            fresh = self._summarize_batch(chunk)
+            for article in chunk:
+                self._cache_put(article["title"], article["content"], fresh.get(str(article["id"])))
+            results.update(fresh)
+
+        output = []
+        for article in articles:
+            key = str(article["id"])
+            data = results.get(key)
+            if data is None:
+                if key in batched:
+                    self._count("fallbacks")
+                data = self._call_single(article["title"], article["content"])
+                self._cache_put(article["title"], article["content"], data)
+            if data is None:
+                self._count("failed")
+            output.append(data)
+        return output
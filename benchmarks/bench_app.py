@@ -0,0 +1,192 @@
+"""
+用 Streamlit AppTest 无界面驱动 app.py，测每次 rerun 的耗时和各阶段 (fetch / filter / translate / render / dashboard / chat_context) 分解。
+
+    python benchmarks/bench_app.py
+    python benchmarks/bench_app.py --rows 500 --repeat 10 --legacy-ratio 0.5 --json app_results.json
+
+后端全部是 benchmarks/fakes.py 里的假服务：内存 Supabase 预先灌好新闻和情绪聚合，假 Gemini 负责翻译和聊天。
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+from datetime import datetime, timedelta, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fakes import FakeGenerativeModel, InMemorySupabase, fake_embed_content
+
+# ================= 把外部服务换成假的 =================
+# AppTest 在本进程里执行脚本，所以直接替换模块属性即可
+import supabase
+import google.generativeai as genai
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+from ingest_engine import percentile
+from vector_index import HashingEmbedder, embedding_text
+from sentiment_agg import update_sentiment_aggregates
+
+_db = {"client": None}
+supabase.create_client = lambda url, key, *args, **kwargs: _db["client"]
+genai.configure = lambda *args, **kwargs: None
+genai.GenerativeModel = FakeGenerativeModel
+genai.embed_content = fake_embed_content
+
+CATEGORIES = ["₿ Crypto", "💰 Macro & Market", "🤖 AI & Tech", "📱 Gadgets & Tech"]
+APP_PATH = os.path.join(ROOT, "app.py")
+
+
+def seed_database(rows, legacy_ratio=0.3, duplicate_ratio=0.1, seed=7):
+    """灌入 rows 条新闻：legacy_ratio 的老数据没有预翻译列，duplicate_ratio 的是相似新闻关联行"""
+    rng = random.Random(seed)
+    db = InMemorySupabase()
+    now = datetime.now(timezone.utc)
+    embed = HashingEmbedder()
+    news = []
+    for i in range(rows):
+        category = CATEGORIES[i % len(CATEGORIES)]
+        summary = f"Story {i} about {category} moves {rng.randint(1, 30)}%"
+        key_stats = f"Revenue up {{{{{rng.randint(1, 50)}%}}}}\nShares at {{{{${rng.randint(10, 500)}}}}}"
+        legacy = rng.random() < legacy_ratio
+        row = {
+            "title": f"Headline {i}",
+            "url": f"https://example.com/{i}",
+            "content_summary": f"{summary}\n\n**关键数据:**\n{key_stats}",
+            "original_source": rng.choice(["CNBC", "CoinDesk", "TechCrunch", "The Verge"]),
+            "sentiment_score": rng.randint(-8, 8),
+            "tags": [category.split()[-1], "bench"],
+            "category": category,
+            "created_at": (now - timedelta(minutes=i * 7)).isoformat(),
+            "duplicate_of": None,
+            "summary_cn": None if legacy else f"第 {i} 条新闻的中文摘要",
+            "summary_en": None if legacy else summary,
+            "key_stats_cn": None if legacy else key_stats,
+            "key_stats_en": None if legacy else key_stats,
+        }
+        if news and rng.random() < duplicate_ratio:
+            row["duplicate_of"] = news[-1]["url"]
+        row["embedding"] = embed([embedding_text(row["title"], summary, key_stats, row["tags"])])[0]
+        news.append(row)
+    db.table("news").insert(news).execute()
+    update_sentiment_aggregates(db, news, now=now)
+    db.calls.clear()
+    return db
+
+
+def new_app():
+    at = AppTest.from_file(APP_PATH, default_timeout=60)
+    at.secrets["SUPABASE_URL"] = "http://127.0.0.1"
+    at.secrets["SUPABASE_KEY"] = "bench"
+    at.secrets["GOOGLE_API_KEY"] = "bench"
+    return at
+
+
+def timed_run(at, action=None):
+    started = time.perf_counter()
+    if action:
+        action(at)
+    at.run()
+    elapsed = (time.perf_counter() - started) * 1000
+    if at.exception:
+        raise RuntimeError(f"app 运行出错: {[e.value for e in at.exception]}")
+    phases = dict(at.session_state["profiler"].last())
+    return elapsed, phases
+
+
+SCENARIOS = {
+    # 清空所有缓存后第一次打开页面
+    "cold_start": lambda at: None,
+    # 什么都不改，再跑一次 (比如点了任意控件)
+    "warm_rerun": lambda at: None,
+    "switch_language": lambda at: at.sidebar.radio[0].set_value(
+        "English" if at.sidebar.radio[0].value == "中文" else "中文"),
+    "switch_section": lambda at: at.sidebar.radio[1].set_value(
+        at.sidebar.radio[1].options[1] if at.sidebar.radio[1].index == 0 else at.sidebar.radio[1].options[0]),
+    "load_more": lambda at: next(b for b in at.button if b.key and b.key.startswith("more_")).click(),
+    "chat": lambda at: at.chat_input[0].set_value("最近加密货币市场怎么样?"),
+    # 同一批新闻下再问一遍 (大小写 / 标点不同)，应该直接命中回答缓存
+    "chat_cached": lambda at: at.chat_input[0].set_value("最近加密货币市场怎么样？ "),
+    # 第一次搜索要建索引，之后的搜索直接查
+    "search": lambda at: at.text_input(key="search_query").set_value("story moves"),
+    "tag_filter": lambda at: next(b for b in at.button if b.key and b.key.startswith("tag_")).click(),
+}
+
+
+# 计时之前先做的准备动作
+SETUP = {
+    "chat_cached": lambda at: at.chat_input[0].set_value("最近加密货币市场怎么样?"),
+}
+
+
+def run_benchmark(rows=200, repeat=5, legacy_ratio=0.3, llm_latency=0.0):
+    FakeGenerativeModel.configure(latency=llm_latency)
+    results = {}
+    for name, action in SCENARIOS.items():
+        totals, breakdowns, db_calls, llm_calls = [], [], [], []
+        for _ in range(repeat):
+            _db["client"] = seed_database(rows, legacy_ratio=legacy_ratio)
+            st.cache_data.clear()
+            st.cache_resource.clear()
+            FakeGenerativeModel.reset()
+            at = new_app()
+            if name == "cold_start":
+                elapsed, phases = timed_run(at)
+            else:
+                at.run()
+                if name in SETUP:
+                    SETUP[name](at)
+                    at.run()
+                _db["client"].calls.clear()
+                FakeGenerativeModel.reset()
+                elapsed, phases = timed_run(at, None if name == "warm_rerun" else action)
+            totals.append(elapsed)
+            breakdowns.append(phases)
+            db_calls.append(_db["client"].total_calls())
+            llm_calls.append(FakeGenerativeModel.stats["calls"])
+
+        phase_names = sorted({p for b in breakdowns for p in b})
+        results[name] = {
+            "wall_ms": {"p50": percentile(totals, 50), "p95": percentile(totals, 95)},
+            "phases_ms": {
+                p: {"p50": percentile([b.get(p, 0.0) for b in breakdowns], 50),
+                    "p95": percentile([b.get(p, 0.0) for b in breakdowns], 95)}
+                for p in phase_names
+            },
+            "db_calls": percentile(db_calls, 50),
+            "llm_calls": percentile(llm_calls, 50),
+        }
+    return results
+
+
+def print_results(results):
+    print("\n📊 rerun 耗时 (ms, p50 / p95)")
+    for name, r in results.items():
+        print(f"{name:<16} 墙钟 {r['wall_ms']['p50']:8.1f} / {r['wall_ms']['p95']:8.1f}   "
+              f"DB 调用 {r['db_calls']:>3}   LLM 调用 {r['llm_calls']:>3}")
+        for phase, s in r["phases_ms"].items():
+            print(f"    {phase:<14} {s['p50']:8.1f} / {s['p95']:8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Streamlit 页面 rerun 基准")
+    parser.add_argument("--rows", type=int, default=200, help="数据库里预置的新闻条数")
+    parser.add_argument("--repeat", type=int, default=5, help="每个场景重复次数")
+    parser.add_argument("--legacy-ratio", type=float, default=0.3, help="没有预翻译列的老数据比例")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="每次假 Gemini 调用的延迟 (秒)")
+    parser.add_argument("--json", help="把结果写入 JSON 文件")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.rows, args.repeat, args.legacy_ratio, args.llm_latency)
+    print_results(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"💾 已写入 {args.json}")
+
+
+if __name__ == "__main__":
+    main()
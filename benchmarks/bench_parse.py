@@ -0,0 +1,107 @@
+"""
+正文解析进程池的扩展性基准：同一批假网页分别用 0 (当前进程) / 1 / 2 / 4 ... 个进程解析。
+
+    python benchmarks/bench_parse.py
+    python benchmarks/bench_parse.py --pages 400 --paragraphs 200 --mode newspaper --chunksize 1 8
+    python benchmarks/bench_parse.py --json results.json
+
+每组输出吞吐 (篇/秒)、相对当前进程的加速比和并行效率 (加速比 / 进程数)。
+"""
+import os
+import sys
+import json
+import time
+import argparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fakes import make_article_text
+from parse_pool import ParsePool
+
+
+def make_pages(count, paragraphs):
+    pages = []
+    for i in range(count):
+        body = "".join(f"<p>{p}</p>" for p in make_article_text(i % 16, i, paragraphs))
+        html = (
+            f"<html><head><title>Story {i}</title></head><body>"
+            f"<nav>home markets tech</nav><article><h1>Story {i}</h1>{body}</article>"
+            "<footer>copyright</footer></body></html>"
+        )
+        pages.append((f"http://bench.local/article/{i}", html.encode("utf-8"), "utf-8"))
+    return pages
+
+
+def worker_counts(max_workers):
+    counts = [0, 1]
+    n = 2
+    while n < max_workers:
+        counts.append(n)
+        n *= 2
+    if max_workers > 1:
+        counts.append(max_workers)
+    return counts
+
+
+def run_case(pages, workers, chunksize, mode, repeat):
+    with ParsePool(workers, chunksize, mode=mode) as pool:
+        pool.parse_many(pages[:max(1, workers)])  # 预热：进程启动、lxml / newspaper 导入
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            results = pool.parse_many(pages)
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+    parsed = sum(1 for _, text, _, _ in results if text)
+    return {
+        "workers": workers,
+        "chunksize": chunksize,
+        "mode": mode,
+        "pages": len(pages),
+        "parsed": parsed,
+        "elapsed_s": round(best, 3),
+        "pages_per_s": round(len(pages) / best, 1) if best else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="正文解析进程池扩展性基准")
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--paragraphs", type=int, default=60, help="每篇假文章的段落数 (控制网页大小)")
+    parser.add_argument("--mode", choices=["stream", "newspaper"], default="stream")
+    parser.add_argument("--workers", type=int, nargs="+", help="要测的进程数，默认 0/1/2/4.../CPU 核数")
+    parser.add_argument("--chunksize", type=int, nargs="+", default=[4])
+    parser.add_argument("--repeat", type=int, default=3, help="每组重复次数，取最快一次")
+    parser.add_argument("--json", help="把结果写入 JSON 文件")
+    args = parser.parse_args()
+
+    pages = make_pages(args.pages, args.paragraphs)
+    size_kb = sum(len(html) for _, html, _ in pages) / len(pages) / 1024
+    cores = os.cpu_count() or 1
+    print(f"▶️ {len(pages)} 篇网页，平均 {size_kb:.0f}KB，{args.mode} 模式，CPU {cores} 核")
+
+    results = []
+    for chunksize in args.chunksize:
+        for workers in args.workers or worker_counts(cores):
+            results.append(run_case(pages, workers, chunksize, args.mode, args.repeat))
+
+    print("\n📊 基准结果")
+    print(f"{'进程':>4} {'块大小':>6} {'秒':>7} {'篇/秒':>8} {'加速比':>6} {'效率':>6}")
+    for r in results:
+        base = next(b for b in results if b["workers"] == 0 and b["chunksize"] == r["chunksize"]) \
+            if any(b["workers"] == 0 for b in results) else results[0]
+        r["speedup"] = round(base["elapsed_s"] / r["elapsed_s"], 2) if r["elapsed_s"] else 0.0
+        r["efficiency"] = round(r["speedup"] / max(1, r["workers"]), 2)
+        print(f"{r['workers']:>4} {r['chunksize']:>6} {r['elapsed_s']:>7.3f} {r['pages_per_s']:>8.1f} "
+              f"{r['speedup']:>6.2f} {r['efficiency']:>6.2f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"💾 已写入 {args.json}")
+
+
+if __name__ == "__main__":
+    main()
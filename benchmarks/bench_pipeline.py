@@ -0,0 +1,159 @@
+"""
+离线跑 news_cloud.run_pipeline 的基准：本地 RSS/文章服务 + 假 Gemini + 内存 Supabase。
+
+    python benchmarks/bench_pipeline.py
+    python benchmarks/bench_pipeline.py --feeds 4 8 --entries 3 10 --llm-latency 0.2 --failure-rate 0.05
+    python benchmarks/bench_pipeline.py --json results.json
+
+每个场景输出吞吐 (篇/分钟)、各阶段 p50/p95/p99、Gemini / 数据库调用次数和 Python 峰值内存。
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import importlib
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fakes import FixtureServer, FakeGenerativeModel, InMemorySupabase, fake_embed_content
+
+# ================= 把外部服务换成假的 =================
+# news_cloud 在 import 时就创建客户端，所以要在 import 之前打补丁
+os.environ.setdefault("GOOGLE_API_KEY", "bench")
+os.environ.setdefault("SUPABASE_URL", "http://127.0.0.1")
+os.environ.setdefault("SUPABASE_KEY", "bench")
+os.environ["LLM_COOLDOWN"] = "0"
+# 默认不让限流器成为瓶颈，--rpm 可以模拟真实配额
+os.environ.setdefault("GEMINI_RPM", "100000")
+
+import supabase
+import google.generativeai as genai
+
+_db = {"client": None}
+supabase.create_client = lambda url, key, *args, **kwargs: _db["client"]
+genai.configure = lambda *args, **kwargs: None
+genai.GenerativeModel = FakeGenerativeModel
+genai.embed_content = fake_embed_content
+
+
+def run_scenario(feeds, entries, llm_latency=0.0, failure_rate=0.0, db_latency=0.0,
+                 syndicate_every=4, paragraphs=12, sequential=False, extract_mode="stream"):
+    state_dir = tempfile.mkdtemp(prefix="bench_state_")
+    os.environ["PIPELINE_STATE_DIR"] = state_dir
+    os.environ["EXTRACT_MODE"] = extract_mode
+    os.environ["MAX_ENTRIES_PER_FEED"] = str(entries)
+    _db["client"] = InMemorySupabase(latency=db_latency)
+    FakeGenerativeModel.configure(latency=llm_latency, failure_rate=failure_rate)
+
+    try:
+        with FixtureServer(entries_per_feed=entries, paragraphs=paragraphs,
+                           syndicate_every=syndicate_every) as server:
+            # 每个场景重新加载，状态目录 / 缓存 / 写入器都是新的
+            import news_cloud
+            news_cloud = importlib.reload(news_cloud)
+            news_cloud.FEEDS = [
+                {"category": f"Bench {i % 4}", "source": f"Feed {i}", "url": server.feed_url(i),
+                 "poll_minutes": 60, "max_entries": entries, "priority": i % 3}
+                for i in range(feeds)
+            ]
+            limits = news_cloud.PipelineLimits.sequential() if sequential else news_cloud.PipelineLimits.from_env()
+
+            tracemalloc.start()
+            started = time.perf_counter()
+            stages = news_cloud.run_pipeline(limits)
+            elapsed = time.perf_counter() - started
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            db = _db["client"]
+            saved = news_cloud.writer.stats["saved"]
+            return {
+                "feeds": feeds,
+                "entries_per_feed": entries,
+                "llm_latency": llm_latency,
+                "failure_rate": failure_rate,
+                "sequential": sequential,
+                "extract_mode": extract_mode,
+                "paragraphs": paragraphs,
+                "elapsed_s": round(elapsed, 3),
+                "rows_saved": saved,
+                "articles_per_min": round(saved / elapsed * 60, 1) if elapsed else 0.0,
+                "stages": {
+                    stage: {k: round(v, 4) if isinstance(v, float) else v for k, v in s.items()}
+                    for stage, s in stages.items()
+                },
+                "llm": dict(FakeGenerativeModel.stats),
+                "summarizer": dict(news_cloud.summarizer.stats),
+                "extract": dict(news_cloud.extract_stats),
+                "rate_limiter": dict(news_cloud.gemini.stats, **news_cloud.gemini.limiter.stats),
+                "counters": dict(news_cloud.metrics.counters),
+                "db_calls": dict(db.calls),
+                "db_calls_total": db.total_calls(),
+                "http_requests": server.requests,
+                "peak_mem_mb": round(peak / 1024 / 1024, 2),
+            }
+    finally:
+        shutil.rmtree(state_dir, ignore_errors=True)
+
+
+def print_table(results):
+    print("\n📊 基准结果")
+    header = f"{'feeds':>5} {'entries':>7} {'rows':>5} {'秒':>7} {'篇/分钟':>9} {'LLM调用':>7} {'DB调用':>6} {'峰值MB':>7}"
+    print(header)
+    for r in results:
+        print(
+            f"{r['feeds']:>5} {r['entries_per_feed']:>7} {r['rows_saved']:>5} {r['elapsed_s']:>7.2f} "
+            f"{r['articles_per_min']:>9.1f} {r['llm']['calls']:>7} {r['db_calls_total']:>6} {r['peak_mem_mb']:>7.2f}"
+        )
+        for stage, s in r["stages"].items():
+            print(
+                f"        {stage:<10} n={s['count']:<4} p50 {s['p50'] * 1000:8.1f}ms  "
+                f"p95 {s['p95'] * 1000:8.1f}ms  p99 {s['p99'] * 1000:8.1f}ms"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="离线流水线基准")
+    parser.add_argument("--feeds", type=int, nargs="+", default=[2, 8])
+    parser.add_argument("--entries", type=int, nargs="+", default=[3, 10])
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="每次假 Gemini 调用的延迟 (秒)")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="假 Gemini 调用的失败概率")
+    parser.add_argument("--rpm", type=int, help="Gemini 每分钟请求数上限 (默认不限)")
+    parser.add_argument("--db-latency", type=float, default=0.0, help="每次内存数据库调用的延迟 (秒)")
+    parser.add_argument("--paragraphs", type=int, default=12, help="每篇假文章的段落数 (控制网页大小)")
+    parser.add_argument("--extract-mode", choices=["stream", "newspaper"], default="stream", help="正文抽取方式")
+    parser.add_argument("--sequential", action="store_true", help="用串行模式跑，对比并发收益")
+    parser.add_argument("--json", help="把结果写入 JSON 文件")
+    args = parser.parse_args()
+    if args.rpm:
+        os.environ["GEMINI_RPM"] = str(args.rpm)
+
+    results = []
+    for feeds in args.feeds:
+        for entries in args.entries:
+            print(f"\n▶️ 场景: {feeds} 个频道 × 每个 {entries} 条")
+            results.append(run_scenario(
+                feeds, entries,
+                llm_latency=args.llm_latency,
+                failure_rate=args.failure_rate,
+                db_latency=args.db_latency,
+                paragraphs=args.paragraphs,
+                sequential=args.sequential,
+                extract_mode=args.extract_mode,
+            ))
+
+    print_table(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"💾 已写入 {args.json}")
+
+
+if __name__ == "__main__":
+    main()
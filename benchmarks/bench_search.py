@@ -0,0 +1,167 @@
+"""
+搜索索引基准：生成 N 条中英文混合的假新闻，测建索引耗时 / 内存和各类查询的延迟，
+并和原来的做法 (Python 里逐条做子串匹配) 对比。
+
+    python benchmarks/bench_search.py
+    python benchmarks/bench_search.py --rows 10000 50000 --queries 200
+    python benchmarks/bench_search.py --json results.json
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from search_index import SearchIndex
+from ingest_engine import percentile
+
+CATEGORIES = ["₿ Crypto", "💰 Macro & Market", "🤖 AI & Tech", "📱 Gadgets & Tech"]
+WORDS = (
+    "bitcoin ether stablecoin etf fed rates inflation yields earnings revenue guidance chip nvidia "
+    "openai model launch iphone android merger lawsuit tariff oil dollar bond rally selloff record "
+    "regulator approval funding startup layoffs forecast quarter growth demand supply"
+).split()
+CN_WORDS = "比特币 以太坊 美联储 利率 通胀 财报 营收 芯片 英伟达 大模型 发布 苹果 并购 关税 原油 美元 债券 上涨 下跌 监管".split()
+TAGS = ["Bitcoin", "Fed", "AI", "Earnings", "Chips", "Oil", "ETF", "Regulation", "Apple", "Rates"]
+
+QUERIES = {
+    "单词": ["bitcoin", "inflation", "nvidia", "tariff"],
+    "多词": ["bitcoin etf", "fed rates inflation", "chip demand forecast"],
+    "中文": ["比特币", "美联储利率", "英伟达芯片"],
+    "无结果": ["zzzz"],
+}
+
+
+def make_rows(count, seed=11):
+    """每条新闻 3 个主题词 + 若干从 5000 词的长尾词表里抽的词，主题词的覆盖率接近真实新闻"""
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    vocab = [f"w{i}" for i in range(5000)]
+    rows = []
+    for i in range(count):
+        words = rng.sample(WORDS, 3) + [vocab[min(int(rng.paretovariate(1.1)), 4999)] for _ in range(9)]
+        rng.shuffle(words)
+        cn = rng.sample(CN_WORDS, 2)
+        rows.append({
+            "id": i,
+            "title": " ".join(words[:6]).title(),
+            "url": f"https://example.com/{i}",
+            "content_summary": "、".join(cn) + "。" + " ".join(words[6:]),
+            "summary_en": " ".join(words),
+            "summary_cn": "".join(cn),
+            "tags": rng.sample(TAGS, 2),
+            "category": CATEGORIES[i % len(CATEGORIES)],
+            "created_at": (now - timedelta(minutes=i)).isoformat(),
+        })
+    return rows
+
+
+def linear_search(rows, query, categories=None, tag=None, limit=50):
+    """原来的做法：逐条拼接文本做子串匹配"""
+    terms = query.lower().split()
+    results = []
+    for row in rows:
+        if categories and row["category"] not in categories:
+            continue
+        if tag and tag not in (row.get("tags") or []):
+            continue
+        text = " ".join([row["title"], row["content_summary"], row["summary_en"], row["summary_cn"],
+                         " ".join(row["tags"])]).lower()
+        if all(term in text for term in terms):
+            results.append(row)
+    return results[:limit]
+
+
+def time_queries(fn, queries, repeat):
+    samples = []
+    for _ in range(repeat):
+        for query in queries:
+            started = time.perf_counter()
+            fn(query)
+            samples.append((time.perf_counter() - started) * 1000)
+    return {"p50": round(percentile(samples, 50), 3), "p95": round(percentile(samples, 95), 3)}
+
+
+def measure_memory(rows):
+    """tracemalloc 会让建索引慢好几倍，单独建一次只量内存"""
+    tracemalloc.start()
+    SearchIndex().add(rows)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return round(peak / 1024 / 1024, 1)
+
+
+def run_case(count, repeat, memory=False):
+    rows = make_rows(count)
+    started = time.perf_counter()
+    index = SearchIndex()
+    index.add(rows)
+    build_s = time.perf_counter() - started
+
+    finance = CATEGORIES[:2]
+    result = {
+        "rows": count,
+        "build_s": round(build_s, 3),
+        "index_mb": measure_memory(rows) if memory else None,
+        "terms": len(index.postings),
+        "queries": {},
+    }
+    for name, queries in QUERIES.items():
+        result["queries"][name] = {
+            "index": time_queries(lambda q: index.search(q, categories=finance), queries, repeat),
+            "linear": time_queries(lambda q: linear_search(rows, q, categories=finance), queries, max(1, repeat // 5)),
+        }
+    result["queries"]["标签"] = {
+        "index": time_queries(lambda tag: index.search(tag=tag, categories=finance), TAGS, repeat),
+        "linear": time_queries(lambda tag: linear_search(rows, "", categories=finance, tag=tag), TAGS,
+                               max(1, repeat // 5)),
+    }
+    result["incremental_add_ms"] = round(_time_add(index, count), 3)
+    return result
+
+
+def _time_add(index, start_id, batch=20):
+    """模拟每分钟新入库一小批：增量加入 batch 条的耗时"""
+    fresh = make_rows(batch, seed=start_id)
+    for i, row in enumerate(fresh):
+        row["id"] = start_id + i
+    started = time.perf_counter()
+    index.add(fresh)
+    return (time.perf_counter() - started) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="搜索索引基准")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--queries", type=int, default=50, help="每组查询重复次数")
+    parser.add_argument("--memory", action="store_true", help="额外测索引占用的内存 (比较慢)")
+    parser.add_argument("--json", help="把结果写入 JSON 文件")
+    args = parser.parse_args()
+
+    results = []
+    for count in args.rows:
+        print(f"\n▶️ {count} 条新闻")
+        r = run_case(count, args.queries, args.memory)
+        results.append(r)
+        memory = f"，内存 {r['index_mb']}MB" if r["index_mb"] is not None else ""
+        print(f"   建索引 {r['build_s']:.2f}s{memory}，{r['terms']} 个词，"
+              f"增量加入 20 条 {r['incremental_add_ms']:.2f}ms")
+        for name, q in r["queries"].items():
+            print(f"   {name:<4} 索引 p50 {q['index']['p50']:8.3f}ms  p95 {q['index']['p95']:8.3f}ms   "
+                  f"逐条匹配 p50 {q['linear']['p50']:8.2f}ms")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"💾 已写入 {args.json}")
+
+
+if __name__ == "__main__":
+    main()
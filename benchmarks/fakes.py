@@ -0,0 +1,392 @@
+import re
+import sys
+import json
+import time
+import random
+import hashlib
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# ================= 离线基准用的假服务 =================
+# - FixtureServer: 本地 HTTP 服务，按固定种子生成 RSS 和文章页面
+# - FakeGenerativeModel: 模拟 Gemini，可配置延迟和失败率
+# - InMemorySupabase: 内存里的 Supabase 兼容表，支持流水线和 app 用到的查询
+
+WORDS = (
+    "market stocks bitcoin inflation fed rates earnings revenue growth chip ai model startup "
+    "funding investors bond yield dollar oil crypto etf regulation bank lending consumer demand "
+    "quarter guidance forecast analyst shares trading volume token exchange launch device"
+).split()
+
+
+def _rng(*parts):
+    seed = int(hashlib.md5("|".join(map(str, parts)).encode()).hexdigest()[:8], 16)
+    return random.Random(seed)
+
+
+def make_article_text(feed_id, entry_id, paragraphs=12):
+    # newspaper 按停用词密度挑正文，所以句子要像正常英文一样带 the / of / and
+    rng = _rng("article", feed_id, entry_id)
+    out = []
+    for _ in range(paragraphs):
+        sentences = []
+        for _ in range(rng.randint(3, 6)):
+            a, b, c, d = (rng.choice(WORDS) for _ in range(4))
+            sentences.append(
+                f"The {a} of the {b} was reported to be {rng.randint(2, 99)}% higher than in the {c} "
+                f"and analysts said that the {d} would continue to grow over the next quarter."
+            )
+        out.append(" ".join(sentences))
+    return out
+
+
+class _QuietServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # 流式抽取够字数就断开连接，服务端写不完属于正常情况
+        if not isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            super().handle_error(request, client_address)
+
+
+class FixtureServer:
+    """
+    /feed/<feed_id>            RSS，包含 entries_per_feed 条
+    /article/<feed_id>/<entry> 文章页面
+    syndicate_every=N 时，每个频道第 N 条会转载频道 0 的同序号文章 (用来触发相似新闻聚类)
+    """
+
+    def __init__(self, entries_per_feed=3, paragraphs=12, latency=0.0, syndicate_every=0):
+        self.entries_per_feed = entries_per_feed
+        self.paragraphs = paragraphs
+        self.latency = latency
+        self.syndicate_every = syndicate_every
+        self.requests = 0
+        self.bytes_sent = 0
+        self.lock = threading.Lock()
+        self.httpd = _QuietServer(("127.0.0.1", 0), self._handler())
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.httpd.server_port}"
+
+    def feed_url(self, feed_id):
+        return f"{self.base_url}/feed/{feed_id}"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def render_feed(self, feed_id):
+        items = "".join(
+            f"<item><title>Story {feed_id}-{i}</title>"
+            f"<link>{self.base_url}/article/{feed_id}/{i}?utm_source=rss</link>"
+            f"<guid>{feed_id}-{i}</guid></item>"
+            for i in range(self.entries_per_feed)
+        )
+        return (
+            "<?xml version='1.0' encoding='utf-8'?><rss version='2.0'><channel>"
+            f"<title>Feed {feed_id}</title>{items}</channel></rss>"
+        ).encode("utf-8")
+
+    def render_article(self, feed_id, entry_id):
+        source = feed_id
+        if self.syndicate_every and entry_id % self.syndicate_every == self.syndicate_every - 1:
+            source = 0
+        paragraphs = make_article_text(source, entry_id, self.paragraphs)
+        body = "".join(f"<p>{p}</p>" for p in paragraphs)
+        return (
+            f"<html><head><title>Story {feed_id}-{entry_id}</title></head><body>"
+            f"<nav>home markets tech</nav><article><h1>Story {feed_id}-{entry_id}</h1>{body}</article>"
+            "<footer>copyright</footer></body></html>"
+        ).encode("utf-8")
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                if server.latency:
+                    time.sleep(server.latency)
+                parts = self.path.split("?")[0].strip("/").split("/")
+                if parts[0] == "feed":
+                    body, ctype = server.render_feed(int(parts[1])), "application/rss+xml; charset=utf-8"
+                elif parts[0] == "article":
+                    body, ctype = server.render_article(int(parts[1]), int(parts[2])), "text/html; charset=utf-8"
+                else:
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                with server.lock:
+                    server.requests += 1
+                    server.bytes_sent += len(body)
+                self.send_response(200)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+
+# ================= 假 Gemini =================
+
+class FakeResponse:
+    def __init__(self, text, usage=None):
+        self.text = text
+        self.usage_metadata = usage
+
+
+class FakeUsage:
+    def __init__(self, prompt_tokens, output_tokens):
+        self.prompt_token_count = prompt_tokens
+        self.candidates_token_count = output_tokens
+        self.total_token_count = prompt_tokens + output_tokens
+
+
+class FakeGenerativeModel:
+    """
+    按 prompt 的形态返回对应的 JSON：批量摘要 / 单篇摘要 / 批量翻译 / 文本翻译 / 聊天。
+    所有实例共享统计，方便基准统计整个进程的调用次数。
+    """
+
+    stats = {"calls": 0, "failures": 0, "prompt_tokens": 0, "output_tokens": 0}
+    latency = 0.0
+    failure_rate = 0.0
+    _lock = threading.Lock()
+    _rng = random.Random(42)
+
+    def __init__(self, model_name=None, system_instruction=None, generation_config=None, **kwargs):
+        self.model_name = model_name
+        self.system_instruction = system_instruction or ""
+
+    @classmethod
+    def configure(cls, latency=0.0, failure_rate=0.0, seed=42):
+        cls.latency = latency
+        cls.failure_rate = failure_rate
+        cls._rng = random.Random(seed)
+        cls.reset()
+
+    @classmethod
+    def reset(cls):
+        with cls._lock:
+            cls.stats = {"calls": 0, "failures": 0, "prompt_tokens": 0, "output_tokens": 0}
+
+    def _answer(self, prompt):
+        summary = {
+            "summary": "市场对最新数据反应积极",
+            "key_stats": "营收同比增长 {{12%}}\n净利润达到 {{$3亿}}",
+            "sentiment_score": 3,
+            "tags": ["市场", "财报"],
+        }
+        ids = re.findall(r"=== 新闻 id: ([^ ]+) ===", prompt)
+        if ids:
+            return json.dumps([dict(summary, id=i) for i in ids], ensure_ascii=False)
+        if prompt.startswith("For each item"):
+            items = json.loads(prompt[prompt.index("\n\n") + 2:])
+            return json.dumps([
+                {"id": item["id"], "summary_cn": item["summary"], "summary_en": "Markets reacted positively",
+                 "key_stats_cn": item["key_stats"], "key_stats_en": "Revenue up {{12%}}"}
+                for item in items
+            ], ensure_ascii=False)
+        if prompt.startswith("Translate each string"):
+            items = json.loads(prompt[prompt.index("\n\n") + 2:])
+            return json.dumps([f"[translated] {item}" for item in items], ensure_ascii=False)
+        if "新闻标题：" in prompt:
+            return json.dumps(summary, ensure_ascii=False)
+        return "根据新闻数据，市场整体情绪偏积极。"
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        cls = type(self)
+        if cls.latency:
+            time.sleep(cls.latency)
+        prompt_tokens = len(prompt) // 4 + 1
+        with cls._lock:
+            cls.stats["calls"] += 1
+            cls.stats["prompt_tokens"] += prompt_tokens
+            failed = cls._rng.random() < cls.failure_rate
+            if failed:
+                cls.stats["failures"] += 1
+        if failed:
+            raise RuntimeError("429 Resource has been exhausted (fake)")
+        text = self._answer(prompt)
+        output_tokens = len(text) // 4 + 1
+        with cls._lock:
+            cls.stats["output_tokens"] += output_tokens
+        response = FakeResponse(text, FakeUsage(prompt_tokens, output_tokens))
+        if stream:
+            return iter([FakeResponse(text[i:i + 20]) for i in range(0, len(text), 20)])
+        return response
+
+
+def fake_embed_content(model=None, content=None, task_type=None, **kwargs):
+    """替代 genai.embed_content，返回确定性的向量"""
+    from vector_index import HashingEmbedder
+    texts = content if isinstance(content, list) else [content]
+    vectors = HashingEmbedder()(texts)
+    return {"embedding": vectors if isinstance(content, list) else vectors[0]}
+
+
+# ================= 内存版 Supabase =================
+
+class _Result:
+    def __init__(self, data):
+        self.data = data
+
+
+class _Query:
+    def __init__(self, db, table):
+        self.db = db
+        self.table_name = table
+        self.filters = []
+        self.orders = []
+        self.limit_n = None
+        self.op = "select"
+        self.payload = None
+        self.on_conflict = None
+        self.ignore_duplicates = False
+        self.columns = None
+        self._negate = False
+
+    # --- 查询构造 ---
+    def select(self, columns="*", **kwargs):
+        self.op = "select"
+        self.columns = None if columns.strip() == "*" else [c.strip() for c in columns.split(",")]
+        return self
+
+    def _add(self, fn):
+        if self._negate:
+            self._negate = False
+            self.filters.append(lambda r, fn=fn: not fn(r))
+        else:
+            self.filters.append(fn)
+        return self
+
+    @property
+    def not_(self):
+        self._negate = True
+        return self
+
+    def eq(self, col, value):
+        return self._add(lambda r: r.get(col) == value)
+
+    def in_(self, col, values):
+        values = set(values)
+        return self._add(lambda r: r.get(col) in values)
+
+    def gt(self, col, value):
+        return self._add(lambda r: r.get(col) is not None and str(r.get(col)) > str(value))
+
+    def gte(self, col, value):
+        return self._add(lambda r: r.get(col) is not None and str(r.get(col)) >= str(value))
+
+    def lt(self, col, value):
+        return self._add(lambda r: r.get(col) is not None and str(r.get(col)) < str(value))
+
+    def is_(self, col, value):
+        return self._add(lambda r: r.get(col) is None if value == "null" else r.get(col) == value)
+
+    def or_(self, expression):
+        # 只支持分页用到的 created_at.lt.X,and(created_at.eq.X,id.lt.N)
+        m = re.match(r'created_at\.lt\.(".*?"|[^,]+),and\(created_at\.eq\.(".*?"|[^,]+),id\.lt\.(\d+)\)', expression)
+        if not m:
+            raise NotImplementedError(expression)
+        ts = m.group(1).strip('"')
+        row_id = int(m.group(3))
+        return self._add(lambda r: str(r["created_at"]) < ts or (str(r["created_at"]) == ts and r["id"] < row_id))
+
+    def order(self, col, desc=False, **kwargs):
+        self.orders.append((col, desc))
+        return self
+
+    def limit(self, n, **kwargs):
+        self.limit_n = n
+        return self
+
+    def insert(self, rows, **kwargs):
+        self.op = "insert"
+        self.payload = rows if isinstance(rows, list) else [rows]
+        return self
+
+    def upsert(self, rows, on_conflict=None, ignore_duplicates=False, **kwargs):
+        self.op = "upsert"
+        self.payload = rows if isinstance(rows, list) else [rows]
+        self.on_conflict = [c.strip() for c in (on_conflict or "id").split(",")]
+        self.ignore_duplicates = ignore_duplicates
+        return self
+
+    # --- 执行 ---
+    def execute(self):
+        return self.db._execute(self)
+
+
+class InMemorySupabase:
+    """支持 table().select/insert/upsert 和常用过滤，记录每张表的调用次数"""
+
+    def __init__(self, latency=0.0):
+        self.tables = {}
+        self.latency = latency
+        self.calls = {}
+        self.lock = threading.Lock()
+        self._next_id = 1
+
+    def table(self, name):
+        return _Query(self, name)
+
+    def _execute(self, query):
+        if self.latency:
+            time.sleep(self.latency)
+        with self.lock:
+            key = f"{query.table_name}.{query.op}"
+            self.calls[key] = self.calls.get(key, 0) + 1
+            rows = self.tables.setdefault(query.table_name, [])
+            if query.op == "select":
+                return _Result(self._select(rows, query))
+            return _Result(self._write(rows, query))
+
+    def _select(self, rows, query):
+        result = [r for r in rows if all(f(r) for f in query.filters)]
+        for col, desc in reversed(query.orders):
+            result.sort(key=lambda r: (r.get(col) is None, r.get(col)), reverse=desc)
+        if query.limit_n is not None:
+            result = result[:query.limit_n]
+        if query.columns:
+            result = [{c: r.get(c) for c in query.columns} for r in result]
+        return [dict(r) for r in result]
+
+    def _write(self, rows, query):
+        written = []
+        for payload in query.payload:
+            row = dict(payload)
+            match = None
+            if query.op == "upsert":
+                keys = query.on_conflict
+                match = next((r for r in rows if all(r.get(k) == row.get(k) for k in keys)), None)
+            if match is not None and query.ignore_duplicates:
+                # ON CONFLICT DO NOTHING：已有的行不变，也不出现在返回结果里
+                continue
+            if match is not None:
+                match.update(row)
+                written.append(dict(match))
+                continue
+            if query.table_name == "news":
+                row.setdefault("id", self._next_id)
+                self._next_id += 1
+                row.setdefault("created_at", time.strftime("%Y-%m-%dT%H:%M:%S+00:00", time.gmtime()))
+            rows.append(row)
+            written.append(dict(row))
+        return written
+
+    def total_calls(self):
+        return sum(self.calls.values())
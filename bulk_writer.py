@@ -0,0 +1,121 @@
+import os
+import json
+import time
+import random
+import threading
+
+# ================= 批量入库 =================
+# 处理好的新闻先放进缓冲区，攒够 batch_size 条再按 url upsert 一次 (已存在的 url 保持不变)。
+# 重试多次仍失败的批次写入本地死信文件，下次运行开头重放，重复运行也不会插入重复行。
+# on_saved(batch, inserted): batch 是整批行，inserted 是这次真正新插入的行 (数据库返回，带 id / created_at)，
+# 重放 / 续跑时已经在库里的行不在 inserted 里，下游的增量统计不会重复计入。
+
+
+class BufferedNewsWriter:
+
+    def __init__(self, client, batch_size=20, max_retries=3, backoff=1.0,
+                 dead_letter_path=None, on_saved=None, table="news", sleep=time.sleep):
+        self.client = client
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.dead_letter_path = dead_letter_path
+        self.on_saved = on_saved
+        self.table = table
+        self.sleep = sleep
+        self.buffer = []
+        self.lock = threading.Lock()
+        self.stats = {"saved": 0, "inserted": 0, "batches": 0, "failed": 0, "dead_lettered": 0}
+
+    def add(self, row):
+        """加入缓冲区，满了就自动写一批"""
+        with self.lock:
+            self.buffer.append(row)
+            if len(self.buffer) < self.batch_size:
+                return
+            batch, self.buffer = self.buffer, []
+        self._write_batch(batch)
+
+    def flush(self):
+        with self.lock:
+            batch, self.buffer = self.buffer, []
+        for i in range(0, len(batch), self.batch_size):
+            self._write_batch(batch[i:i + self.batch_size])
+
+    def _write_batch(self, batch, failed=None):
+        """failed 不为 None 时，重试多次仍失败的行放进这个列表，而不是追加到死信文件"""
+        if not batch:
+            return True
+        for attempt in range(self.max_retries + 1):
+            try:
+                inserted = self.client.table(self.table).upsert(
+                    batch, on_conflict="url", ignore_duplicates=True
+                ).execute().data or []
+                with self.lock:
+                    self.stats["saved"] += len(batch)
+                    self.stats["inserted"] += len(inserted)
+                    self.stats["batches"] += 1
+                skipped = len(batch) - len(inserted)
+                note = f" (其中 {skipped} 条已在库里)" if skipped else ""
+                print(f"✅ 批量入库 {len(batch)} 条{note}")
+                break
+            except Exception as e:
+                if attempt == self.max_retries:
+                    print(f"❌ 批量入库失败 ({len(batch)} 条): {e}")
+                    with self.lock:
+                        self.stats["failed"] += len(batch)
+                        if failed is None:
+                            self._dead_letter(batch)
+                        else:
+                            failed.extend(batch)
+                    return False
+                # 指数退避 + 抖动
+                delay = self.backoff * (2 ** attempt) * (1 + random.random())
+                print(f"⚠️ 入库出错，{delay:.1f}s 后重试: {e}")
+                self.sleep(delay)
+
+        if self.on_saved:
+            self.on_saved(batch, inserted)
+        return True
+
+    def _dead_letter(self, batch):
+        if not self.dead_letter_path:
+            return
+        folder = os.path.dirname(self.dead_letter_path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        with open(self.dead_letter_path, "a", encoding="utf-8") as f:
+            for row in batch:
+                f.write(json.dumps(row, ensure_ascii=False) + "\n")
+        self.stats["dead_lettered"] += len(batch)
+
+    def replay_dead_letters(self):
+        """
+        把上次失败的行重新写一遍 (在开始写新数据之前调用)。
+        全部写完才替换死信文件：仍然失败的行先写进临时文件再原子改名，都成功了才删除；
+        重放途中崩溃的话原文件还在，下次再重放一遍 (按 url upsert，不会重复插入)。
+        """
+        if not self.dead_letter_path or not os.path.exists(self.dead_letter_path):
+            return 0
+        with open(self.dead_letter_path, encoding="utf-8") as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+
+        # 同一链接只保留最后一次，避免 upsert 同一批里出现重复主键
+        latest = list({row["url"]: row for row in rows}.values())
+        failed = []
+        if latest:
+            print(f"♻️ 重放死信 {len(latest)} 条")
+        for i in range(0, len(latest), self.batch_size):
+            self._write_batch(latest[i:i + self.batch_size], failed=failed)
+
+        if failed:
+            tmp = f"{self.dead_letter_path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                for row in failed:
+                    f.write(json.dumps(row, ensure_ascii=False) + "\n")
+            os.replace(tmp, self.dead_letter_path)
+            self.stats["dead_lettered"] += len(failed)
+            print(f"⚠️ 死信重放后仍有 {len(failed)} 条失败，留待下次")
+        else:
+            os.remove(self.dead_letter_path)
+        return len(latest) - len(failed)
@@ -0,0 +1,44 @@
+import threading
+from collections import OrderedDict
+
+# ================= 新闻卡片缓存 (app.py 用) =================
+# 卡片的展示内容 (摘要 / 标签 / 高亮后的关键数据 HTML) 按 (新闻 id, 语言, 显示模式) 缓存，
+# 所有会话共享 (配合 st.cache_resource)。命中的卡片不再拆分摘要、翻译和正则高亮，只剩往页面上输出元素。
+
+
+class CardCache:
+    """线程安全的 LRU，超过 max_entries 时淘汰最久没用的卡片"""
+
+    def __init__(self, max_entries=2000):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            card = self.entries.get(key)
+            if card is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return card
+
+    def put(self, key, card):
+        with self.lock:
+            self.entries[key] = card
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def stats(self):
+        with self.lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            }
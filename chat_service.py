@@ -0,0 +1,116 @@
+import re
+import time
+import hashlib
+import threading
+from card_cache import CardCache
+from ingest_engine import percentile
+from vector_index import build_context
+
+# ================= AI 分析师聊天 (app.py 用) =================
+# 所有会话共享一个 ChatService (配合 st.cache_resource)：
+# - 回答按 (规范化后的问题, 语言, 板块, 新闻快照哈希) 缓存，同一批新闻下重复的问题直接给出缓存的回答
+# - 同一快照下检索到同一组新闻时，拼好的上下文直接复用
+# - 流式输出，记录首字延迟 (TTFT) 和总耗时
+# 新闻有更新 (快照哈希变了) 之后旧的回答自然不再命中，由 LRU 淘汰。
+
+_SPACE_RE = re.compile(r"\s+")
+_TRAILING_RE = re.compile(r"[\s?？!！。.,，~～]+$")
+
+
+def normalize_question(question):
+    """大小写、多余空白和句尾标点不同的问题视为同一个"""
+    question = _SPACE_RE.sub(" ", (question or "").strip().lower())
+    return _TRAILING_RE.sub("", question)
+
+
+def snapshot_hash(rows):
+    """新闻快照的标识：按 (id, created_at) 算哈希，有新闻入库或列表变化时随之改变"""
+    digest = hashlib.sha1()
+    for row in rows:
+        digest.update(f"{row.get('id')}:{row.get('created_at')};".encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+def chunk_text(chunk):
+    """流式响应的一块转成文字；被安全策略拦截的块没有 text，访问时会抛 ValueError"""
+    try:
+        return chunk.text or ""
+    except (ValueError, AttributeError):
+        return ""
+
+
+def cap_history(messages, max_messages):
+    """只保留最近 max_messages 条聊天记录，返回新的列表"""
+    if max_messages and len(messages) > max_messages:
+        return messages[-max_messages:]
+    return messages
+
+
+class ChatService:
+    """
+    max_answers / max_contexts: 回答和拼好的上下文各保留多少条 (LRU)
+    history: 统计 TTFT / 总耗时时保留最近多少次
+    """
+
+    def __init__(self, max_answers=256, max_contexts=64, history=200, clock=time.perf_counter):
+        self.answers = CardCache(max_entries=max_answers)
+        self.contexts = CardCache(max_entries=max_contexts)
+        self.history = history
+        self.clock = clock
+        self.ttft_ms = []
+        self.total_ms = []
+        self.lock = threading.Lock()
+
+    def answer_key(self, question, lang, section, snapshot):
+        return (normalize_question(question), lang, section, snapshot)
+
+    def cached_answer(self, key):
+        """命中时返回 {"text", ...} (put 时传入的元信息)，否则 None"""
+        return self.answers.get(key)
+
+    def prepare_context(self, snapshot, rows, token_budget=3000):
+        """同一快照下同一组新闻的上下文只拼一次，返回 (context_text, tokens)"""
+        key = (snapshot, token_budget, tuple(row.get("id") for row in rows))
+        context = self.contexts.get(key)
+        if context is None:
+            context = build_context(rows, token_budget=token_budget)
+            self.contexts.put(key, context)
+        return context
+
+    def stream(self, key, model, prompt, metrics=None, meta=None):
+        """
+        生成器，逐块产出回答文字 (可以直接交给 st.write_stream)。
+        完整读完且不为空时才写入缓存；metrics 字典里会填上 ttft_ms / total_ms。
+        """
+        metrics = metrics if metrics is not None else {}
+        started = self.clock()
+        parts = []
+        for chunk in model.generate_content(prompt, stream=True):
+            text = chunk_text(chunk)
+            if not text:
+                continue
+            if not parts:
+                metrics["ttft_ms"] = (self.clock() - started) * 1000
+            parts.append(text)
+            yield text
+        metrics["total_ms"] = (self.clock() - started) * 1000
+        answer = "".join(parts)
+        if answer:
+            self.answers.put(key, dict(meta or {}, text=answer))
+            self._record(metrics)
+
+    def _record(self, metrics):
+        with self.lock:
+            self.ttft_ms = (self.ttft_ms + [metrics["ttft_ms"]])[-self.history:]
+            self.total_ms = (self.total_ms + [metrics["total_ms"]])[-self.history:]
+
+    def stats(self):
+        with self.lock:
+            ttft, total = list(self.ttft_ms), list(self.total_ms)
+        return {
+            "answers": self.answers.stats(),
+            "contexts": self.contexts.stats(),
+            "ttft_p50_ms": round(percentile(ttft, 50), 1),
+            "ttft_p95_ms": round(percentile(ttft, 95), 1),
+            "total_p50_ms": round(percentile(total, 50), 1),
+        }
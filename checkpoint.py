@@ -0,0 +1,193 @@
+import os
+import json
+import time
+import sqlite3
+import calendar
+import threading
+from url_dedup import normalize_url
+
+# ================= 断点续跑 =================
+# 每个频道记一个游标 (最新处理过的条目 id / 发布时间)，下次只看比游标新的条目；
+# 每篇文章记录处理到哪一步 (queued -> fetched -> summarized -> saved)，正文和 AI 结果一起存下来。
+# 任务中途被杀或者 Gemini 配额用完，下次运行从断点接着做，已经下载 / 分析过的不再重复。
+# 文章按归一化链接记录 (后面各阶段用的都是归一化链接)，同时保留 RSS 里的原始链接，
+# 续跑时交回去重阶段的是原始链接，老数据里存的原始链接也能对上。
+
+STAGES = ("queued", "fetched", "summarized", "saved")
+
+
+def entry_key(entry):
+    """RSS 条目的唯一标识：优先 id/guid，其次链接"""
+    return entry.get("id") or entry.get("link")
+
+
+def entry_published(entry):
+    """发布时间 (UTC 时间戳)，没有则返回 None"""
+    parsed = entry.get("published_parsed") or entry.get("updated_parsed")
+    return float(calendar.timegm(parsed)) if parsed else None
+
+
+def entries_after_cursor(entries, cursor):
+    """
+    返回比游标新的条目 (保持原顺序)。
+    有发布时间时按时间比较；没有时认为 RSS 从新到旧排列，遇到游标那条为止。
+    """
+    if not cursor:
+        return list(entries)
+    published = cursor.get("published")
+    fresh = []
+    for entry in entries:
+        if entry_key(entry) == cursor.get("entry_id"):
+            if published is None:
+                break
+            continue
+        ts = entry_published(entry)
+        if published is not None and ts is not None:
+            if ts > published:
+                fresh.append(entry)
+        else:
+            fresh.append(entry)
+    return fresh
+
+
+class CheckpointStore:
+    """
+    SQLite 存储，跨次运行保留 (GitHub Actions 里随 .pipeline_state 一起缓存)。
+    同一篇文章失败 max_attempts 次后不再自动重试，超过 retention_days 的记录会被清理。
+    """
+
+    def __init__(self, path, max_attempts=3, retention_days=7, clock=time.time):
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self.max_attempts = max_attempts
+        self.retention_days = retention_days
+        self.clock = clock
+        # 各阶段的回调在线程池里调用，连接共享所以要加锁
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS feed_cursors (
+                feed_url TEXT PRIMARY KEY,
+                entry_id TEXT,
+                published REAL,
+                updated_at REAL
+            );
+            CREATE TABLE IF NOT EXISTS articles (
+                url TEXT PRIMARY KEY,
+                link TEXT,
+                feed_url TEXT,
+                stage TEXT,
+                title TEXT,
+                content TEXT,
+                ai_data TEXT,
+                attempts INTEGER DEFAULT 0,
+                queued_at REAL,
+                updated_at REAL
+            );
+            CREATE INDEX IF NOT EXISTS idx_articles_feed_stage ON articles (feed_url, stage);
+        """)
+        # 旧版本的状态文件没有 link 列
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(articles)")}
+        if "link" not in columns:
+            self.conn.execute("ALTER TABLE articles ADD COLUMN link TEXT")
+        self.conn.commit()
+
+    # ---------- 频道游标 ----------
+
+    def get_cursor(self, feed_url):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT entry_id, published FROM feed_cursors WHERE feed_url = ?", (feed_url,)
+            ).fetchone()
+        return {"entry_id": row[0], "published": row[1]} if row else None
+
+    def advance(self, feed_url, entries, links):
+        """
+        把本次要处理的条目记为 queued，并把游标移到其中最新的一条。
+        links 是条目的原始链接；两步在同一个事务里，游标前进了就一定有对应的待处理记录。
+        """
+        if not entries:
+            return
+        now = self.clock()
+        newest = max(entries, key=lambda e: entry_published(e) or 0.0)
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO articles (url, link, feed_url, stage, queued_at, updated_at) "
+                "VALUES (?, ?, ?, 'queued', ?, ?)",
+                [(normalize_url(link), link, feed_url, now, now) for link in links],
+            )
+            self.conn.execute(
+                "INSERT OR REPLACE INTO feed_cursors (feed_url, entry_id, published, updated_at) VALUES (?, ?, ?, ?)",
+                (feed_url, entry_key(newest), entry_published(newest), now),
+            )
+
+    # ---------- 文章状态 ----------
+
+    def pending(self, feed_url):
+        """该频道上次没做完、还没超过重试次数的文章 (原始链接)，按入队顺序"""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT COALESCE(link, url) FROM articles WHERE feed_url = ? AND stage != 'saved' AND attempts < ? "
+                "ORDER BY queued_at",
+                (feed_url, self.max_attempts),
+            ).fetchall()
+        return [r[0] for r in rows]
+
+    def _update(self, url, sql, params):
+        with self.lock, self.conn:
+            self.conn.execute(sql + ", updated_at = ? WHERE url = ?", (*params, self.clock(), url))
+
+    def mark_fetched(self, url, title, content):
+        self._update(url, "UPDATE articles SET stage = 'fetched', title = ?, content = ?", (title, content))
+
+    def get_fetched(self, url):
+        """已经下载过的正文 (title, content)，没有则返回 None"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT title, content FROM articles WHERE url = ? AND content IS NOT NULL", (url,)
+            ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def mark_summarized(self, url, ai_data):
+        self._update(url, "UPDATE articles SET stage = 'summarized', ai_data = ?",
+                     (json.dumps(ai_data, ensure_ascii=False),))
+
+    def get_summary(self, url):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT ai_data FROM articles WHERE url = ? AND ai_data IS NOT NULL", (url,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def mark_failed(self, url):
+        self._update(url, "UPDATE articles SET attempts = attempts + 1", ())
+
+    def mark_saved(self, urls):
+        """入库成功、或者去重发现已经处理过时调用；正文和 AI 结果不再需要，清掉省空间"""
+        now = self.clock()
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "UPDATE articles SET stage = 'saved', content = NULL, ai_data = NULL, updated_at = ? WHERE url = ?",
+                [(now, url) for url in urls],
+            )
+
+    # ---------- 维护 ----------
+
+    def prune(self):
+        """清理超过保留期的记录 (已入库的和一直没做完的都算)"""
+        cutoff = self.clock() - self.retention_days * 24 * 3600
+        with self.lock, self.conn:
+            removed = self.conn.execute("DELETE FROM articles WHERE updated_at < ?", (cutoff,)).rowcount
+        return removed
+
+    def stats(self):
+        with self.lock:
+            rows = self.conn.execute("SELECT stage, COUNT(*) FROM articles GROUP BY stage").fetchall()
+            exhausted = self.conn.execute(
+                "SELECT COUNT(*) FROM articles WHERE stage != 'saved' AND attempts >= ?", (self.max_attempts,)
+            ).fetchone()[0]
+        counts = {stage: 0 for stage in STAGES}
+        counts.update(dict(rows))
+        counts["gave_up"] = exhausted
+        return counts
@@ -0,0 +1,124 @@
+import os
+import json
+import time
+import threading
+from urllib.parse import urlparse
+
+# ================= 频道配置与调度 =================
+# 频道列表放在 feeds.json 里：分类、来源名、轮询间隔、每次最多条数、优先级 (数字越小越先处理)。
+# GitHub Actions 每小时触发一次，FeedScheduler 决定这一轮哪些频道到期：
+# 按每个频道实际观察到的更新速度调整间隔，更新快的勤快点抓，几乎不更新的频道逐渐拉长间隔直接跳过。
+
+DEFAULT_POLL_MINUTES = 240
+DEFAULT_PRIORITY = 5
+
+
+def load_feeds(path, default_max_entries=3):
+    """
+    读取频道配置，补齐默认值并按优先级排序。
+    文件可以是 {"feeds": [...]} 或直接是列表；缺字段 / URL 重复时抛 ValueError。
+    """
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    items = data.get("feeds", []) if isinstance(data, dict) else data
+
+    feeds = []
+    seen = set()
+    for i, item in enumerate(items):
+        if not item.get("url") or not item.get("category"):
+            raise ValueError(f"❌ 频道配置第 {i + 1} 项缺少 url 或 category")
+        if item["url"] in seen:
+            raise ValueError(f"❌ 频道重复: {item['url']}")
+        seen.add(item["url"])
+        if item.get("enabled") is False:
+            continue
+        feed = dict(item)
+        feed["source"] = item.get("source") or urlparse(item["url"]).netloc or "Web"
+        feed["poll_minutes"] = float(item.get("poll_minutes", DEFAULT_POLL_MINUTES))
+        feed["max_entries"] = int(item.get("max_entries", default_max_entries))
+        feed["priority"] = int(item.get("priority", DEFAULT_PRIORITY))
+        feeds.append(feed)
+    return sorted(feeds, key=lambda feed: feed["priority"])
+
+
+class FeedScheduler:
+    """
+    每个频道记录上次轮询时间、平滑后的更新速度 (条/小时) 和当前间隔 (分钟)，存成 JSON 跟状态目录一起缓存。
+    - 第一次见到的频道用配置里的 poll_minutes
+    - 之后间隔取 “攒够 max_entries 条新内容大约要多久”，限制在 [min_minutes, max_minutes]
+    - 一直没有新内容的频道每次间隔翻倍
+    grace_minutes: 定时任务本身有抖动，差这么几分钟就到期的也算到期
+    """
+
+    def __init__(self, path, min_minutes=30, max_minutes=24 * 60, smoothing=0.5, grace_minutes=10,
+                 clock=time.time):
+        self.path = path
+        self.min_minutes = min_minutes
+        self.max_minutes = max_minutes
+        self.smoothing = smoothing
+        self.grace_minutes = grace_minutes
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.data = {}
+        if os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    self.data = json.load(f)
+            except (OSError, ValueError):
+                self.data = {}
+
+    def interval(self, feed):
+        """当前轮询间隔 (分钟)"""
+        return self.data.get(feed["url"], {}).get("interval", feed["poll_minutes"])
+
+    def next_due(self, feed):
+        state = self.data.get(feed["url"])
+        if not state or state.get("last_polled") is None:
+            return 0.0
+        return state["last_polled"] + self.interval(feed) * 60
+
+    def due(self, feeds):
+        """这一轮要抓的频道：按优先级，同优先级里逾期越久越靠前"""
+        now = self.clock()
+        ready = [feed for feed in feeds if self.next_due(feed) - now <= self.grace_minutes * 60]
+        return sorted(ready, key=lambda feed: (feed["priority"], self.next_due(feed)))
+
+    def record(self, feed, new_entries):
+        """频道抓取成功后调用，new_entries 是比游标新的条目数 (304 时为 0)"""
+        now = self.clock()
+        with self.lock:
+            state = self.data.setdefault(feed["url"], {})
+            last = state.get("last_polled")
+            state["last_polled"] = now
+            # 第一次抓取会拿到整个 RSS 的存量，不代表更新速度
+            if last is None:
+                return
+            hours = max((now - last) / 3600, 1 / 60)
+            observed = new_entries / hours
+            rate = state.get("rate")
+            rate = observed if rate is None else self.smoothing * observed + (1 - self.smoothing) * rate
+            state["rate"] = rate
+            if rate > 0:
+                interval = feed["max_entries"] / rate * 60
+            else:
+                interval = state.get("interval", feed["poll_minutes"]) * 2
+            state["interval"] = max(self.min_minutes, min(self.max_minutes, interval))
+
+    def commit(self):
+        with self.lock:
+            folder = os.path.dirname(self.path)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump(self.data, f, ensure_ascii=False, indent=2)
+
+    def stats(self, feeds):
+        now = self.clock()
+        return {
+            f"{feed['category']} / {feed['source']}": {
+                "interval_min": round(self.interval(feed)),
+                "rate_per_hour": round(self.data.get(feed["url"], {}).get("rate") or 0.0, 2),
+                "due_in_min": round(max(0.0, self.next_due(feed) - now) / 60),
+            }
+            for feed in feeds
+        }
@@ -0,0 +1,169 @@
+import os
+import json
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+# ================= 共享 HTTP 抓取层 =================
+# 所有 RSS 和正文下载共用一个 Session：按域名复用 keep-alive 连接池，自动 gzip 解压，
+# 响应体超过上限直接截断；RSS 额外带上 ETag / Last-Modified，没更新的频道只花一个 304。
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+
+
+class FetchResult:
+
+    def __init__(self, url, status, content=b"", headers=None, truncated=False):
+        self.url = url
+        self.status = status
+        self.content = content
+        # 服务器返回的响应头大小写不一定规范 (etag / content-type)，查的时候不区分大小写
+        self.headers = CaseInsensitiveDict(headers or {})
+        self.truncated = truncated
+        self.bytes_read = len(content)
+        # 流式读取时 on_chunk 要求提前断开
+        self.stopped_early = False
+
+    @property
+    def not_modified(self):
+        return self.status == 304
+
+    @property
+    def encoding(self):
+        content_type = self.headers.get("Content-Type", "")
+        if "charset=" in content_type:
+            return content_type.split("charset=", 1)[1].split(";")[0].strip()
+        return None
+
+    def text(self):
+        return self.content.decode(self.encoding or "utf-8", errors="replace")
+
+
+class HttpFetcher:
+    """
+    pool_hosts: 最多保留多少个域名的连接池
+    pool_per_host: 每个域名保留的 keep-alive 连接数，应不小于下载阶段的单域名并发
+    max_bytes: 单个响应最多读取的字节数
+    """
+
+    def __init__(self, timeout=10, max_bytes=2 * 1024 * 1024, pool_hosts=32, pool_per_host=4,
+                 user_agent=USER_AGENT):
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_hosts, pool_maxsize=pool_per_host)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({
+            "User-Agent": user_agent,
+            "Accept-Encoding": "gzip, deflate",
+        })
+
+    def get(self, url, headers=None, max_bytes=None):
+        limit = max_bytes or self.max_bytes
+        with self.session.get(url, headers=headers, timeout=self.timeout, stream=True) as resp:
+            if resp.status_code == 304:
+                return FetchResult(resp.url, 304, headers=resp.headers)
+            resp.raise_for_status()
+
+            chunks = []
+            size = 0
+            truncated = False
+            # iter_content 会自动解 gzip，按解压后的字节数计算上限
+            for chunk in resp.iter_content(chunk_size=64 * 1024):
+                chunks.append(chunk)
+                size += len(chunk)
+                if size >= limit:
+                    truncated = True
+                    break
+            content = b"".join(chunks)[:limit]
+            return FetchResult(resp.url, resp.status_code, content, resp.headers, truncated)
+
+    def stream(self, url, on_chunk, headers=None, max_bytes=None):
+        """
+        边下边处理：每读到一块就调用 on_chunk(chunk, response_headers)，返回 True 表示已经够了，提前断开。
+        不保留正文，返回的 FetchResult 只带状态、响应头和 bytes_read / stopped_early。
+        """
+        limit = max_bytes or self.max_bytes
+        with self.session.get(url, headers=headers, timeout=self.timeout, stream=True) as resp:
+            resp.raise_for_status()
+            response_headers = CaseInsensitiveDict(resp.headers)
+            size = 0
+            truncated = False
+            stopped = False
+            for chunk in resp.iter_content(chunk_size=16 * 1024):
+                chunk = chunk[:limit - size]
+                size += len(chunk)
+                if on_chunk(chunk, response_headers):
+                    stopped = True
+                    break
+                if size >= limit:
+                    truncated = True
+                    break
+            result = FetchResult(resp.url, resp.status_code, b"", response_headers, truncated)
+            result.bytes_read = size
+            result.stopped_early = stopped
+            return result
+
+    def close(self):
+        self.session.close()
+
+
+class FeedValidatorStore:
+    """
+    记录每个 RSS 的 ETag / Last-Modified。
+    新值先暂存，等本轮入库完成后再 commit，避免中途失败时把没处理的频道标记成“已读”。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.data = {}
+        if os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    self.data = json.load(f)
+            except (OSError, ValueError):
+                self.data = {}
+
+    def conditional_headers(self, url):
+        saved = self.data.get(url, {})
+        headers = {}
+        if saved.get("etag"):
+            headers["If-None-Match"] = saved["etag"]
+        if saved.get("last_modified"):
+            headers["If-Modified-Since"] = saved["last_modified"]
+        return headers
+
+    def stage(self, url, result):
+        validators = {
+            "etag": result.headers.get("ETag"),
+            "last_modified": result.headers.get("Last-Modified"),
+        }
+        if any(validators.values()):
+            with self.lock:
+                self.pending[url] = validators
+
+    def commit(self):
+        with self.lock:
+            self.data.update(self.pending)
+            self.pending = {}
+            folder = os.path.dirname(self.path)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump(self.data, f, ensure_ascii=False, indent=2)
+
+
+def fetch_feed(fetcher, validators, url):
+    """
+    条件请求 RSS，返回 FetchResult；304 表示频道没有更新。
+    validators 为 None 时每次都全量拉取。
+    """
+    headers = validators.conditional_headers(url) if validators else None
+    result = fetcher.get(url, headers=headers)
+    if validators and not result.not_modified:
+        validators.stage(url, result)
+    return result
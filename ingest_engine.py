@@ -0,0 +1,261 @@
+import os
+import math
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+# ================= 并发抓取引擎 =================
+# RSS 读取、正文下载、AI 分析各自有独立的并发上限，下载再按域名限流。
+# feedparser / newspaper / Gemini / Supabase 都是阻塞调用，统一用 asyncio.to_thread 丢进线程池。
+
+
+class PipelineLimits:
+    """各阶段的并发上限，全部设为 1 即等价于原来的串行流程"""
+
+    def __init__(self, feeds=4, download=8, llm=2, db=4, per_host=2, llm_cooldown=0.0, llm_batch=5):
+        self.feeds = feeds
+        self.download = download
+        self.llm = llm
+        self.db = db
+        self.per_host = per_host
+        # 每次 AI 调用后占住名额的冷却时间（秒）；节流已经交给 rate_limiter 按 RPM / TPM 控制，默认不再固定等待
+        self.llm_cooldown = llm_cooldown
+        # 每次 AI 调用打包的文章数
+        self.llm_batch = llm_batch
+
+    @classmethod
+    def from_env(cls):
+        """从环境变量读取，例如 CONCURRENCY_DOWNLOAD=16"""
+        defaults = cls()
+        return cls(
+            feeds=int(os.environ.get("CONCURRENCY_FEEDS", defaults.feeds)),
+            download=int(os.environ.get("CONCURRENCY_DOWNLOAD", defaults.download)),
+            llm=int(os.environ.get("CONCURRENCY_LLM", defaults.llm)),
+            db=int(os.environ.get("CONCURRENCY_DB", defaults.db)),
+            per_host=int(os.environ.get("CONCURRENCY_PER_HOST", defaults.per_host)),
+            llm_cooldown=float(os.environ.get("LLM_COOLDOWN", defaults.llm_cooldown)),
+            llm_batch=int(os.environ.get("LLM_BATCH_SIZE", defaults.llm_batch)),
+        )
+
+    @classmethod
+    def sequential(cls):
+        return cls(feeds=1, download=1, llm=1, db=1, per_host=1, llm_batch=1)
+
+    def __repr__(self):
+        return (f"PipelineLimits(feeds={self.feeds}, download={self.download}, llm={self.llm}, "
+                f"db={self.db}, per_host={self.per_host}, llm_cooldown={self.llm_cooldown}, "
+                f"llm_batch={self.llm_batch})")
+
+
+def percentile(values, pct):
+    """最近秩法求分位数"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+class StageTimer:
+    """
+    记录每个阶段的耗时。并发下各任务会重叠，所以同时记录：
+    - wall: 该阶段第一个任务开始到最后一个任务结束的墙钟时间
+    - busy: 所有任务耗时之和
+    """
+
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.stages = {}
+
+    def record(self, stage, started, ended):
+        s = self.stages.setdefault(
+            stage, {"count": 0, "busy": 0.0, "first": started, "last": ended, "samples": []}
+        )
+        s["count"] += 1
+        s["busy"] += ended - started
+        s["first"] = min(s["first"], started)
+        s["last"] = max(s["last"], ended)
+        s["samples"].append(ended - started)
+
+    def span(self, stage):
+        return _Span(self, stage)
+
+    def summary(self):
+        return {
+            stage: {
+                "count": s["count"],
+                "wall": s["last"] - s["first"],
+                "busy": s["busy"],
+                "p50": percentile(s["samples"], 50),
+                "p95": percentile(s["samples"], 95),
+                "p99": percentile(s["samples"], 99),
+            }
+            for stage, s in self.stages.items()
+        }
+
+    def report(self, total=None):
+        print("\n⏱️ 阶段耗时:")
+        for stage, s in self.summary().items():
+            print(f"   {stage:<10} 次数 {s['count']:>4}  墙钟 {s['wall']:7.2f}s  累计 {s['busy']:7.2f}s")
+        if total is not None:
+            print(f"   {'total':<10} 墙钟 {total:7.2f}s")
+
+
+class _Span:
+    def __init__(self, timer, stage):
+        self.timer = timer
+        self.stage = stage
+
+    def __enter__(self):
+        self.started = self.timer.clock()
+        return self
+
+    def __exit__(self, *exc):
+        self.timer.record(self.stage, self.started, self.timer.clock())
+        return False
+
+
+class HostLimiter:
+    """按域名分配信号量，避免同一站点被并发打爆"""
+
+    def __init__(self, per_host):
+        self.per_host = per_host
+        self._sems = {}
+
+    def get(self, url):
+        host = urlparse(url).netloc.lower()
+        if host not in self._sems:
+            self._sems[host] = asyncio.Semaphore(self.per_host)
+        return self._sems[host]
+
+
+def _priority(config):
+    return config.get("priority", 0)
+
+
+class IngestEngine:
+    """
+    handlers 需要提供以下阻塞函数：
+    - fetch_feed(feed_config) -> [entry_url, ...]
+    - dedup([(feed_config, url), ...]) -> 需要处理的 [(feed_config, url), ...]
+    - download(url) -> (title, content)；提供了 parse 时改为返回原始网页 (任意非空对象)
+    - parse([raw, ...]) -> 与输入对齐的 [(title, content), ...]，整批一次调用，方便交给进程池 (可选)
+    - cluster([article, ...]) -> 每簇一篇代表 [article, ...] (可选)
+    - summarize([article, ...]) -> 与输入对齐的 [ai_data 或 None, ...]
+    - save(article, ai_data)
+
+    article 是 {"id", "config", "url", "title", "content"} 字典。
+    feed_config 里可选 max_entries (覆盖引擎默认值) 和 priority (数字越小越先处理，整轮各阶段都按它排队)。
+    """
+
+    def __init__(self, handlers, limits=None, max_entries=3, timer=None):
+        self.handlers = handlers
+        self.limits = limits or PipelineLimits()
+        self.max_entries = max_entries
+        self.timer = timer or StageTimer()
+
+    async def _timed(self, stage, func, *args):
+        with self.timer.span(stage):
+            return await asyncio.to_thread(func, *args)
+
+    async def _run_feed(self, config):
+        async with self._feed_sem, self._hosts.get(config["url"]):
+            try:
+                urls = await self._timed("feed", self.handlers["fetch_feed"], config)
+            except Exception as e:
+                print(f"⚠️ RSS 错误 ({config['category']}): {e}")
+                return []
+        print(f"🌊 频道 {config['category']} 读取到 {len(urls)} 条")
+        return [(config, url) for url in urls[:config.get("max_entries", self.max_entries)]]
+
+    async def _download(self, index, config, url):
+        try:
+            async with self._download_sem, self._hosts.get(url):
+                result = await self._timed("download", self.handlers["download"], url)
+        except Exception as e:
+            print(f"⚠️ 下载失败 {url}: {e}")
+            return None
+        if "parse" in self.handlers:
+            return {"id": index, "config": config, "url": url, "raw": result} if result else None
+        title, content = result
+        if not content:
+            return None
+        return {"id": index, "config": config, "url": url, "title": title, "content": content}
+
+    async def _parse(self, downloaded):
+        """下载完的原始网页整批解析，解析失败 (content 为空) 的丢掉"""
+        try:
+            parsed = await self._timed("parse", self.handlers["parse"], [a.pop("raw") for a in downloaded])
+        except Exception as e:
+            print(f"⚠️ 正文解析失败: {e}")
+            return []
+        articles = []
+        for article, (title, content) in zip(downloaded, parsed):
+            if content:
+                article["title"] = title
+                article["content"] = content
+                articles.append(article)
+        return articles
+
+    async def _summarize(self, batch):
+        async with self._llm_sem:
+            print(f"   🧠 AI 分析中 ({len(batch)} 篇)...")
+            try:
+                results = await self._timed("summarize", self.handlers["summarize"], batch)
+            except Exception as e:
+                print(f"⚠️ AI 分析失败: {e}")
+                results = [None] * len(batch)
+            if self.limits.llm_cooldown:
+                await asyncio.sleep(self.limits.llm_cooldown)
+        await asyncio.gather(*[
+            self._save(article, ai_data) for article, ai_data in zip(batch, results) if ai_data
+        ])
+
+    async def _save(self, article, ai_data):
+        try:
+            async with self._db_sem:
+                await self._timed("save", self.handlers["save"], article, ai_data)
+        except Exception as e:
+            print(f"⚠️ 入库失败 {article['url']}: {e}")
+
+    async def run_async(self, feeds):
+        # 线程池要够所有阶段同时占满，否则计时里会混入排队时间
+        limits = self.limits
+        workers = limits.feeds + limits.download + limits.llm + limits.db
+        asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=workers))
+        # 信号量必须在事件循环内创建
+        self._feed_sem = asyncio.Semaphore(self.limits.feeds)
+        self._download_sem = asyncio.Semaphore(self.limits.download)
+        self._llm_sem = asyncio.Semaphore(self.limits.llm)
+        self._db_sem = asyncio.Semaphore(self.limits.db)
+        self._hosts = HostLimiter(self.limits.per_host)
+
+        # 信号量按先来先得放行，任务按优先级创建即可让高优先级频道先下载、先分析
+        feeds = sorted(feeds, key=_priority)
+
+        # 1. 所有频道并行读取  2. 候选链接一次性批量去重  3. 并发下载正文 (可选：整批交给进程池解析)
+        results = await asyncio.gather(*[self._run_feed(config) for config in feeds])
+        candidates = [item for items in results for item in items]
+        entries = await self._timed("dedup", self.handlers["dedup"], candidates)
+        downloaded = await asyncio.gather(*[
+            self._download(i, config, url) for i, (config, url) in enumerate(entries)
+        ])
+        articles = [a for a in downloaded if a]
+        if "parse" in self.handlers:
+            articles = await self._parse(articles)
+        if "cluster" in self.handlers:
+            articles = await self._timed("cluster", self.handlers["cluster"], articles)
+        articles.sort(key=lambda article: (_priority(article["config"]), article["id"]))
+
+        # 4. 多篇打包成一次 AI 调用，批次之间并发  5. 入库
+        size = max(1, limits.llm_batch)
+        batches = [articles[i:i + size] for i in range(0, len(articles), size)]
+        await asyncio.gather(*[self._summarize(batch) for batch in batches])
+
+    def run(self, feeds):
+        started = time.perf_counter()
+        asyncio.run(self.run_async(feeds))
+        total = time.perf_counter() - started
+        self.timer.report(total)
+        return self.timer.summary()
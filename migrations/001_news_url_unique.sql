@@ -0,0 +1,7 @@
+-- 批量 upsert 按 url 去重，需要 url 上有唯一约束
+-- 如果已有重复数据，先保留每个 url 最早的一条
+delete from news a
+using news b
+where a.url = b.url and a.id > b.id;
+
+alter table news add constraint news_url_key unique (url);
@@ -0,0 +1,5 @@
+-- 相似新闻聚类：同簇共用 cluster_id，非代表行的 duplicate_of 指向代表新闻的 url
+alter table news add column if not exists cluster_id text;
+alter table news add column if not exists duplicate_of text;
+
+create index if not exists news_cluster_id_idx on news (cluster_id);
@@ -0,0 +1,5 @@
+-- 入库时预先生成的中英文摘要和关键数据，老数据为空，由前端按需翻译
+alter table news add column if not exists summary_cn text;
+alter table news add column if not exists summary_en text;
+alter table news add column if not exists key_stats_cn text;
+alter table news add column if not exists key_stats_en text;
@@ -0,0 +1,4 @@
+-- 检索增强聊天：每条新闻的 embedding (text-embedding-004, 768 维)
+create extension if not exists vector;
+
+alter table news add column if not exists embedding vector(768);
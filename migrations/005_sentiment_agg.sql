@@ -0,0 +1,32 @@
+-- 情绪聚合表：按 (分类, 小时/天) 保存 count / sum / mean / min / max / ewma
+-- category = '__all__' 为全部分类的汇总；由 news_cloud 入库后增量更新
+create table if not exists sentiment_agg (
+    category text not null,
+    granularity text not null check (granularity in ('hour', 'day')),
+    bucket_start timestamptz not null,
+    count integer not null default 0,
+    sum double precision not null default 0,
+    mean double precision,
+    min integer,
+    max integer,
+    ewma double precision,
+    updated_at timestamptz default now(),
+    primary key (category, granularity, bucket_start)
+);
+
+-- 用已有新闻回填 (回填时 ewma 先用当桶均值代替)
+-- 和增量更新 (sentiment_agg.group_scores) 一致：相似新闻的关联行和代表共用一个分数，不重复计入
+insert into sentiment_agg (category, granularity, bucket_start, count, sum, mean, min, max, ewma)
+select category, g.granularity, date_trunc(g.granularity, created_at) as bucket_start,
+       count(*), sum(sentiment_score), avg(sentiment_score),
+       min(sentiment_score), max(sentiment_score), avg(sentiment_score)
+from (
+    select coalesce(category, 'Other') as category, created_at, sentiment_score from news
+    where sentiment_score is not null and duplicate_of is null
+    union all
+    select '__all__', created_at, sentiment_score from news
+    where sentiment_score is not null and duplicate_of is null
+) n
+cross join (values ('hour'), ('day')) as g(granularity)
+group by 1, 2, 3
+on conflict (category, granularity, bucket_start) do nothing;
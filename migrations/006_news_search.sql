@@ -0,0 +1,42 @@
+-- 新闻搜索 (可选)：标题 / 标签 / 摘要的全文索引 + 标签 GIN 索引，app.py 设置 SEARCH_BACKEND=postgres 时使用
+-- 用 simple 配置 (不做词干 / 停用词)；中文没有分词，按整段匹配，中文搜索效果不如 app 内置的本地索引
+alter table news add column if not exists search_tsv tsvector;
+
+create or replace function news_search_tsv_of(title text, tags text[], summary_en text, content_summary text)
+returns tsvector language sql immutable as $$
+    select setweight(to_tsvector('simple', coalesce(title, '')), 'A')
+        || setweight(to_tsvector('simple', coalesce(array_to_string(tags, ' '), '')), 'A')
+        || setweight(to_tsvector('simple', coalesce(summary_en, '') || ' ' || coalesce(content_summary, '')), 'B')
+$$;
+
+create or replace function news_search_tsv_trigger() returns trigger language plpgsql as $$
+begin
+    new.search_tsv := news_search_tsv_of(new.title, new.tags, new.summary_en, new.content_summary);
+    return new;
+end
+$$;
+
+drop trigger if exists news_search_tsv on news;
+create trigger news_search_tsv
+    before insert or update of title, tags, summary_en, content_summary on news
+    for each row execute function news_search_tsv_trigger();
+
+-- 回填已有新闻
+update news set search_tsv = news_search_tsv_of(title, tags, summary_en, content_summary)
+where search_tsv is null;
+
+create index if not exists news_search_tsv_idx on news using gin (search_tsv);
+create index if not exists news_tags_idx on news using gin (tags);
+
+-- 按相关度 (同分按时间) 排序；q 为空时只按分类 / 标签筛选，按时间倒序
+create or replace function search_news(q text default null, cats text[] default null, tag text default null,
+                                       max_rows integer default 50)
+returns setof news language sql stable as $$
+    select n.* from news n
+    where (q is null or n.search_tsv @@ websearch_to_tsquery('simple', q))
+      and (cats is null or n.category = any(cats))
+      and (tag is null or n.tags @> array[tag])
+    order by case when q is null then 0 else ts_rank(n.search_tsv, websearch_to_tsquery('simple', q)) end desc,
+             n.created_at desc
+    limit max_rows
+$$;
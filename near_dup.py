@@ -0,0 +1,109 @@
+import re
+import hashlib
+
+# ================= 相似新闻聚类 =================
+# 同一事件常被多个源报道 (比如两个 Macro & Market 源)。
+# 用 MinHash 估计正文的 Jaccard 相似度，LSH 分桶找候选对，并查集合并成簇，
+# 每簇只挑一篇代表去做 AI 摘要，其余作为关联行入库。
+
+NUM_PERM = 64
+BANDS = 16          # 16 个 band × 4 行，相似度 ~0.5 以上大概率落进同一桶
+SHINGLE_SIZE = 5
+_MERSENNE = (1 << 61) - 1
+
+# 固定种子生成的哈希参数，保证每次运行签名一致
+_PARAMS = []
+for _i in range(NUM_PERM):
+    _seed = hashlib.blake2b(f"minhash-{_i}".encode(), digest_size=16).digest()
+    _PARAMS.append((int.from_bytes(_seed[:8], "big") % _MERSENNE | 1, int.from_bytes(_seed[8:], "big") % _MERSENNE))
+
+
+def shingles(text, size=SHINGLE_SIZE):
+    """英文按单词取 n-gram，中文按字取 n-gram"""
+    tokens = re.findall(r"[a-z0-9]+|[\u4e00-\u9fff]", (text or "").lower())
+    if len(tokens) < size:
+        return {" ".join(tokens)} if tokens else set()
+    return {" ".join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)}
+
+
+def minhash_signature(text):
+    hashes = [
+        int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "big")
+        for s in shingles(text)
+    ]
+    if not hashes:
+        return None
+    return tuple(min((a * h + b) % _MERSENNE for h in hashes) for a, b in _PARAMS)
+
+
+def estimate_similarity(sig_a, sig_b):
+    if sig_a is None or sig_b is None:
+        return 0.0
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / len(sig_a)
+
+
+def cluster_ids(signatures, threshold=0.5):
+    """
+    signatures: {id: signature}
+    返回 [[id, ...], ...]，每个列表是一个簇 (包括只有一篇的)
+    """
+    parent = {key: key for key in signatures}
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    rows = NUM_PERM // BANDS
+    buckets = {}
+    for key, sig in signatures.items():
+        if sig is None:
+            continue
+        for band in range(BANDS):
+            buckets.setdefault((band, sig[band * rows:(band + 1) * rows]), []).append(key)
+
+    checked = set()
+    for members in buckets.values():
+        for i, a in enumerate(members):
+            for b in members[i + 1:]:
+                pair = (a, b) if str(a) < str(b) else (b, a)
+                if pair in checked:
+                    continue
+                checked.add(pair)
+                if estimate_similarity(signatures[a], signatures[b]) >= threshold:
+                    parent[find(a)] = find(b)
+
+    groups = {}
+    for key in signatures:
+        groups.setdefault(find(key), []).append(key)
+    return list(groups.values())
+
+
+def make_cluster_id(url):
+    return hashlib.sha1(url.encode("utf-8")).hexdigest()[:12]
+
+
+def cluster_articles(articles, threshold=0.5):
+    """
+    articles: [{"id", "url", "title", "content", ...}, ...]
+    返回每簇的代表文章 (正文最长的那篇)，代表上带 "cluster_id" 和 "duplicates" (同簇其余文章)。
+    """
+    by_id = {article["id"]: article for article in articles}
+    signatures = {
+        article["id"]: minhash_signature(f"{article.get('title') or ''} {article['content']}")
+        for article in articles
+    }
+
+    representatives = []
+    for group in cluster_ids(signatures, threshold):
+        members = sorted((by_id[key] for key in group), key=lambda a: len(a["content"]), reverse=True)
+        rep = dict(members[0])
+        rep["cluster_id"] = make_cluster_id(rep["url"])
+        rep["duplicates"] = members[1:]
+        representatives.append(rep)
+
+    merged = len(articles) - len(representatives)
+    if merged:
+        print(f"🧩 相似新闻聚类: {len(articles)} 篇合并为 {len(representatives)} 簇，省下 {merged} 次摘要")
+    return representatives
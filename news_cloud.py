@@ -1,40 +1,34 @@
 import os
+import sys
 import time
-import json
-import re
+import threading
 import feedparser
 import google.generativeai as genai
 from newspaper import Article, Config
 from supabase import create_client, Client
+from ingest_engine import IngestEngine, PipelineLimits
+from url_dedup import SeenUrlStore, filter_new_entries, normalize_url
+from bulk_writer import BufferedNewsWriter
+from batch_summarizer import BatchSummarizer
+from summary_cache import SummaryCache
+from near_dup import cluster_articles
+from http_fetch import HttpFetcher, FeedValidatorStore, fetch_feed
+from article_extract import extract_streaming
+from parse_pool import ParsePool, MIN_EXTRACT_CHARS
+from translation import translate_summaries
+from vector_index import GeminiEmbedder, embedding_text
+from token_estimate import estimate_tokens
+from sentiment_agg import update_sentiment_aggregates
+from checkpoint import CheckpointStore, entries_after_cursor
+from feed_registry import load_feeds, FeedScheduler
+from rate_limiter import RateLimiter, RetryScheduler, LimitedModel, PRIORITY_TRANSLATION, PRIORITY_BACKGROUND
+from run_metrics import RunMetrics
 
 # ================= 配置区域 =================
 GOOGLE_API_KEY = os.environ.get("GOOGLE_API_KEY")
 SUPABASE_URL = os.environ.get("SUPABASE_URL")
 SUPABASE_KEY = os.environ.get("SUPABASE_KEY")
 
-RSS_CONFIGS = [
-    {
-        "category": "🤖 AI & Tech",
-        "url": "https://techcrunch.com/category/artificial-intelligence/feed/"
-    },
-    {
-        "category": "₿ Crypto",
-        "url": "https://www.coindesk.com/arc/outboundfeeds/rss/"
-    },
-    {
-        "category": "💰 Macro & Market", # 宏观与市场
-        "url": "https://search.cnbc.com/rs/search/combinedcms/view.xml?partnerId=wrss01&id=10000664" # CNBC Finance
-    },
-    {
-        "category": "💰 Macro & Market", 
-        "url": "https://feeds.content.dowjones.io/public/rss/mw_topstories" # MarketWatch
-    },
-    {
-        "category": "📱 Gadgets & Tech", 
-        "url": "https://www.theverge.com/rss/index.xml" # The Verge
-    }
-]
-
 if not GOOGLE_API_KEY or not SUPABASE_KEY:
     raise ValueError("❌ API Key 缺失")
 
@@ -42,132 +36,481 @@ genai.configure(api_key=GOOGLE_API_KEY)
 supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
 MODEL_NAME = 'gemini-2.0-flash'
 
+# 每个源抓取条数 (feeds.json 里没写 max_entries 时的默认值)，并发模式下可以适当调大
+MAX_ENTRIES_PER_FEED = int(os.environ.get("MAX_ENTRIES_PER_FEED", "3"))
+
+# 频道列表：分类 / 来源名 / 轮询间隔 / 每次最多条数 / 优先级，见 feeds.json
+FEEDS_FILE = os.environ.get("FEEDS_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "feeds.json"))
+FEEDS = load_feeds(FEEDS_FILE, default_max_entries=MAX_ENTRIES_PER_FEED)
+
+# 本地状态目录 (去重索引等)，GitHub Actions 里通过 actions/cache 在两次运行之间保留
+STATE_DIR = os.environ.get("PIPELINE_STATE_DIR", ".pipeline_state")
+seen_store = SeenUrlStore(os.path.join(STATE_DIR, "seen_urls.sqlite"))
+
+# 断点续跑：频道游标 + 每篇文章处理到哪一步；同一篇最多自动重试几次
+CHECKPOINT_MAX_ATTEMPTS = int(os.environ.get("CHECKPOINT_MAX_ATTEMPTS", "3"))
+checkpoints = CheckpointStore(os.path.join(STATE_DIR, "checkpoints.sqlite"), max_attempts=CHECKPOINT_MAX_ATTEMPTS)
+
+# 频道调度：按观察到的更新速度决定每个频道多久抓一次，间隔限制在 [最短, 最长] 分钟之间
+FEED_MIN_MINUTES = float(os.environ.get("FEED_MIN_MINUTES", "30"))
+FEED_MAX_MINUTES = float(os.environ.get("FEED_MAX_MINUTES", str(24 * 60)))
+feed_scheduler = FeedScheduler(
+    os.path.join(STATE_DIR, "feed_schedule.json"),
+    min_minutes=FEED_MIN_MINUTES,
+    max_minutes=FEED_MAX_MINUTES,
+)
+
+# 批量入库：每批条数 / 失败重试次数
+WRITE_BATCH_SIZE = int(os.environ.get("WRITE_BATCH_SIZE", "20"))
+WRITE_MAX_RETRIES = int(os.environ.get("WRITE_MAX_RETRIES", "3"))
+
+# AI 摘要缓存：过期时间 (秒) / 最多保留条数
+SUMMARY_CACHE_TTL = int(os.environ.get("SUMMARY_CACHE_TTL", str(7 * 24 * 3600)))
+SUMMARY_CACHE_MAX_ENTRIES = int(os.environ.get("SUMMARY_CACHE_MAX_ENTRIES", "5000"))
+
+# 相似新闻聚类阈值 (MinHash 估计的 Jaccard 相似度)
+NEAR_DUP_THRESHOLD = float(os.environ.get("NEAR_DUP_THRESHOLD", "0.5"))
+
+# 单个响应最多读取的字节数
+MAX_RESPONSE_BYTES = int(os.environ.get("MAX_RESPONSE_BYTES", str(2 * 1024 * 1024)))
+
+# 正文抽取方式：stream (边下边解析，攒够 AI 用的字数就停) / newspaper (整页下载后全量解析)
+EXTRACT_MODE = os.environ.get("EXTRACT_MODE", "stream")
+
+# 正文解析进程数：0 表示下载线程里就地解析 (stream 模式可以边下边停)；
+# 大于 0 时下载只取原始网页，整批按 PARSE_CHUNKSIZE 一块分给多个进程解析，绕开 GIL
+PARSE_WORKERS = int(os.environ.get("PARSE_WORKERS", "0"))
+PARSE_CHUNKSIZE = int(os.environ.get("PARSE_CHUNKSIZE", "4"))
+
+# 运行报告：每次运行写一份 JSON，并追加一行到历史文件；设置 METRICS_PROM_PATH 时另写一份 Prometheus 文本格式
+RUN_REPORT_PATH = os.environ.get("RUN_REPORT_PATH", os.path.join(STATE_DIR, "run_report.json"))
+RUN_HISTORY_PATH = os.environ.get("RUN_HISTORY_PATH", os.path.join(STATE_DIR, "run_history.jsonl"))
+METRICS_PROM_PATH = os.environ.get("METRICS_PROM_PATH")
+metrics = RunMetrics()
+
 # ================= 辅助函数 =================
 
-def clean_json_text(text):
-    """清理 AI 可能返回的 Markdown 格式符号，提取纯 JSON"""
-    # 移除 ```json 和 ``` 
-    text = re.sub(r'```json\s*', '', text)
-    text = re.sub(r'```\s*', '', text)
-    return text.strip()
+# 所有下载共用一个连接池；RSS 的 ETag / Last-Modified 存在状态目录里
+fetcher = HttpFetcher(
+    timeout=10,
+    max_bytes=MAX_RESPONSE_BYTES,
+    pool_per_host=int(os.environ.get("CONCURRENCY_PER_HOST", "2")),
+)
+feed_validators = FeedValidatorStore(os.path.join(STATE_DIR, "feed_validators.json"))
 
-def check_if_exists(url):
-    try:
-        response = supabase.table("news").select("id").eq("url", url).execute()
-        return len(response.data) > 0
-    except Exception:
-        return False
+# newspaper 只负责解析，下载交给 fetcher
+article_config = Config()
+article_config.browser_user_agent = fetcher.session.headers["User-Agent"]
+article_config.request_timeout = 10
+article_config.fetch_images = False
+
+parsers = ParsePool(PARSE_WORKERS, PARSE_CHUNKSIZE, mode=EXTRACT_MODE)
+
+extract_stats = {"articles": 0, "bytes": 0, "parse_ms": 0.0, "early_stops": 0, "fallbacks": 0}
+_extract_lock = threading.Lock()
+
+def record_extract(url, mode, bytes_read, parse_ms, stopped_early=False):
+    with _extract_lock:
+        extract_stats["articles"] += 1
+        extract_stats["bytes"] += bytes_read
+        extract_stats["parse_ms"] += parse_ms
+        extract_stats["early_stops"] += int(stopped_early)
+        extract_stats["fallbacks"] += int(mode == "fallback")
+    note = "，够字数提前停止" if stopped_early else ""
+    print(f"📄 {mode} 读取 {bytes_read / 1024:.0f}KB，解析 {parse_ms:.1f}ms{note}: {url}")
+
+def parse_with_newspaper(url):
+    """整页下载后用 newspaper 解析，返回 (title, text, 读取字节数, 解析毫秒)"""
+    result = fetcher.get(url)
+    started = time.perf_counter()
+    article = Article(url, config=article_config)
+    article.download(input_html=result.text())
+    article.parse()
+    return article.title, article.text, result.bytes_read, (time.perf_counter() - started) * 1000
 
 def get_article_content(url):
-    config = Config()
-    config.browser_user_agent = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-    config.request_timeout = 10
     try:
-        article = Article(url, config=config)
-        article.download()
-        article.parse()
-        return article.title, article.text
-    except Exception:
+        mode = EXTRACT_MODE
+        stopped_early = False
+        if EXTRACT_MODE == "stream":
+            extracted = extract_streaming(fetcher, url)
+            title, text = extracted.title, extracted.text
+            bytes_read, parse_ms, stopped_early = extracted.bytes_read, extracted.parse_ms, extracted.stopped_early
+            if len(text) < MIN_EXTRACT_CHARS:
+                mode = "fallback"
+                title, text, more_bytes, more_ms = parse_with_newspaper(url)
+                bytes_read += more_bytes
+                parse_ms += more_ms
+        else:
+            title, text, bytes_read, parse_ms = parse_with_newspaper(url)
+    except Exception as e:
+        metrics.inc("download_failures")
+        print(f"⚠️ 正文下载 / 解析失败 {url}: {e}")
         return None, None
+    metrics.inc("articles_downloaded")
+    record_extract(url, mode, bytes_read, parse_ms, stopped_early)
+    return title, text
+
+# 强制 AI 输出 JSON 的 Prompt
+SYSTEM_INSTRUCTION = """
+你是一位金融数据分析引擎。不要输出任何 Markdown 格式或废话。
+请阅读新闻，返回且仅返回一个符合 Python 解析标准的 JSON 字符串。
+
+JSON 结构要求：
+{
+    "summary": "30字以内的中文核心摘要",
+    "key_stats": "关键数据列表（字符串，换行分隔）。请使用自然语言描述每条数据背景，并将核心数值（如金额、百分比、时间等）用双大括号包裹 {{...}}。例如：'xLight从美国商务部获得的初步交易金额上限为 {{$1.5亿}}'。不要使用 '数值: 描述' 的格式，必须是完整的句子。",
+    "sentiment_score": 一个整数 (-10 代表极度利空, 0 代表中性, 10 代表极度利好),
+    "tags": ["标签1", "标签2", "标签3"]
+}
+"""
+
+# 批量模式：一次读多篇，按 id 返回 JSON 数组
+BATCH_SYSTEM_INSTRUCTION = SYSTEM_INSTRUCTION + """
+接下来会给你多篇新闻，每篇以 "=== 新闻 id: X ===" 开头。
+请返回一个 JSON 数组，每篇新闻对应一个对象，对象中额外包含 "id" 字段（与输入的 id 相同），其余字段结构同上。
+"""
+
+# 入库前一次性生成整批摘要的中英文版本
+TRANSLATE_SYSTEM_INSTRUCTION = "你是一位专业的金融科技新闻翻译，只输出 JSON。"
+
+# 检索增强聊天用的 embedding，入库时一起算好
+embedder = GeminiEmbedder(genai)
+
+# 所有 Gemini 调用共用的限流 + 重试：每分钟请求数 / token 数 / 可重试错误的最多重试次数
+GEMINI_RPM = int(os.environ.get("GEMINI_RPM", "15"))
+GEMINI_TPM = int(os.environ.get("GEMINI_TPM", "1000000"))
+GEMINI_MAX_RETRIES = int(os.environ.get("GEMINI_MAX_RETRIES", "4"))
+gemini = RetryScheduler(RateLimiter(rpm=GEMINI_RPM, tpm=GEMINI_TPM), max_retries=GEMINI_MAX_RETRIES)
+
+_models = {}
+
+def get_model(system_instruction, priority=PRIORITY_BACKGROUND):
+    """同一个 system prompt 只创建一次 GenerativeModel，并要求直接输出 JSON；调用走共享限流"""
+    key = (system_instruction, priority)
+    if key not in _models:
+        model = genai.GenerativeModel(
+            model_name=MODEL_NAME,
+            system_instruction=system_instruction,
+            generation_config={"response_mime_type": "application/json"},
+        )
+        _models[key] = LimitedModel(model, gemini, priority, observer=metrics.observe_llm)
+    return _models[key]
+
+# 转载 / 重抓的同一篇文章直接复用之前的摘要
+summary_cache = SummaryCache(
+    os.path.join(STATE_DIR, "summary_cache.sqlite"),
+    ttl=SUMMARY_CACHE_TTL,
+    max_entries=SUMMARY_CACHE_MAX_ENTRIES,
+)
+
+summarizer = BatchSummarizer(
+    batch_model=get_model(BATCH_SYSTEM_INSTRUCTION),
+    single_model=get_model(SYSTEM_INSTRUCTION),
+    cache=summary_cache,
+    cache_scope=(MODEL_NAME, SYSTEM_INSTRUCTION),
+)
 
 def ai_summarize_structured(title, content):
     """
-    让 AI 返回严格的 JSON 格式
-    """
-    # 强制 AI 输出 JSON 的 Prompt
-    system_instruction = """
-    你是一位金融数据分析引擎。不要输出任何 Markdown 格式或废话。
-    请阅读新闻，返回且仅返回一个符合 Python 解析标准的 JSON 字符串。
-    
-    JSON 结构要求：
-    {
-        "summary": "30字以内的中文核心摘要",
-        "key_stats": "关键数据列表（字符串，换行分隔）。请使用自然语言描述每条数据背景，并将核心数值（如金额、百分比、时间等）用双大括号包裹 {{...}}。例如：'xLight从美国商务部获得的初步交易金额上限为 {{$1.5亿}}'。不要使用 '数值: 描述' 的格式，必须是完整的句子。",
-        "sentiment_score": 一个整数 (-10 代表极度利空, 0 代表中性, 10 代表极度利好),
-        "tags": ["标签1", "标签2", "标签3"]
-    }
+    让 AI 返回严格的 JSON 格式，解析或校验失败返回 None，跳过这条新闻
     """
-    
-    model = genai.GenerativeModel(model_name=MODEL_NAME, system_instruction=system_instruction)
-    
-    try:
-        # 截取前 6000 字符防止 Token 溢出
-        response = model.generate_content(f"新闻标题：{title}\n\n内容：{content[:6000]}")
-        raw_text = response.text
-        
-        # 清理并解析 JSON
-        json_str = clean_json_text(raw_text)
-        data = json.loads(json_str)
-        return data
-        
-    except Exception as e:
-        print(f"❌ JSON 解析失败: {e}")
-        # 如果解析失败，返回 None，跳过这条新闻
-        return None
+    return summarizer.summarize_one(title, content)
 
 # ================= 2. 升级入库函数 =================
 # 增加 category 参数
-def save_to_supabase(title, url, ai_data, source, category):
+def build_news_row(title, url, ai_data, source, category, cluster_id=None, duplicate_of=None):
     full_summary = f"{ai_data['summary']}\n\n**关键数据:** {ai_data['key_stats']}"
+    translations = ai_data.get('translations') or {}
     
-    data = {
+    return {
         "title": title,
         "url": url,
         "content_summary": full_summary,
         "original_source": source,
         "sentiment_score": ai_data['sentiment_score'],
         "tags": ai_data['tags'],
-        "category": category  # <--- 新增这一行
+        "category": category,  # <--- 新增这一行
+        # 相似新闻：同簇共用 cluster_id，非代表行用 duplicate_of 指向代表的链接
+        "cluster_id": cluster_id,
+        "duplicate_of": duplicate_of,
+        # 预先翻译好的中英文版本，前端直接读取
+        "summary_cn": translations.get('summary_cn'),
+        "summary_en": translations.get('summary_en'),
+        "key_stats_cn": translations.get('key_stats_cn'),
+        "key_stats_en": translations.get('key_stats_en'),
+        "embedding": ai_data.get('embedding')
     }
-    
+
+# 多个批次可能同时写完，聚合表是读-改-写，需要串行
+_agg_lock = threading.Lock()
+
+def mark_saved(rows, inserted):
+    urls = [row["url"] for row in rows]
+    seen_store.add_many(urls)
+    checkpoints.mark_saved(urls)
+    metrics.inc("rows_inserted", len(inserted))
+    # 入库成功后增量更新情绪聚合表，看板直接读聚合结果；
+    # 只合并这次新插入的行 (按数据库里的 created_at 分桶)，重放 / 续跑时已在库里的行不会重复计分
+    if not inserted:
+        return
     try:
-        supabase.table("news").insert(data).execute()
-        print(f"✅ [{category}] 入库成功: {title[:15]}...")
+        with _agg_lock:
+            update_sentiment_aggregates(supabase, inserted)
     except Exception as e:
-        print(f"❌ 入库失败: {e}")
+        metrics.inc("aggregate_failures")
+        print(f"⚠️ 情绪聚合更新失败: {e}")
+
+# 逐条 insert 改为缓冲 + 按 url 批量 upsert，失败的批次写入死信文件下次重放
+writer = BufferedNewsWriter(
+    supabase,
+    batch_size=WRITE_BATCH_SIZE,
+    max_retries=WRITE_MAX_RETRIES,
+    dead_letter_path=os.path.join(STATE_DIR, "dead_letter.jsonl"),
+    on_saved=mark_saved,
+)
 
 # ================= 主循环 =================
 
-def run_pipeline():
-    print("🚀 启动分频道抓取...")
-    
-    # 遍历我们配置好的字典列表
-    for config in RSS_CONFIGS:
-        category = config['category']
-        feed_url = config['url']
-        
-        print(f"\n🌊 正在读取频道: {category} ...")
-        
-        try:
-            feed = feedparser.parse(feed_url)
-            for entry in feed.entries[:3]: # 每个源抓3条，保持轻量
-                url = entry.link
-                
-                if check_if_exists(url):
-                    print("   ⏭️ 跳过 (已存在)")
-                    continue
-                
-                print("   📥 下载中...")
-                title, content = get_article_content(url)
-                
-                if content:
-                    print(f"   🧠 AI 分析中 ({category})...")
-                    ai_data = ai_summarize_structured(title, content)
-                    
-                    if ai_data:
-                        # 简单的来源名称提取
-                        if "cnbc" in feed_url: source = "CNBC"
-                        elif "techcrunch" in feed_url: source = "TechCrunch"
-                        elif "coindesk" in feed_url: source = "CoinDesk"
-                        elif "dowjones" in feed_url: source = "MarketWatch"
-                        else: source = "Web"
-                        
-                        # 传入 category
-                        save_to_supabase(title, url, ai_data, source, category)
-                        time.sleep(2)
-                        
-        except Exception as e:
-            print(f"⚠️ RSS 错误: {e}")
+def fetch_feed_urls(config):
+    """
+    上次没做完的文章排在前面，再加上比频道游标新的条目；返回原始链接，去重阶段再归一化。
+    有新条目时续跑的最多占一半名额，积压的旧条目不会把新条目挤掉。
+    """
+    budget = config['max_entries']
+    pending = checkpoints.pending(config['url'])
+    metrics.inc("feeds_polled")
+    try:
+        result = fetch_feed(fetcher, feed_validators, config['url'])
+    except Exception as e:
+        metrics.inc("feed_errors")
+        if not pending:
+            raise
+        pending = pending[:budget]
+        metrics.inc("entries_resumed", len(pending))
+        print(f"⚠️ RSS 错误 ({config['category']}): {e}，先处理上次未完成的 {len(pending)} 条")
+        return pending
+    if result.not_modified:
+        metrics.inc("feeds_not_modified")
+        print(f"💤 频道未更新: {config['category']} ({config['source']})")
+        feed_scheduler.record(config, 0)
+        metrics.inc("entries_resumed", len(pending[:budget]))
+        return pending[:budget]
+    feed = feedparser.parse(result.content, response_headers={"content-type": result.headers.get("Content-Type", "")})
+
+    if feed.bozo and not feed.entries:
+        metrics.inc("feed_errors")
+        print(f"⚠️ RSS 解析失败 ({config['category']}): {feed.get('bozo_exception')}")
+    fresh = entries_after_cursor(feed.entries, checkpoints.get_cursor(config['url']))
+    feed_scheduler.record(config, len(fresh))
+    fresh = fresh[:budget]
+    links = [entry.link for entry in fresh]
+    # 新条目全部记入断点，这次轮不到的下次作为续跑处理
+    checkpoints.advance(config['url'], fresh, links)
+    resumed = pending[:max(budget - len(fresh), budget // 2)]
+    resumed_urls = {normalize_url(link) for link in resumed}
+    links = [link for link in links if normalize_url(link) not in resumed_urls][:budget - len(resumed)]
+    metrics.inc("entries_seen", len(feed.entries))
+    metrics.inc("entries_new", len(fresh))
+    metrics.inc("entries_resumed", len(resumed))
+    if pending:
+        print(f"♻️ 频道 {config['category']} 续跑上次未完成的 {len(resumed)}/{len(pending)} 条")
+    return resumed + links
+
+def download_entry(url):
+    # 上次已经下载过正文的直接用
+    saved = checkpoints.get_fetched(url)
+    if saved:
+        metrics.inc("downloads_resumed")
+        return saved
+    title, content = get_article_content(url)
+    if content:
+        checkpoints.mark_fetched(url, title, content)
+    else:
+        checkpoints.mark_failed(url)
+    return title, content
+
+def download_raw(url):
+    """进程池解析模式的下载阶段：只取原始网页，正文留给 parse_entries"""
+    saved = checkpoints.get_fetched(url)
+    if saved:
+        metrics.inc("downloads_resumed")
+        return {"url": url, "parsed": saved}
+    try:
+        result = fetcher.get(url)
+    except Exception as e:
+        metrics.inc("download_failures")
+        print(f"⚠️ 下载失败 {url}: {e}")
+        checkpoints.mark_failed(url)
+        return None
+    metrics.inc("articles_downloaded")
+    return {"url": url, "html": result.content, "encoding": result.encoding}
+
+def parse_entries(raws):
+    todo = [raw for raw in raws if "parsed" not in raw]
+    parsed = iter(parsers.parse_many([(raw["url"], raw["html"], raw["encoding"]) for raw in todo]))
+
+    results = []
+    for raw in raws:
+        if "parsed" in raw:
+            results.append(raw["parsed"])
+            continue
+        title, content, parse_ms, mode = next(parsed)
+        if mode.startswith("error"):
+            metrics.inc("parse_failures")
+            print(f"⚠️ 正文解析失败 {raw['url']}: {mode}")
+        else:
+            record_extract(raw["url"], mode, len(raw["html"]), parse_ms)
+        if content:
+            checkpoints.mark_fetched(raw["url"], title, content)
+        else:
+            checkpoints.mark_failed(raw["url"])
+        results.append((title, content))
+    return results
+
+def dedup_entries(candidates):
+    # 已经入库 / 处理过的候选从断点记录里结掉，否则会一直当作未完成的文章续跑
+    entries = filter_new_entries(supabase, candidates, store=seen_store, on_known=checkpoints.mark_saved)
+    metrics.inc("entries_skipped", len(candidates) - len(entries))
+    return entries
+
+def cluster_entries(articles):
+    clustered = cluster_articles(articles, threshold=NEAR_DUP_THRESHOLD)
+    metrics.inc("near_duplicates", len(articles) - len(clustered))
+    return clustered
+
+def summarize_articles(articles):
+    # 上次已经分析完、只是没来得及入库的，直接用存下来的结果
+    cached = [checkpoints.get_summary(article['url']) for article in articles]
+    todo = [article for article, data in zip(articles, cached) if data is None]
+    fresh = iter(analyze_articles(todo) if todo else [])
+
+    results = []
+    for article, data in zip(articles, cached):
+        if data is None:
+            data = next(fresh)
+            if data:
+                checkpoints.mark_summarized(article['url'], data)
+            else:
+                metrics.inc("summaries_failed")
+                checkpoints.mark_failed(article['url'])
+        else:
+            metrics.inc("summaries_resumed")
+        results.append(data)
+    return results
+
+def analyze_articles(articles):
+    results = summarizer.summarize_many(articles)
+    done = [data for data in results if data]
+    for data, translations in zip(done, translate_summaries(get_model(TRANSLATE_SYSTEM_INSTRUCTION, PRIORITY_TRANSLATION), done)):
+        data['translations'] = translations
+
+    # 整批文章一次算 embedding
+    texts = []
+    for article, data in zip(articles, results):
+        if data:
+            texts.append(embedding_text(article['title'], data['summary'], data['key_stats'], data['tags']))
+    try:
+        tokens = sum(estimate_tokens(text) for text in texts)
+        started = time.perf_counter()
+        vectors = gemini.call(embedder, texts, tokens=tokens)
+        metrics.observe_llm(time.perf_counter() - started, tokens, 0, kind="embed")
+        for data, vector in zip(done, vectors):
+            data['embedding'] = vector
+    except Exception as e:
+        metrics.inc("embedding_failures")
+        print(f"⚠️ Embedding 失败: {e}")
+    return results
+
+def save_entry(article, ai_data):
+    config = article['config']
+    title = article['title']
+    source = config['source']
+    cluster_id = article.get('cluster_id')
+    writer.add(build_news_row(title, article['url'], ai_data, source, config['category'], cluster_id=cluster_id))
+    print(f"✅ [{config['category']}] 已加入入库队列: {title[:15]}...")
+
+    # 同簇的其他来源共用代表的摘要，作为关联行入库
+    for dup in article.get('duplicates', []):
+        dup_config = dup['config']
+        writer.add(build_news_row(
+            dup['title'], dup['url'], ai_data, dup_config['source'], dup_config['category'],
+            cluster_id=cluster_id, duplicate_of=article['url'],
+        ))
+
+def run_pipeline(limits=None, all_feeds=False):
+    """
+    并发抓取：各频道并行读取，下载 / AI 分析 / 入库分别走有上限的并发池。
+    limits 为 None 时从环境变量读取 (CONCURRENCY_*)，传 PipelineLimits.sequential() 即为串行模式。
+    只抓调度器认为到期的频道，all_feeds=True 时忽略调度全部抓一遍。
+    """
+    limits = limits or PipelineLimits.from_env()
+    feeds = FEEDS if all_feeds else feed_scheduler.due(FEEDS)
+    print(f"📅 本轮到期频道 {len(feeds)}/{len(FEEDS)}: {feed_scheduler.stats(FEEDS)}")
+    if not feeds:
+        print("💤 没有到期的频道，本轮跳过")
+        write_run_report({}, limits, feeds)
+        return {}
+    print(f"🚀 启动分频道抓取... {limits}")
+    summarizer.batch_size = limits.llm_batch
+    checkpoints.prune()
+    writer.replay_dead_letters()
+
+    handlers = {
+        "fetch_feed": fetch_feed_urls,
+        "dedup": dedup_entries,
+        "download": download_entry,
+        "cluster": cluster_entries,
+        "summarize": summarize_articles,
+        "save": save_entry,
+    }
+    if PARSE_WORKERS:
+        print(f"🧩 正文解析交给 {PARSE_WORKERS} 个进程 (每块 {PARSE_CHUNKSIZE} 篇)")
+        handlers.update(download=download_raw, parse=parse_entries)
+    engine = IngestEngine(handlers=handlers, limits=limits, max_entries=MAX_ENTRIES_PER_FEED)
+    # 解析进程用 fork 创建，要赶在引擎开线程池之前
+    parsers.start()
+    try:
+        summary = engine.run(feeds)
+    finally:
+        parsers.close()
+    writer.flush()
+    # 本轮处理完才记录 RSS 的 ETag，下次没更新的频道直接 304 跳过
+    feed_validators.commit()
+    feed_scheduler.commit()
+    print(f"🧠 AI 调用统计: {summarizer.stats}")
+    print(f"🚦 Gemini 限流: {gemini.stats} {gemini.limiter.stats}")
+    print(f"🗂️ 摘要缓存: {summary_cache.stats()}")
+    print(f"📦 入库统计: {writer.stats}")
+    print(f"📍 断点记录: {checkpoints.stats()}")
+    print(f"📄 正文抽取: {extract_stats}")
+    write_run_report(summary, limits, feeds)
+    return summary
+
+def write_run_report(stages, limits, feeds):
+    """阶段耗时 + 计数器 + Gemini 延迟 / token 直方图 + 峰值内存，连同各组件的统计写成运行报告"""
+    report = metrics.report(stages, extra={
+        "limits": repr(limits),
+        "feeds_due": [config['source'] for config in feeds],
+        "feeds_total": len(FEEDS),
+        "summarizer": dict(summarizer.stats),
+        "gemini": {"retries": dict(gemini.stats), "limiter": dict(gemini.limiter.stats)},
+        "summary_cache": summary_cache.stats(),
+        "writer": dict(writer.stats),
+        "checkpoints": checkpoints.stats(),
+        "extract": dict(extract_stats),
+    })
+    try:
+        metrics.write(report, RUN_REPORT_PATH, RUN_HISTORY_PATH, METRICS_PROM_PATH)
+    except OSError as e:
+        print(f"⚠️ 运行报告写入失败: {e}")
+        return report
+    counters = report["counters"]
+    print(f"📈 运行报告: {RUN_REPORT_PATH} (频道 {counters.get('feeds_polled', 0)}，"
+          f"新条目 {counters.get('entries_new', 0)}，下载失败 {counters.get('download_failures', 0)}，"
+          f"入库 {counters.get('rows_inserted', 0)})")
+    return report
 
 if __name__ == "__main__":
-    run_pipeline()
\ No newline at end of file
+    limits = PipelineLimits.sequential() if "--sequential" in sys.argv else None
+    run_pipeline(limits, all_feeds="--all-feeds" in sys.argv)
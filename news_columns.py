@@ -0,0 +1,242 @@
+import time
+import threading
+import numpy as np
+import pandas as pd
+from datetime import datetime, timedelta, timezone
+from news_store import NEWS_COLUMNS
+
+# ================= 列式新闻缓存 (app.py 用) =================
+# 整个进程只存一份 (配合 st.cache_resource)，所有会话、所有板块 / Tab 共用：
+# - 分类做字典编码 (int16)，created_at 存成 int64 纳秒，情绪分存 float32 (空值为 NaN)
+# - 每个分类预先算好行号数组 (按时间从旧到新)，Tab 筛选 / 取最新 N 条 / 情绪统计都是数组切片
+# - 文字列用普通列表存，只有真正要显示的几十行才拼回 dict
+# 定期只拉比最新一条更新的行追加到末尾，隔一段时间整体重建一次 (校准删除 / 修改过的行)。
+
+TEXT_COLUMNS = [c.strip() for c in NEWS_COLUMNS.split(",") if c.strip() not in ("category", "sentiment_score")]
+
+
+def parse_timestamps(values):
+    """ISO 时间字符串 -> int64 纳秒 (UTC)；解析不了的记为 0"""
+    if not values:
+        return np.zeros(0, dtype=np.int64)
+    try:
+        parsed = pd.to_datetime(pd.Series(values), utc=True, format="ISO8601", errors="coerce")
+    except (TypeError, ValueError):
+        # 老版本 pandas 没有 format="ISO8601"
+        parsed = pd.to_datetime(pd.Series(values), utc=True, errors="coerce")
+    return parsed.fillna(pd.Timestamp(0, tz="UTC")).astype("int64").to_numpy()
+
+
+class ColumnarNewsStore:
+    """
+    capacity 按 2 倍增长，追加时不用每次整体复制。
+    加载 / 追加 / 查询都在同一把锁里做，过期那次 rerun 顺带查库，其他会话稍等。
+    """
+
+    def __init__(self, client, limit=5000, window_days=30, page_size=1000, ttl=60,
+                 full_refresh_every=600, clock=time.time):
+        self.client = client
+        self.limit = limit
+        self.window_days = window_days
+        self.page_size = page_size
+        self.ttl = ttl
+        self.full_refresh_every = full_refresh_every
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.checked_at = None
+        self.full_loaded_at = None
+        self.latest_created_at = None
+        self.queries = 0
+        self._reset()
+
+    def _reset(self, capacity=1024):
+        self.size = 0
+        self.category_names = []
+        self.category_codes = {}
+        self.category = np.zeros(capacity, dtype=np.int16)
+        self.created_at = np.zeros(capacity, dtype=np.int64)
+        self.sentiment = np.full(capacity, np.nan, dtype=np.float32)
+        self.text = {column: [] for column in TEXT_COLUMNS}
+        self.by_category = {}
+        self.ids = set()
+
+    def __len__(self):
+        return self.size
+
+    # ---------- 加载 ----------
+
+    def _query(self):
+        query = self.client.table("news").select(NEWS_COLUMNS)
+        if self.window_days:
+            since = datetime.now(timezone.utc) - timedelta(days=self.window_days)
+            query = query.gte("created_at", since.isoformat())
+        return query
+
+    def _load(self, newer_than=None):
+        """按 created_at 倒序分页，最多 limit 条；newer_than 不为空时只要更新的行"""
+        rows = []
+        cursor = None
+        while len(rows) < self.limit:
+            query = self._query()
+            if newer_than:
+                query = query.gt("created_at", newer_than)
+            if cursor:
+                query = query.lt("created_at", cursor)
+            page = query.order("created_at", desc=True).limit(min(self.page_size, self.limit - len(rows))).execute().data
+            self.queries += 1
+            rows.extend(page)
+            if len(page) < self.page_size:
+                break
+            cursor = page[-1]["created_at"]
+        return rows
+
+    def refresh(self):
+        """TTL 内直接返回；过期后增量追加，隔 full_refresh_every 秒整体重建。返回新加入的条数"""
+        now = self.clock()
+        with self.lock:
+            if self.checked_at is not None and now - self.checked_at < self.ttl:
+                return 0
+            try:
+                if self.full_loaded_at is None or now - self.full_loaded_at >= self.full_refresh_every:
+                    rows = self._load()
+                    self._reset(max(1024, len(rows)))
+                    self.latest_created_at = None
+                    self.full_loaded_at = now
+                else:
+                    rows = self._load(self.latest_created_at)
+            except Exception:
+                # 数据库暂时不可用时先用旧数据顶着，没有旧数据才报错
+                if not self.size:
+                    raise
+                rows = []
+            self.checked_at = now
+            return self._append(rows)
+
+    def invalidate(self):
+        with self.lock:
+            self.checked_at = None
+            self.full_loaded_at = None
+
+    # ---------- 追加 ----------
+
+    def _grow(self, needed):
+        capacity = len(self.created_at)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        self.category = np.resize(self.category, capacity)
+        self.created_at = np.resize(self.created_at, capacity)
+        sentiment = np.full(capacity, np.nan, dtype=np.float32)
+        sentiment[:self.size] = self.sentiment[:self.size]
+        self.sentiment = sentiment
+
+    def _append(self, rows):
+        rows = [row for row in rows if row["id"] not in self.ids]
+        if not rows:
+            return 0
+        # 数据库按时间倒序返回，存的时候从旧到新
+        rows.sort(key=lambda row: (row.get("created_at") or "", row["id"]))
+        start, end = self.size, self.size + len(rows)
+        self._grow(end)
+
+        timestamps = parse_timestamps([row.get("created_at") for row in rows])
+        codes = np.empty(len(rows), dtype=np.int16)
+        for i, row in enumerate(rows):
+            name = row.get("category") or "Other"
+            if name not in self.category_codes:
+                self.category_codes[name] = len(self.category_names)
+                self.category_names.append(name)
+            codes[i] = self.category_codes[name]
+        scores = np.array([np.nan if row.get("sentiment_score") is None else row["sentiment_score"] for row in rows],
+                          dtype=np.float32)
+        self.category[start:end] = codes
+        self.created_at[start:end] = timestamps
+        self.sentiment[start:end] = scores
+        for column in TEXT_COLUMNS:
+            self.text[column].extend(row.get(column) for row in rows)
+        self.ids.update(row["id"] for row in rows)
+
+        in_order = start == 0 or timestamps[0] >= self.created_at[start - 1]
+        positions = np.arange(start, end)
+        for code in np.unique(codes):
+            fresh = positions[codes == code]
+            old = self.by_category.get(int(code))
+            merged = fresh if old is None else np.concatenate([old, fresh])
+            if not in_order:
+                # 偶尔有比已有数据更旧的行补进来，按时间重新排
+                merged = merged[np.argsort(self.created_at[merged], kind="stable")]
+            self.by_category[int(code)] = merged
+        self.size = end
+        latest = max(row.get("created_at") or "" for row in rows)
+        if latest and (self.latest_created_at is None or latest > self.latest_created_at):
+            self.latest_created_at = latest
+        return len(rows)
+
+    # ---------- 查询 ----------
+    # 整体重建会换掉所有数组，查询在锁内一次做完，避免行号和数组对不上
+
+    def _positions(self, categories):
+        if categories is None:
+            return np.argsort(self.created_at[:self.size], kind="stable")
+        arrays = [self.by_category[self.category_codes[c]] for c in categories if c in self.category_codes]
+        if not arrays:
+            return np.zeros(0, dtype=np.int64)
+        if len(arrays) == 1:
+            return arrays[0]
+        merged = np.concatenate(arrays)
+        return merged[np.argsort(self.created_at[merged], kind="stable")]
+
+    def _rows(self, positions):
+        result = []
+        for i in positions:
+            i = int(i)
+            row = {column: values[i] for column, values in self.text.items()}
+            row["category"] = self.category_names[self.category[i]]
+            score = self.sentiment[i]
+            row["sentiment_score"] = None if np.isnan(score) else int(score)
+            result.append(row)
+        return result
+
+    def positions(self, categories=None):
+        """所选分类的行号，按时间从旧到新；categories 为 None 表示全部"""
+        with self.lock:
+            return self._positions(categories)
+
+    def latest(self, categories=None, limit=30, offset=0):
+        """最新的 limit 条 (跳过最新的 offset 条)，按时间从新到旧；只有这些行会拼回 dict"""
+        with self.lock:
+            positions = self._positions(categories)
+            end = len(positions) - offset
+            if end <= 0:
+                return []
+            return self._rows(positions[max(0, end - limit):end][::-1])
+
+    def count(self, categories=None):
+        with self.lock:
+            return len(self._positions(categories))
+
+    def sentiment_stats(self, categories=None, last=30):
+        """
+        最近 last 条的情绪：返回 {"mean", "count", "timestamps" (int64 纳秒), "scores"}，没有分数的行不计入
+        """
+        with self.lock:
+            positions = self._positions(categories)[-last:]
+            scores = self.sentiment[positions]
+            timestamps = self.created_at[positions]
+        mask = ~np.isnan(scores)
+        return {
+            "mean": float(scores[mask].mean()) if mask.any() else 0.0,
+            "count": int(mask.sum()),
+            "timestamps": timestamps[mask],
+            "scores": scores[mask],
+        }
+
+    def stats(self):
+        with self.lock:
+            return {
+                "rows": self.size,
+                "capacity": len(self.created_at),
+                "categories": {name: len(self.by_category.get(code, ())) for name, code in self.category_codes.items()},
+                "queries": self.queries,
+            }
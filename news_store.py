@@ -0,0 +1,49 @@
+# ================= 新闻数据层 (app.py 用) =================
+# 只查界面用得到的列；所有会话共享的缓存见 news_columns.ColumnarNewsStore，
+# 缓存翻完之后 “加载更多” 用下面的游标分页直接查库。
+
+NEWS_COLUMNS = (
+    "id, title, url, content_summary, original_source, sentiment_score, "
+    "tags, category, created_at, duplicate_of, "
+    "summary_cn, summary_en, key_stats_cn, key_stats_en"
+)
+
+
+# ================= 游标分页 =================
+# 按 (created_at, id) 做 keyset 分页，“加载更多”只取比当前最后一条更早的一页，不受时间窗口限制。
+
+def _quote(value):
+    # PostgREST 的 or 逻辑里，带 : . , 的值要用双引号包起来
+    return '"' + str(value).replace('"', '\\"') + '"'
+
+
+def fetch_page(client, categories=None, cursor=None, page_size=20, columns=NEWS_COLUMNS):
+    """
+    cursor: 上一页最后一条的 (created_at, id)，None 表示第一页
+    返回 (rows, next_cursor)，next_cursor 为 None 表示没有更多了
+    """
+    query = client.table("news").select(columns)
+    if categories:
+        query = query.in_("category", list(categories))
+    if cursor:
+        created_at, row_id = cursor
+        ts = _quote(created_at)
+        query = query.or_(f"created_at.lt.{ts},and(created_at.eq.{ts},id.lt.{row_id})")
+    response = (
+        query.order("created_at", desc=True)
+        .order("id", desc=True)
+        .limit(page_size + 1)
+        .execute()
+    )
+    rows = response.data[:page_size]
+    has_more = len(response.data) > page_size
+    next_cursor = (rows[-1]["created_at"], rows[-1]["id"]) if rows and has_more else None
+    return rows, next_cursor
+
+
+def cursor_of(rows):
+    """列表最后一条的游标，用于从缓存的第一页接着往后翻"""
+    if not rows:
+        return None
+    last = rows[-1]
+    return (last.get("created_at"), last["id"])
@@ -0,0 +1,95 @@
+import os
+import time
+import multiprocessing
+from newspaper import Article, Config
+from article_extract import StreamingExtractor
+from batch_summarizer import MAX_CONTENT_CHARS
+
+# ================= 多进程正文解析 =================
+# 网页解析 (lxml / newspaper) 是纯 CPU 活，线程池里跑会被 GIL 卡住。
+# 频道和条数多起来以后，下载阶段只取原始 HTML，解析统一交给进程池按块分发。
+# workers=0 时在当前进程里直接解析 (调试 / 单核机器)。
+
+# 流式抽取的正文少于这个字数时，认为页面结构特殊，退回 newspaper
+MIN_EXTRACT_CHARS = 200
+
+
+def _parse_newspaper(url, html, encoding):
+    config = Config()
+    # 只解析不下载，图片也不要抓
+    config.fetch_images = False
+    article = Article(url, config=config)
+    article.download(input_html=html.decode(encoding or "utf-8", errors="replace"))
+    article.parse()
+    return article.title, article.text
+
+
+def parse_html(item, mode="stream", max_chars=MAX_CONTENT_CHARS):
+    """
+    item: (url, html 字节, 编码)
+    返回 (title, text, 解析毫秒, 实际使用的方式)；解析出错时 text 为 None，方式为 "error: 异常信息"
+    """
+    url, html, encoding = item
+    started = time.perf_counter()
+    used = mode
+    try:
+        if mode == "stream":
+            extractor = StreamingExtractor(max_chars)
+            headers = {"Content-Type": f"text/html; charset={encoding}"} if encoding else None
+            extractor.feed(html, headers)
+            extractor.close()
+            title, text = extractor.title, extractor.text
+            if len(text) < MIN_EXTRACT_CHARS:
+                used = "fallback"
+                title, text = _parse_newspaper(url, html, encoding)
+        else:
+            title, text = _parse_newspaper(url, html, encoding)
+    except Exception as e:
+        title, text, used = None, None, f"error: {type(e).__name__}: {e}"
+    return title, text, (time.perf_counter() - started) * 1000, used
+
+
+def _parse_with_options(args):
+    item, mode, max_chars = args
+    return parse_html(item, mode, max_chars)
+
+
+class ParsePool:
+    """
+    workers: 解析进程数，0 表示不开进程
+    chunksize: 每次发给一个进程的网页数，网页多时大块能减少进程间往返
+    进程用 fork 方式创建，要在开线程池之前 start()，子进程只执行 parse_html
+    """
+
+    def __init__(self, workers=None, chunksize=4, mode="stream", max_chars=MAX_CONTENT_CHARS):
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.chunksize = chunksize
+        self.mode = mode
+        self.max_chars = max_chars
+        self.pool = None
+
+    def start(self):
+        if self.workers and self.pool is None:
+            self.pool = multiprocessing.get_context("fork").Pool(self.workers)
+        return self
+
+    def parse_many(self, items):
+        """items: [(url, html, encoding), ...]，返回对齐的 [(title, text, parse_ms, mode), ...]"""
+        args = [(item, self.mode, self.max_chars) for item in items]
+        if not args:
+            return []
+        if not self.pool:
+            return [_parse_with_options(a) for a in args]
+        return self.pool.map(_parse_with_options, args, chunksize=max(1, self.chunksize))
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
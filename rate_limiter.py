@@ -0,0 +1,212 @@
+import re
+import time
+import heapq
+import random
+import itertools
+import threading
+from token_estimate import estimate_tokens
+
+# ================= Gemini 限流与重试 =================
+# news_cloud.py 和 app.py 的所有 Gemini 调用 (摘要 / 翻译 / embedding / 聊天) 共用一个 RateLimiter：
+# - 每分钟请求数 (RPM) 和 token 数 (TPM) 两个令牌桶，额度不够就排队等
+# - 排队时按优先级放行：聊天 > 翻译 > 后台摘要
+# - 遇到 429 / 5xx 指数退避 + 抖动重试；429 时整体降速 (AIMD)，之后每次成功慢慢恢复
+# 时钟和等待函数都可以注入，测试时用假时钟不用真的 sleep。
+
+PRIORITY_CHAT = 0
+PRIORITY_TRANSLATION = 1
+PRIORITY_BACKGROUND = 2
+
+RETRYABLE_STATUS = (429, 500, 502, 503, 504)
+RETRYABLE_ERRORS = (
+    "ResourceExhausted", "TooManyRequests", "ServiceUnavailable",
+    "InternalServerError", "DeadlineExceeded", "GatewayTimeout",
+)
+
+
+def _status_of(exc):
+    # google.api_core 的异常带 int 类型的 code；其他情况从错误信息里找状态码
+    code = getattr(exc, "code", None)
+    if isinstance(code, int):
+        return code
+    match = re.search(r"\b(429|500|502|503|504)\b", str(exc))
+    return int(match.group(1)) if match else None
+
+
+def is_throttle(exc):
+    return type(exc).__name__ in ("ResourceExhausted", "TooManyRequests") or _status_of(exc) == 429
+
+
+def is_retryable(exc):
+    return type(exc).__name__ in RETRYABLE_ERRORS or _status_of(exc) in RETRYABLE_STATUS
+
+
+class RateLimiter:
+    """
+    rpm / tpm: 每分钟请求数和 token 数上限 (桶容量即一分钟的额度)
+    factor: 当前速率系数，429 时减半 (不低于 min_factor)，成功一次加 0.05 直到恢复 1
+    wait(timeout): 持锁等待的函数，默认是条件变量的 wait；测试时传入推进假时钟的函数
+    """
+
+    def __init__(self, rpm=15, tpm=1_000_000, min_factor=0.1, clock=time.monotonic, wait=None):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.min_factor = min_factor
+        self.factor = 1.0
+        self.clock = clock
+        self.cond = threading.Condition()
+        self._wait = wait or self.cond.wait
+        now = clock()
+        self.requests = float(rpm)
+        self.tokens = float(tpm)
+        self.updated = now
+        self.paused_until = now
+        self.waiting = []
+        self._seq = itertools.count()
+        self.stats = {"acquired": 0, "waited": 0.0, "throttled": 0}
+
+    def _refill(self, now):
+        elapsed = max(0.0, now - self.updated)
+        self.updated = now
+        self.requests = min(self.rpm, self.requests + elapsed * self.rpm * self.factor / 60)
+        self.tokens = min(self.tpm, self.tokens + elapsed * self.tpm * self.factor / 60)
+
+    def _delay(self, now, tokens):
+        """还要等多久才够额度；单次超过整分钟 TPM 的请求只要求桶是满的"""
+        tokens = min(tokens, self.tpm)
+        delay = max(0.0, self.paused_until - now)
+        if self.requests < 1:
+            delay = max(delay, (1 - self.requests) * 60 / (self.rpm * self.factor))
+        if self.tokens < tokens:
+            delay = max(delay, (tokens - self.tokens) * 60 / (self.tpm * self.factor))
+        return delay
+
+    def acquire(self, tokens=1, priority=PRIORITY_BACKGROUND):
+        """阻塞到拿到 1 次请求额度和 tokens 个 token 额度，返回等待的秒数"""
+        started = self.clock()
+        with self.cond:
+            ticket = (priority, next(self._seq))
+            heapq.heappush(self.waiting, ticket)
+            try:
+                while True:
+                    now = self.clock()
+                    self._refill(now)
+                    if self.waiting[0] != ticket:
+                        # 前面还有更高优先级 (或更早) 的请求，等它拿到额度后被唤醒
+                        self._wait(None)
+                        continue
+                    delay = self._delay(now, tokens)
+                    if delay <= 0:
+                        self.requests -= 1
+                        self.tokens -= min(tokens, self.tpm)
+                        break
+                    self._wait(delay)
+            finally:
+                self.waiting.remove(ticket)
+                heapq.heapify(self.waiting)
+                self.cond.notify_all()
+            waited = self.clock() - started
+            self.stats["acquired"] += 1
+            self.stats["waited"] += waited
+        return waited
+
+    def adjust(self, extra_tokens):
+        """调用结束后按实际用量补扣 (或退回) token，可以扣成负数，后面的请求会多等一会"""
+        with self.cond:
+            self.tokens = min(self.tpm, self.tokens - extra_tokens)
+
+    def throttled(self, pause):
+        """收到 429：降速，并让所有请求至少暂停 pause 秒"""
+        with self.cond:
+            self.factor = max(self.min_factor, self.factor / 2)
+            self.paused_until = max(self.paused_until, self.clock() + pause)
+            self.stats["throttled"] += 1
+
+    def succeeded(self):
+        with self.cond:
+            self.factor = min(1.0, self.factor + 0.05)
+
+
+class RetryScheduler:
+    """每次尝试前先向 RateLimiter 申请额度，可重试的错误按 base_delay * 2^n 退避 (带 50% 抖动)"""
+
+    def __init__(self, limiter, max_retries=4, base_delay=2.0, max_delay=60.0, sleep=time.sleep, rng=None):
+        self.limiter = limiter
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.sleep = sleep
+        self.rng = rng or random.Random()
+        self.stats = {"calls": 0, "retries": 0, "failed": 0}
+        self._lock = threading.Lock()
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def backoff(self, attempt):
+        delay = min(self.max_delay, self.base_delay * 2 ** attempt)
+        return delay / 2 + self.rng.uniform(0, delay / 2)
+
+    def call(self, fn, *args, tokens=1, priority=PRIORITY_BACKGROUND, **kwargs):
+        """fn(*args, **kwargs)；tokens / priority 只给限流用，不会传给 fn"""
+        for attempt in itertools.count():
+            self.limiter.acquire(tokens, priority)
+            self._count("calls")
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                if attempt >= self.max_retries or not is_retryable(e):
+                    self._count("failed")
+                    raise
+                delay = self.backoff(attempt)
+                if is_throttle(e):
+                    self.limiter.throttled(delay)
+                self._count("retries")
+                print(f"⏳ Gemini 调用失败 ({type(e).__name__})，{delay:.1f}s 后第 {attempt + 1} 次重试")
+                self.sleep(delay)
+                continue
+            self.limiter.succeeded()
+            return result
+
+
+class LimitedModel:
+    """
+    包装 GenerativeModel：generate_content 走限流和重试，其余属性原样透传。
+    调用方 (BatchSummarizer / translate_texts / 聊天) 不需要任何改动。
+    observer(seconds, prompt_tokens, output_tokens): 每次成功调用后回调 (最后一次尝试的耗时和实际用量)，用于统计
+    """
+
+    def __init__(self, model, scheduler, priority=PRIORITY_BACKGROUND, observer=None):
+        self.model = model
+        self.scheduler = scheduler
+        self.priority = priority
+        self.observer = observer
+
+    def generate_content(self, prompt, **kwargs):
+        estimated = estimate_tokens(prompt if isinstance(prompt, str) else str(prompt))
+        timing = {}
+
+        def attempt(*args, **kw):
+            started = time.perf_counter()
+            try:
+                return self.model.generate_content(*args, **kw)
+            finally:
+                timing["seconds"] = time.perf_counter() - started
+
+        response = self.scheduler.call(attempt, prompt, tokens=estimated, priority=self.priority, **kwargs)
+        prompt_tokens, output_tokens = estimated, 0
+        # 流式响应要读完才有用量，只按估计值计
+        if not kwargs.get("stream"):
+            usage = getattr(response, "usage_metadata", None)
+            total = getattr(usage, "total_token_count", None)
+            if isinstance(total, int) and total:
+                self.scheduler.limiter.adjust(total - estimated)
+                prompt_tokens = getattr(usage, "prompt_token_count", None) or estimated
+                output_tokens = getattr(usage, "candidates_token_count", None) or max(0, total - prompt_tokens)
+        if self.observer:
+            self.observer(timing.get("seconds", 0.0), prompt_tokens, output_tokens)
+        return response
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
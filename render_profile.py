@@ -0,0 +1,53 @@
+import time
+from collections import deque
+from ingest_engine import StageTimer, percentile
+
+# ================= 页面渲染耗时 (app.py 用) =================
+# 每次 rerun 开一个新的 StageTimer，按阶段 (fetch / search / filter / translate / render / dashboard / chat_context)
+# 累计耗时；最近 N 次 rerun 的结果留在 session_state 里，给调试面板和 benchmarks/bench_app.py 读取。
+
+PHASES = ("fetch", "search", "filter", "translate", "render", "dashboard", "chat_context")
+
+
+class RerunProfiler:
+
+    def __init__(self, history=50, clock=time.perf_counter):
+        self.clock = clock
+        self.history = deque(maxlen=history)
+        self.timer = StageTimer(clock)
+        self.started = None
+
+    def start(self):
+        self.timer = StageTimer(self.clock)
+        self.started = self.clock()
+
+    def span(self, phase):
+        return self.timer.span(phase)
+
+    def finish(self):
+        """结束本次 rerun，返回 {阶段: 毫秒}，另含 total"""
+        if self.started is None:
+            return {}
+        timings = {stage: s["busy"] * 1000 for stage, s in self.timer.summary().items()}
+        timings["total"] = (self.clock() - self.started) * 1000
+        self.started = None
+        self.history.append(timings)
+        return timings
+
+    def last(self):
+        return self.history[-1] if self.history else {}
+
+    def summary(self):
+        """最近 N 次 rerun 里各阶段的 last / p50 / p95 (毫秒)，没出现的阶段不列"""
+        phases = [p for p in PHASES + ("total",) if any(p in run for run in self.history)]
+        last = self.last()
+        result = {}
+        for phase in phases:
+            samples = [run[phase] for run in self.history if phase in run]
+            result[phase] = {
+                "last": last.get(phase, 0.0),
+                "p50": percentile(samples, 50),
+                "p95": percentile(samples, 95),
+                "runs": len(samples),
+            }
+        return result
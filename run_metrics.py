@@ -0,0 +1,175 @@
+import os
+import sys
+import json
+import time
+import threading
+from ingest_engine import percentile
+
+try:
+    import resource
+except ImportError:  # Windows 没有 resource 模块
+    resource = None
+
+# ================= 运行指标与报告 =================
+# news_cloud.py 每次运行累计计数 (频道 / 条目 / 下载失败 / JSON 解析失败 / 入库...) 和直方图 (Gemini 延迟 / token)，
+# 结束时连同各阶段耗时、峰值内存写成 JSON 报告，并追加一行到历史文件 (随状态目录缓存，便于看多次运行的趋势)；
+# 可选再写一份 Prometheus 文本格式，给 node_exporter 的 textfile collector 或 Pushgateway 用。
+
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0)
+TOKEN_BUCKETS = (100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000)
+METRIC_PREFIX = "news_pipeline"
+
+
+class Histogram:
+    """固定桶计数 + 保留原始样本 (一次运行最多几百个) 算分位数"""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * len(self.buckets)
+        self.samples = []
+        self.total = 0.0
+
+    def observe(self, value):
+        self.samples.append(value)
+        self.total += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+    def summary(self):
+        cumulative = 0
+        buckets = {}
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        buckets["+Inf"] = len(self.samples)
+        return {
+            "count": len(self.samples),
+            "sum": self.total,
+            "p50": percentile(self.samples, 50),
+            "p95": percentile(self.samples, 95),
+            "p99": percentile(self.samples, 99),
+            "buckets": buckets,
+        }
+
+
+def peak_rss_bytes():
+    """本进程和已回收子进程 (解析进程池) 的峰值常驻内存；拿不到时返回 None"""
+    if resource is None:
+        return None
+    # Linux 上 ru_maxrss 单位是 KB，macOS 是字节
+    unit = 1 if sys.platform == "darwin" else 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * unit
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * unit
+    return {"self": own, "children": children}
+
+
+class RunMetrics:
+    """线程安全；各阶段在线程池里调用 inc / observe"""
+
+    def __init__(self, clock=time.time):
+        self.clock = clock
+        self.started_at = clock()
+        self.counters = {}
+        self.histograms = {}
+        self.lock = threading.Lock()
+
+    def inc(self, name, n=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def observe(self, name, value, buckets=LATENCY_BUCKETS):
+        with self.lock:
+            if name not in self.histograms:
+                self.histograms[name] = Histogram(buckets)
+            self.histograms[name].observe(value)
+
+    def observe_llm(self, seconds, prompt_tokens, output_tokens, kind="generate"):
+        """一次 Gemini 调用：延迟和输入 / 输出 token 各记一个直方图，总量记在计数器里"""
+        self.inc(f"llm_{kind}_calls")
+        self.inc("llm_prompt_tokens", prompt_tokens)
+        self.inc("llm_output_tokens", output_tokens)
+        self.observe(f"llm_{kind}_latency_seconds", seconds)
+        self.observe("llm_prompt_tokens", prompt_tokens, TOKEN_BUCKETS)
+        if output_tokens:
+            self.observe("llm_output_tokens", output_tokens, TOKEN_BUCKETS)
+
+    def report(self, stages=None, extra=None):
+        finished = self.clock()
+        with self.lock:
+            counters = dict(self.counters)
+            histograms = {name: h.summary() for name, h in self.histograms.items()}
+        report = {
+            "started_at": self.started_at,
+            "finished_at": finished,
+            "duration_s": finished - self.started_at,
+            "counters": counters,
+            "histograms": histograms,
+            "stages": stages or {},
+            "peak_rss_bytes": peak_rss_bytes(),
+        }
+        report.update(extra or {})
+        return report
+
+    def write(self, report, json_path, history_path=None, prometheus_path=None):
+        _write_text(json_path, json.dumps(report, ensure_ascii=False, indent=2, default=str))
+        if history_path:
+            folder = os.path.dirname(history_path)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            with open(history_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(report, ensure_ascii=False, default=str) + "\n")
+        if prometheus_path:
+            _write_text(prometheus_path, to_prometheus(report))
+
+
+def _write_text(path, text):
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    # 先写临时文件再改名，textfile collector 不会读到写了一半的文件
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def _metric_name(name):
+    return f"{METRIC_PREFIX}_" + "".join(c if c.isalnum() else "_" for c in name.lower())
+
+
+def to_prometheus(report):
+    """Prometheus 文本格式：计数器、直方图、各阶段耗时 (gauge) 和峰值内存"""
+    lines = []
+    for name, value in sorted(report["counters"].items()):
+        metric = _metric_name(name) + "_total"
+        lines += [f"# TYPE {metric} counter", f"{metric} {value}"]
+
+    for name, h in sorted(report["histograms"].items()):
+        metric = _metric_name(name)
+        lines.append(f"# TYPE {metric} histogram")
+        for bound, count in h["buckets"].items():
+            lines.append(f'{metric}_bucket{{le="{bound}"}} {count}')
+        lines += [f"{metric}_sum {h['sum']}", f"{metric}_count {h['count']}"]
+
+    for field in ("wall", "busy", "p50", "p95", "p99"):
+        metric = _metric_name(f"stage_{field}_seconds")
+        lines.append(f"# TYPE {metric} gauge")
+        for stage, s in sorted(report["stages"].items()):
+            lines.append(f'{metric}{{stage="{stage}"}} {s[field]}')
+    counts = _metric_name("stage_count")
+    lines.append(f"# TYPE {counts} gauge")
+    for stage, s in sorted(report["stages"].items()):
+        lines.append(f'{counts}{{stage="{stage}"}} {s["count"]}')
+
+    rss = report.get("peak_rss_bytes")
+    if rss:
+        metric = _metric_name("peak_rss_bytes")
+        lines.append(f"# TYPE {metric} gauge")
+        for process, value in rss.items():
+            lines.append(f'{metric}{{process="{process}"}} {value}')
+    for name, key in (("run_duration_seconds", "duration_s"), ("run_finished_timestamp_seconds", "finished_at")):
+        metric = _metric_name(name)
+        lines += [f"# TYPE {metric} gauge", f"{metric} {report[key]}"]
+    return "\n".join(lines) + "\n"
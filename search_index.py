@@ -0,0 +1,216 @@
+import re
+import math
+import time
+import heapq
+import threading
+from news_store import NEWS_COLUMNS
+
+# ================= 新闻搜索 =================
+# app.py 的搜索框和标签筛选用：标题 / 摘要 / 标签建倒排索引，放在内存里 (st.cache_resource 所有会话共享)，
+# 只增量加载比索引里最新一条更新的行。英文按单词切分，中文按单字 + 相邻两字切分 (不依赖分词库)。
+# 排序用 BM25，标题和标签的词权重更高，同分按时间倒序。
+# 也可以设置 SEARCH_BACKEND=postgres，把查询下推到 migrations/006_news_search.sql 里的全文索引。
+
+FIELD_WEIGHTS = {"title": 3.0, "tags": 2.0, "summary": 1.0}
+SUMMARY_FIELDS = ("content_summary", "summary_en", "summary_cn")
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+|[\u4e00-\u9fff]+")
+
+
+def tokenize(text, query=False):
+    """
+    英文 / 数字按单词；连续的中文切成相邻两字，建索引时另外加上单字。
+    查询时只有一个汉字的才用单字，两个字以上用两字组合，匹配更准。
+    """
+    tokens = []
+    for part in _TOKEN_RE.findall((text or "").lower()):
+        if not "\u4e00" <= part[0] <= "\u9fff":
+            tokens.append(part)
+            continue
+        bigrams = [part[i:i + 2] for i in range(len(part) - 1)]
+        if query:
+            tokens.extend(bigrams or [part])
+        else:
+            tokens.extend(part)
+            tokens.extend(bigrams)
+    return tokens
+
+
+def _row_fields(row):
+    return {
+        "title": row.get("title") or "",
+        "tags": " ".join(row.get("tags") or []),
+        "summary": "\n".join(row.get(field) or "" for field in SUMMARY_FIELDS),
+    }
+
+
+class SearchIndex:
+    """
+    postings: 词 -> {文档序号: 加权词频}；tag_postings: 小写标签 -> {文档序号}；category_docs: 分类 -> {文档序号}
+    文档只增不删 (新闻入库后不会改标题 / 摘要)，add 时跳过已有 id。
+    """
+
+    def __init__(self, field_weights=None):
+        self.field_weights = field_weights or FIELD_WEIGHTS
+        self.rows = []
+        self.lengths = []
+        self.total_length = 0.0
+        self.ids = set()
+        self.postings = {}
+        self.tag_postings = {}
+        self.category_docs = {}
+        # BM25 的长度归一化项，加入新文档后平均长度变了，下次搜索时重算
+        self._norms = None
+        self.lock = threading.Lock()
+        self.last_search_ms = 0.0
+        self.latest_created_at = None
+        self.refreshed_at = 0.0
+
+    def __len__(self):
+        return len(self.rows)
+
+    def add(self, rows):
+        added = 0
+        with self.lock:
+            for row in rows:
+                if row["id"] in self.ids:
+                    continue
+                doc = len(self.rows)
+                weights = {}
+                for field, text in _row_fields(row).items():
+                    weight = self.field_weights[field]
+                    for token in tokenize(text):
+                        weights[token] = weights.get(token, 0.0) + weight
+                for token, weight in weights.items():
+                    self.postings.setdefault(token, {})[doc] = weight
+                for tag in row.get("tags") or []:
+                    self.tag_postings.setdefault(tag.lower(), set()).add(doc)
+                self.category_docs.setdefault(row.get("category"), set()).add(doc)
+                length = sum(weights.values())
+                self.rows.append(row)
+                self.lengths.append(length)
+                self.total_length += length
+                self.ids.add(row["id"])
+                if row.get("created_at") and (self.latest_created_at is None or row["created_at"] > self.latest_created_at):
+                    self.latest_created_at = row["created_at"]
+                added += 1
+            if added:
+                self._norms = None
+        return added
+
+    def _get_norms(self):
+        if self._norms is None:
+            avg_length = self.total_length / (len(self.rows) or 1) or 1.0
+            self._norms = [BM25_K1 * (1 - BM25_B + BM25_B * length / avg_length) for length in self.lengths]
+        return self._norms
+
+    def tags(self, limit=20):
+        """出现次数最多的标签，给界面做筛选候选"""
+        with self.lock:
+            counts = [(len(docs), tag) for tag, docs in self.tag_postings.items()]
+        return [tag for _, tag in heapq.nlargest(limit, counts)]
+
+    def search(self, query="", categories=None, tag=None, limit=50):
+        """
+        query 里的所有词都要命中 (AND)；tag 精确匹配 (不区分大小写)；categories 为 None 不限分类。
+        没有 query 只按标签 / 分类筛选时按时间倒序。返回 [(分数, row), ...]
+        """
+        started = time.perf_counter()
+        with self.lock:
+            terms = list(dict.fromkeys(tokenize(query, query=True)))
+            lists = [self.postings.get(term) for term in terms]
+            if terms and not all(lists):
+                # 有词在索引里不存在，AND 之后一定为空
+                lists, candidates = [], set()
+            elif terms:
+                lists.sort(key=len)
+                candidates = set(lists[0])
+                for postings in lists[1:]:
+                    candidates &= postings.keys()
+            else:
+                candidates = None
+            if tag:
+                tagged = self.tag_postings.get(tag.lower(), set())
+                candidates = tagged if candidates is None else candidates & tagged
+            if categories and (candidates is None or candidates):
+                allowed = set().union(*[self.category_docs.get(c, set()) for c in categories])
+                candidates = allowed if candidates is None else candidates & allowed
+            if candidates is None:
+                candidates = range(len(self.rows))
+
+            rows = self.rows
+            if not lists:
+                # 只按标签 / 分类筛选：文档按入库顺序加入，时间倒序直接比较 created_at
+                top = heapq.nlargest(limit, candidates, key=lambda doc: rows[doc].get("created_at") or "")
+                results = [(0.0, rows[doc]) for doc in top]
+            else:
+                count = len(rows)
+                norms = self._get_norms()
+                weighted = [
+                    (postings, math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5)) * (BM25_K1 + 1))
+                    for postings in lists
+                ]
+                scored = []
+                for doc in candidates:
+                    norm = norms[doc]
+                    score = 0.0
+                    for postings, idf in weighted:
+                        tf = postings[doc]
+                        score += idf * tf / (tf + norm)
+                    scored.append((score, doc))
+                top = heapq.nlargest(limit, scored, key=lambda item: (item[0], rows[item[1]].get("created_at") or ""))
+                results = [(score, rows[doc]) for score, doc in top]
+        self.last_search_ms = (time.perf_counter() - started) * 1000
+        return results
+
+
+def refresh_from_db(index, client, page_size=1000, max_rows=50000, min_interval=60, clock=time.time):
+    """
+    增量加载：第一次按 created_at 倒序分页拉最近 max_rows 条，之后只拉比索引里最新一条更新的行。
+    返回新加入的条数。
+    """
+    now = clock()
+    if now - index.refreshed_at < min_interval:
+        return 0
+    index.refreshed_at = now
+    latest = index.latest_created_at
+    added = 0
+    loaded = 0
+    cursor = None
+    while loaded < max_rows:
+        query = client.table("news").select(NEWS_COLUMNS)
+        if latest:
+            query = query.gt("created_at", latest)
+        if cursor:
+            query = query.lt("created_at", cursor)
+        rows = query.order("created_at", desc=True).limit(page_size).execute().data
+        if not rows:
+            break
+        added += index.add(rows)
+        loaded += len(rows)
+        if len(rows) < page_size:
+            break
+        # 同一时间戳的行跨页时可能漏掉一两条，下一次全量 (重启) 会补上
+        cursor = rows[-1]["created_at"]
+    return added
+
+
+def search_db(client, query="", categories=None, tag=None, limit=50):
+    """
+    下推到 Postgres 全文索引 (需要先执行 migrations/006_news_search.sql)。
+    数据库已经按 ts_rank 排好序，这里的分数只表示名次，返回 [(分数, row), ...]
+    """
+    rows = client.rpc("search_news", {
+        "q": query or None,
+        "cats": list(categories) if categories else None,
+        "tag": tag or None,
+        "max_rows": limit,
+    }).execute().data
+    results = []
+    for i, row in enumerate(rows):
+        row.pop("embedding", None)
+        row.pop("search_tsv", None)
+        results.append((float(len(rows) - i), row))
+    return results
@@ -0,0 +1,140 @@
+import re
+from datetime import datetime, timedelta, timezone
+
+# ================= 情绪聚合 =================
+# news_cloud 每批入库后，按 (分类, 小时/天) 增量更新情绪统计：count / sum / mean / min / max / ewma，
+# 存进 sentiment_agg 表。看板只读几百个聚合点，不再每次 rerun 从原始新闻重新计算。
+
+AGG_TABLE = "sentiment_agg"
+GRANULARITIES = ("hour", "day")
+ALL_CATEGORIES = "__all__"
+EWMA_ALPHA = 0.3
+
+
+def bucket_start(ts, granularity):
+    ts = ts.astimezone(timezone.utc)
+    if granularity == "hour":
+        ts = ts.replace(minute=0, second=0, microsecond=0)
+    else:
+        ts = ts.replace(hour=0, minute=0, second=0, microsecond=0)
+    return ts.isoformat()
+
+
+def parse_time(value):
+    if isinstance(value, datetime):
+        return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+    # Supabase 返回的时间可能带 Z 或者 6 位以上小数
+    # (Python 3.9 的 fromisoformat 只认 3 或 6 位小数)
+    value = value.replace("Z", "+00:00")
+    value = re.sub(r"\.(\d+)", lambda m: "." + m.group(1)[:6].ljust(6, "0"), value)
+    parsed = datetime.fromisoformat(value)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def merge_bucket(existing, scores, prev_ewma, alpha=EWMA_ALPHA):
+    """把一批新分数合并进已有的桶，ewma 按到达顺序接着上一个值滚动"""
+    bucket = dict(existing) if existing else {"count": 0, "sum": 0.0, "min": None, "max": None, "ewma": None}
+    ewma = bucket.get("ewma")
+    if ewma is None:
+        ewma = prev_ewma
+    for score in scores:
+        ewma = score if ewma is None else alpha * score + (1 - alpha) * ewma
+    bucket["count"] += len(scores)
+    bucket["sum"] += sum(scores)
+    bucket["min"] = min(scores) if bucket["min"] is None else min(bucket["min"], *scores)
+    bucket["max"] = max(scores) if bucket["max"] is None else max(bucket["max"], *scores)
+    bucket["mean"] = bucket["sum"] / bucket["count"]
+    bucket["ewma"] = ewma
+    return bucket
+
+
+def group_scores(rows, now, granularities=GRANULARITIES):
+    """
+    rows: 刚入库的新闻行 (需要 category / sentiment_score，可选 created_at)
+    返回 {(category, granularity, bucket_start): [score, ...]}，同时计入全部分类汇总
+    """
+    groups = {}
+    for row in rows:
+        score = row.get("sentiment_score")
+        # 相似新闻的关联行和代表共用一个分数，只算一次
+        if score is None or row.get("duplicate_of"):
+            continue
+        ts = parse_time(row["created_at"]) if row.get("created_at") else now
+        for granularity in granularities:
+            start = bucket_start(ts, granularity)
+            for category in (row.get("category") or "Other", ALL_CATEGORIES):
+                groups.setdefault((category, granularity, start), []).append(score)
+    return groups
+
+
+def update_sentiment_aggregates(client, rows, now=None, alpha=EWMA_ALPHA):
+    """读出涉及的桶和每个序列最近一个桶的 ewma，合并后一次 upsert 回去"""
+    now = now or datetime.now(timezone.utc)
+    groups = group_scores(rows, now)
+    if not groups:
+        return []
+
+    categories = sorted({key[0] for key in groups})
+    earliest = min(key[2] for key in groups)
+    existing = (
+        client.table(AGG_TABLE)
+        .select("category, granularity, bucket_start, count, sum, min, max, ewma")
+        .in_("category", categories)
+        .gte("bucket_start", earliest)
+        .execute()
+        .data
+    )
+    by_key = {(r["category"], r["granularity"], parse_time(r["bucket_start"]).isoformat()): r for r in existing}
+
+    # 每个 (分类, 粒度) 序列在新桶之前的最后一个 ewma，一次查出最近 30 天的旧桶再各取最新
+    lookback = (parse_time(earliest) - timedelta(days=30)).isoformat()
+    older = (
+        client.table(AGG_TABLE)
+        .select("category, granularity, bucket_start, ewma")
+        .in_("category", categories)
+        .gte("bucket_start", lookback)
+        .lt("bucket_start", earliest)
+        .order("bucket_start", desc=True)
+        .execute()
+        .data
+    )
+    prev_ewma = {}
+    for r in older:
+        prev_ewma.setdefault((r["category"], r["granularity"]), r["ewma"])
+
+    payload = []
+    for key in sorted(groups, key=lambda k: k[2]):
+        category, granularity, start = key
+        series = (category, granularity)
+        bucket = merge_bucket(by_key.get(key), groups[key], prev_ewma.get(series), alpha)
+        prev_ewma[series] = bucket["ewma"]
+        payload.append({
+            "category": category,
+            "granularity": granularity,
+            "bucket_start": start,
+            "count": bucket["count"],
+            "sum": bucket["sum"],
+            "mean": bucket["mean"],
+            "min": bucket["min"],
+            "max": bucket["max"],
+            "ewma": bucket["ewma"],
+            "updated_at": now.isoformat(),
+        })
+
+    client.table(AGG_TABLE).upsert(payload, on_conflict="category,granularity,bucket_start").execute()
+    return payload
+
+
+def load_series(client, categories, granularity="day", days=90):
+    """看板用：读取若干分类最近 N 天的聚合点"""
+    since = datetime.now(timezone.utc) - timedelta(days=days)
+    return (
+        client.table(AGG_TABLE)
+        .select("category, bucket_start, count, mean, min, max, ewma")
+        .in_("category", list(categories))
+        .eq("granularity", granularity)
+        .gte("bucket_start", since.isoformat())
+        .order("bucket_start")
+        .execute()
+        .data
+    )
@@ -0,0 +1,94 @@
+import os
+import re
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+
+# ================= AI 摘要缓存 =================
+# 同一篇文章 (转载、入库失败后重抓) 不再重复调用 Gemini。
+# key = sha256(模型名 + system prompt + 归一化标题 + 截断后的正文)，存在本地 SQLite，
+# 支持过期时间 (TTL) 和按条数淘汰 (最久未使用的先删)。
+
+
+def normalize_text(text):
+    return re.sub(r"\s+", " ", text or "").strip()
+
+
+def make_cache_key(model_name, system_prompt, title, content, max_chars=6000):
+    payload = "\x1f".join([
+        model_name,
+        system_prompt,
+        normalize_text(title).lower(),
+        normalize_text((content or "")[:max_chars]),
+    ])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SummaryCache:
+
+    def __init__(self, path, ttl=7 * 24 * 3600, max_entries=5000, clock=time.time):
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS summaries ("
+            "key TEXT PRIMARY KEY, value TEXT, created_at REAL, last_used REAL)"
+        )
+        self.conn.commit()
+
+    def get(self, key):
+        now = self.clock()
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT value, created_at FROM summaries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or (self.ttl and now - row[1] > self.ttl):
+                if row is not None:
+                    self.conn.execute("DELETE FROM summaries WHERE key = ?", (key,))
+                    self.conn.commit()
+                self.misses += 1
+                return None
+            self.conn.execute("UPDATE summaries SET last_used = ? WHERE key = ?", (now, key))
+            self.conn.commit()
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key, value):
+        now = self.clock()
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO summaries (key, value, created_at, last_used) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), now, now),
+            )
+            self._evict(now)
+            self.conn.commit()
+
+    def _evict(self, now):
+        if self.ttl:
+            self.conn.execute("DELETE FROM summaries WHERE created_at < ?", (now - self.ttl,))
+        if self.max_entries:
+            self.conn.execute(
+                "DELETE FROM summaries WHERE key IN ("
+                "SELECT key FROM summaries ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# 模块都在仓库根目录，假服务 (InMemorySupabase 等) 在 benchmarks/fakes.py
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
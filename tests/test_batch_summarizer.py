@@ -0,0 +1,130 @@
+import json
+
+from batch_summarizer import BatchSummarizer, validate_summary
+from summary_cache import SummaryCache
+
+
+def make_data(**overrides):
+    data = {"summary": "摘要", "key_stats": "数据 {{1%}}", "sentiment_score": "3", "tags": ["AI", "Chips"]}
+    data.update(overrides)
+    return data
+
+
+def test_validate_summary_fixes_types():
+    result = validate_summary(make_data(sentiment_score="12.6", key_stats=["a", "b"]))
+    assert result["sentiment_score"] == 10
+    assert result["key_stats"] == "a\nb"
+
+
+def test_validate_summary_dedupes_tags():
+    assert validate_summary(make_data(tags=["AI", "AI ", "Chips", "", "AI"]))["tags"] == ["AI", "Chips"]
+    assert validate_summary(make_data(tags="AI, Chips，AI"))["tags"] == ["AI", "Chips"]
+
+
+def test_validate_summary_rejects_bad_score():
+    assert validate_summary(make_data(sentiment_score="bullish")) is None
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class ScriptedModel:
+    """按顺序返回预先写好的回复文本，记录收到的 prompt"""
+
+    def __init__(self, *replies):
+        self.replies = list(replies)
+        self.prompts = []
+
+    def generate_content(self, prompt, **kwargs):
+        self.prompts.append(prompt)
+        reply = self.replies.pop(0)
+        if isinstance(reply, Exception):
+            raise reply
+        return FakeResponse(reply)
+
+
+def item(article_id, summary="摘要"):
+    return dict(make_data(summary=summary), id=article_id)
+
+
+def make_articles(n):
+    return [{"id": i, "title": f"标题 {i}", "content": f"内容 {i}"} for i in range(n)]
+
+
+def single_reply(summary):
+    return json.dumps(make_data(summary=summary), ensure_ascii=False)
+
+
+def test_batch_missing_id_falls_back_to_single_call():
+    batch = ScriptedModel(json.dumps([item(0, "a"), item(2, "c")], ensure_ascii=False))
+    single = ScriptedModel(single_reply("b"))
+    summarizer = BatchSummarizer(batch, single, batch_size=3)
+
+    results = summarizer.summarize_many(make_articles(3))
+
+    assert [r["summary"] for r in results] == ["a", "b", "c"]
+    assert len(single.prompts) == 1 and "标题 1" in single.prompts[0]
+    assert summarizer.stats["fallbacks"] == 1
+    assert summarizer.stats["batch_calls"] == 1
+    assert summarizer.stats["api_calls"] == 2
+
+
+def test_invalid_batch_json_falls_back_per_article():
+    batch = ScriptedModel("```json\n[{not json")
+    single = ScriptedModel(single_reply("a"), "oops", single_reply("c"))
+    summarizer = BatchSummarizer(batch, single, batch_size=3)
+
+    results = summarizer.summarize_many(make_articles(3))
+
+    assert results[0]["summary"] == "a" and results[1] is None and results[2]["summary"] == "c"
+    assert summarizer.stats["json_errors"] == 2
+    assert summarizer.stats["fallbacks"] == 3
+    assert summarizer.stats["failed"] == 1
+
+
+def test_batch_api_error_falls_back_per_article():
+    batch = ScriptedModel(RuntimeError("503"))
+    single = ScriptedModel(single_reply("a"), single_reply("b"))
+    summarizer = BatchSummarizer(batch, single, batch_size=2)
+
+    assert [r["summary"] for r in summarizer.summarize_many(make_articles(2))] == ["a", "b"]
+    assert summarizer.stats["api_errors"] == 1
+
+
+def test_dict_shaped_batch_response():
+    reply = {"0": make_data(summary="a"), "1": make_data(summary="b")}
+    batch = ScriptedModel(json.dumps(reply, ensure_ascii=False))
+    single = ScriptedModel()
+    summarizer = BatchSummarizer(batch, single, batch_size=2)
+
+    assert [r["summary"] for r in summarizer.summarize_many(make_articles(2))] == ["a", "b"]
+    assert single.prompts == []
+    assert summarizer.stats["fallbacks"] == 0
+
+
+def test_cache_hits_skip_model_calls(tmp_path):
+    cache = SummaryCache(str(tmp_path / "cache.sqlite"))
+    articles = make_articles(2)
+    first = BatchSummarizer(ScriptedModel(json.dumps([item(0, "a"), item(1, "b")], ensure_ascii=False)),
+                            ScriptedModel(), batch_size=2, cache=cache, cache_scope=("m", "p"))
+    first.summarize_many(articles)
+
+    batch, single = ScriptedModel(), ScriptedModel()
+    again = BatchSummarizer(batch, single, batch_size=2, cache=cache, cache_scope=("m", "p"))
+
+    assert [r["summary"] for r in again.summarize_many(articles)] == ["a", "b"]
+    assert again.summarize_one(articles[0]["title"], articles[0]["content"])["summary"] == "a"
+    assert batch.prompts == [] and single.prompts == []
+    assert again.stats["api_calls"] == 0
+
+
+def test_last_single_article_skips_batch():
+    batch = ScriptedModel(json.dumps([item(0, "a"), item(1, "b")], ensure_ascii=False))
+    single = ScriptedModel(single_reply("c"))
+    summarizer = BatchSummarizer(batch, single, batch_size=2)
+
+    assert [r["summary"] for r in summarizer.summarize_many(make_articles(3))] == ["a", "b", "c"]
+    assert summarizer.stats["fallbacks"] == 0
+    assert summarizer.stats["batch_calls"] == 1
@@ -0,0 +1,124 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from fakes import InMemorySupabase
+from bulk_writer import BufferedNewsWriter
+from sentiment_agg import AGG_TABLE, update_sentiment_aggregates
+
+
+def make_row(i, score, created_at=None):
+    row = {"url": f"https://example.com/{i}", "title": f"t{i}", "category": "₿ Crypto", "sentiment_score": score}
+    if created_at:
+        row["created_at"] = created_at
+    return row
+
+
+def make_writer(client, calls):
+    def on_saved(batch, inserted):
+        calls.append((batch, inserted))
+        update_sentiment_aggregates(client, inserted, now=datetime(2024, 1, 2, 12, tzinfo=timezone.utc))
+    return BufferedNewsWriter(client, batch_size=10, on_saved=on_saved, sleep=lambda s: None)
+
+
+def bucket(client, granularity="day", category="₿ Crypto"):
+    rows = [r for r in client.tables[AGG_TABLE] if r["granularity"] == granularity and r["category"] == category]
+    assert len(rows) == 1
+    return rows[0]
+
+
+def test_rewriting_saved_rows_does_not_double_count_aggregates():
+    client = InMemorySupabase()
+    calls = []
+    writer = make_writer(client, calls)
+
+    for i, score in enumerate([4, -2]):
+        writer.add(make_row(i, score))
+    writer.flush()
+    first = dict(bucket(client))
+
+    # 死信重放 / 续跑时同一批链接再写一次
+    for i, score in enumerate([4, -2]):
+        writer.add(make_row(i, score))
+    writer.flush()
+
+    assert len(client.tables["news"]) == 2
+    assert [len(inserted) for _, inserted in calls] == [2, 0]
+    assert [len(batch) for batch, _ in calls] == [2, 2]
+    assert bucket(client)["count"] == first["count"] == 2
+    assert bucket(client)["sum"] == 2
+    assert writer.stats["saved"] == 4 and writer.stats["inserted"] == 2
+
+
+def test_only_new_rows_of_a_mixed_batch_are_aggregated():
+    client = InMemorySupabase()
+    writer = make_writer(client, [])
+    writer.add(make_row(0, 6))
+    writer.flush()
+
+    writer.add(make_row(0, 6))
+    writer.add(make_row(1, 2))
+    writer.flush()
+
+    assert bucket(client)["count"] == 2
+    assert bucket(client)["sum"] == 8
+
+
+def test_aggregates_bucket_by_row_created_at():
+    client = InMemorySupabase()
+    writer = make_writer(client, [])
+    writer.add(make_row(0, 3, created_at="2024-01-01T05:30:00+00:00"))
+    writer.flush()
+
+    hour = bucket(client, "hour")
+    assert hour["bucket_start"] == "2024-01-01T05:00:00+00:00"
+    assert bucket(client, "day")["bucket_start"] == "2024-01-01T00:00:00+00:00"
+
+
+class FailingClient:
+    def __init__(self, error=RuntimeError("db down")):
+        self.error = error
+
+    def table(self, name):
+        raise self.error
+
+
+def write_dead_letters(path, rows):
+    writer = BufferedNewsWriter(FailingClient(), max_retries=0, dead_letter_path=str(path), sleep=lambda s: None)
+    for row in rows:
+        writer.add(row)
+    writer.flush()
+    assert writer.stats["dead_lettered"] == len(rows)
+
+
+def test_replay_writes_rows_and_removes_file(tmp_path):
+    path = tmp_path / "dead.jsonl"
+    write_dead_letters(path, [make_row(0, 1), make_row(1, 2), make_row(0, 3)])
+    client = InMemorySupabase()
+    writer = BufferedNewsWriter(client, dead_letter_path=str(path))
+
+    assert writer.replay_dead_letters() == 2
+    assert not path.exists()
+    assert sorted(row["url"] for row in client.tables["news"]) == [make_row(0, 0)["url"], make_row(1, 0)["url"]]
+
+
+def test_replay_keeps_rows_that_fail_again(tmp_path):
+    path = tmp_path / "dead.jsonl"
+    write_dead_letters(path, [make_row(0, 1), make_row(1, 2)])
+    writer = BufferedNewsWriter(FailingClient(), max_retries=1, dead_letter_path=str(path), sleep=lambda s: None)
+
+    assert writer.replay_dead_letters() == 0
+    assert len(path.read_text(encoding="utf-8").splitlines()) == 2
+    assert not (tmp_path / "dead.jsonl.tmp").exists()
+
+
+def test_crash_during_replay_keeps_file(tmp_path):
+    path = tmp_path / "dead.jsonl"
+    write_dead_letters(path, [make_row(0, 1)])
+    before = path.read_text(encoding="utf-8")
+    # 进程被杀 (不是普通异常，不会进入重试)
+    writer = BufferedNewsWriter(FailingClient(KeyboardInterrupt()), dead_letter_path=str(path))
+
+    with pytest.raises(KeyboardInterrupt):
+        writer.replay_dead_letters()
+    assert path.read_text(encoding="utf-8") == before
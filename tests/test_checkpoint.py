@@ -0,0 +1,84 @@
+import sqlite3
+
+from fakes import InMemorySupabase
+from checkpoint import CheckpointStore
+from url_dedup import SeenUrlStore, filter_new_entries
+
+RAW = "https://Example.com/a/1/?utm_source=rss&__source=x"
+NORM = "https://example.com/a/1"
+CONFIG = {"category": "C", "url": "feed"}
+
+
+def entry(i, link):
+    return {"id": f"e{i}", "link": link}
+
+
+def test_checkpoint_keys_by_normalized_url_and_resumes_raw_link(tmp_path):
+    store = CheckpointStore(str(tmp_path / "cp.sqlite"))
+    store.advance("feed", [entry(1, RAW)], [RAW])
+
+    assert store.pending("feed") == [RAW]
+    # 后面各阶段用归一化链接更新状态
+    store.mark_fetched(NORM, "title", "content")
+    assert store.get_fetched(NORM) == ("title", "content")
+    store.mark_saved([NORM])
+    assert store.pending("feed") == []
+
+
+def test_old_state_file_gets_link_column(tmp_path):
+    path = str(tmp_path / "cp.sqlite")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE articles (url TEXT PRIMARY KEY, feed_url TEXT, stage TEXT, title TEXT, content TEXT, "
+                 "ai_data TEXT, attempts INTEGER DEFAULT 0, queued_at REAL, updated_at REAL)")
+    conn.execute("INSERT INTO articles (url, feed_url, stage, queued_at, updated_at) VALUES (?, 'feed', 'queued', 1, 1)",
+                 (NORM,))
+    conn.commit()
+    conn.close()
+
+    store = CheckpointStore(path)
+    assert store.pending("feed") == [NORM]
+
+
+def test_dedup_matches_legacy_raw_url_and_reports_known(tmp_path):
+    client = InMemorySupabase()
+    client.tables["news"] = [{"id": 1, "url": RAW}]
+    known = []
+
+    entries = filter_new_entries(client, [(CONFIG, RAW), (CONFIG, "https://example.com/b")],
+                                 store=SeenUrlStore(str(tmp_path / "seen.sqlite")), on_known=known.extend)
+
+    assert entries == [(CONFIG, "https://example.com/b")]
+    assert known == [NORM]
+
+
+def test_dedup_reports_locally_seen_urls(tmp_path):
+    seen = SeenUrlStore(str(tmp_path / "seen.sqlite"))
+    seen.add(NORM)
+    known = []
+
+    assert filter_new_entries(InMemorySupabase(), [(CONFIG, RAW)], store=seen, on_known=known.extend) == []
+    assert known == [NORM]
+
+
+def test_dedup_failure_does_not_report_known(monkeypatch):
+    monkeypatch.setattr("url_dedup.time.sleep", lambda s: None)
+
+    class BrokenClient:
+        def table(self, name):
+            raise RuntimeError("db down")
+
+    known = []
+    assert filter_new_entries(BrokenClient(), [(CONFIG, RAW)], on_known=known.extend) == []
+    assert known == []
+
+
+def test_skipped_entries_no_longer_pending(tmp_path):
+    store = CheckpointStore(str(tmp_path / "cp.sqlite"))
+    client = InMemorySupabase()
+    client.tables["news"] = [{"id": 1, "url": RAW}]
+    store.advance("feed", [entry(1, RAW), entry(2, "https://example.com/b")], [RAW, "https://example.com/b"])
+
+    candidates = [(CONFIG, link) for link in store.pending("feed")]
+    filter_new_entries(client, candidates, on_known=store.mark_saved)
+
+    assert store.pending("feed") == ["https://example.com/b"]
@@ -0,0 +1,76 @@
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import pytest
+
+from article_extract import extract_streaming
+from http_fetch import HttpFetcher, FeedValidatorStore, fetch_feed
+
+ETAG = '"v1"'
+FEED = "<?xml version='1.0' encoding='gbk'?><rss version='2.0'><channel><title>频道</title></channel></rss>"
+ARTICLE = "<html><body><article><p>" + "新闻正文内容" * 20 + "</p></article></body></html>"
+
+
+class LowercaseHandler(BaseHTTPRequestHandler):
+    """响应头全部小写，和部分 CDN / 自建服务器一样"""
+    protocol_version = "HTTP/1.1"
+    requests = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self.requests.append((self.path, self.headers.get("If-None-Match")))
+        if self.path == "/feed" and self.headers.get("If-None-Match") == ETAG:
+            self.send_response(304)
+            self.send_header("etag", ETAG)
+            self.send_header("content-length", "0")
+            self.end_headers()
+            return
+        body = (FEED if self.path == "/feed" else ARTICLE).encode("gbk")
+        self.send_response(200)
+        self.send_header("content-type", "text/html; charset=gbk")
+        self.send_header("etag", ETAG)
+        self.send_header("last-modified", "Mon, 01 Jan 2024 00:00:00 GMT")
+        self.send_header("content-length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def server():
+    LowercaseHandler.requests = []
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), LowercaseHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_port}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_lowercase_validators_enable_conditional_get(server, tmp_path):
+    fetcher = HttpFetcher(timeout=5)
+    validators = FeedValidatorStore(str(tmp_path / "validators.json"))
+    url = f"{server}/feed"
+
+    first = fetch_feed(fetcher, validators, url)
+    assert first.status == 200
+    assert validators.pending[url] == {"etag": ETAG, "last_modified": "Mon, 01 Jan 2024 00:00:00 GMT"}
+    validators.commit()
+
+    second = fetch_feed(fetcher, FeedValidatorStore(str(tmp_path / "validators.json")), url)
+    assert second.not_modified
+    assert LowercaseHandler.requests[-1] == ("/feed", ETAG)
+
+
+def test_lowercase_content_type_keeps_charset(server):
+    fetcher = HttpFetcher(timeout=5)
+    result = fetcher.get(f"{server}/feed")
+    assert result.headers.get("Content-Type") == "text/html; charset=gbk"
+    assert result.encoding == "gbk"
+    assert "频道" in result.text()
+
+
+def test_streaming_extract_uses_lowercase_charset(server):
+    extracted = extract_streaming(HttpFetcher(timeout=5), f"{server}/article")
+    assert "新闻正文内容" in extracted.text
@@ -0,0 +1,79 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from fakes import InMemorySupabase
+from news_columns import ColumnarNewsStore
+from news_store import fetch_page, cursor_of
+
+NOW = datetime.now(timezone.utc)
+
+
+def make_row(i, category="₿ Crypto", score=1):
+    return {"id": i, "title": f"t{i}", "url": f"https://example.com/{i}", "category": category,
+            "sentiment_score": score, "created_at": (NOW - timedelta(minutes=100 - i)).isoformat()}
+
+
+def make_store(rows, now):
+    client = InMemorySupabase()
+    client.tables["news"] = list(rows)
+    store = ColumnarNewsStore(client, ttl=60, full_refresh_every=600, clock=lambda: now[0])
+    return client, store
+
+
+def test_latest_and_category_slices():
+    now = [0.0]
+    _, store = make_store([make_row(i, "₿ Crypto" if i % 2 else "🤖 AI & Tech") for i in range(10)], now)
+    store.refresh()
+
+    assert [row["id"] for row in store.latest(limit=3)] == [9, 8, 7]
+    assert [row["id"] for row in store.latest(("₿ Crypto",), limit=2, offset=1)] == [7, 5]
+    assert store.count(("🤖 AI & Tech",)) == 5
+    assert store.count(("missing",)) == 0
+
+
+def test_refresh_ttl_incremental_and_stale_on_error():
+    now = [0.0]
+    client, store = make_store([make_row(i) for i in range(3)], now)
+    assert store.refresh() == 3
+
+    client.tables["news"].append(make_row(3))
+    now[0] = 30
+    assert store.refresh() == 0
+    now[0] = 61
+    assert store.refresh() == 1
+    assert store.latest(limit=1)[0]["id"] == 3
+
+    # 数据库不可用时继续用旧数据
+    client.table = lambda name: (_ for _ in ()).throw(RuntimeError("db down"))
+    now[0] = 700
+    assert store.refresh() == 0
+    assert len(store) == 4
+
+
+def test_first_load_error_raises():
+    now = [0.0]
+    client, store = make_store([], now)
+    client.table = lambda name: (_ for _ in ()).throw(RuntimeError("db down"))
+    with pytest.raises(RuntimeError):
+        store.refresh()
+
+
+def test_sentiment_stats_skip_missing_scores():
+    now = [0.0]
+    _, store = make_store([make_row(0, score=4), make_row(1, score=None), make_row(2, score=-2)], now)
+    store.refresh()
+    stats = store.sentiment_stats(last=30)
+    assert stats["count"] == 2
+    assert stats["mean"] == pytest.approx(1.0)
+
+
+def test_fetch_page_continues_from_cursor():
+    client = InMemorySupabase()
+    client.tables["news"] = [make_row(i) for i in range(5)]
+    first, cursor = fetch_page(client, page_size=2)
+    assert [row["id"] for row in first] == [4, 3]
+    assert cursor == cursor_of(first)
+    rest, cursor = fetch_page(client, cursor=cursor, page_size=3)
+    assert [row["id"] for row in rest] == [2, 1, 0]
+    assert cursor is None
@@ -0,0 +1,275 @@
+import time
+import random
+import threading
+
+import pytest
+
+from rate_limiter import (
+    RateLimiter, RetryScheduler, LimitedModel, PRIORITY_CHAT, PRIORITY_BACKGROUND, is_retryable, is_throttle,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def make_limiter(clock, **kwargs):
+    """单线程用：等待就是把假时钟往前拨；wait(None) (等前面的请求) 单线程里不会发生"""
+    def wait(timeout):
+        if timeout is None:
+            raise AssertionError("单线程里不应该排在别人后面")
+        clock.now += timeout
+    return RateLimiter(clock=clock, wait=wait, **kwargs)
+
+
+class ResourceExhausted(Exception):
+    """和 google.api_core 的 429 异常同名"""
+
+
+# ---------- 令牌桶 ----------
+
+def test_token_bucket_waits_for_tokens():
+    clock = FakeClock()
+    limiter = make_limiter(clock, rpm=2, tpm=100)
+
+    assert limiter.acquire(tokens=60) == 0
+    # 还剩 40 个 token，差 20 个，按每分钟 100 个补充要等 12 秒
+    assert limiter.acquire(tokens=60) == pytest.approx(12.0)
+    assert limiter.stats["acquired"] == 2
+    assert limiter.stats["waited"] == pytest.approx(12.0)
+
+
+def test_token_bucket_waits_for_requests():
+    clock = FakeClock()
+    limiter = make_limiter(clock, rpm=2, tpm=1_000_000)
+
+    limiter.acquire()
+    limiter.acquire()
+    # 请求额度用完，每 30 秒补 1 次
+    assert limiter.acquire() == pytest.approx(30.0)
+
+
+def test_oversized_request_only_needs_full_bucket():
+    clock = FakeClock()
+    limiter = make_limiter(clock, rpm=10, tpm=100)
+    assert limiter.acquire(tokens=500) == 0
+    assert limiter.acquire(tokens=500) == pytest.approx(60.0)
+
+
+def test_adjust_charges_actual_usage():
+    clock = FakeClock()
+    limiter = make_limiter(clock, rpm=100, tpm=100)
+    limiter.acquire(tokens=10)
+    limiter.adjust(90)
+    assert limiter.tokens == pytest.approx(0.0)
+    assert limiter.acquire(tokens=50) == pytest.approx(30.0)
+
+
+# ---------- 优先级 ----------
+
+def test_waiting_requests_are_released_by_priority():
+    clock = FakeClock()
+    gate = threading.Event()
+    holder = {}
+
+    def wait(timeout):
+        # 真的释放锁让其他线程排队；闸门打开之前假时钟不走，排在最前面的请求就一直拿不到额度。
+        # 多个线程同时等时时钟只走到各自的截止时间，不叠加
+        deadline = None if timeout is None else clock.now + timeout
+        holder["limiter"].cond.wait(0.005)
+        if deadline is not None and gate.is_set():
+            clock.now = max(clock.now, deadline)
+
+    limiter = RateLimiter(rpm=1, tpm=1_000_000, clock=clock, wait=wait)
+    holder["limiter"] = limiter
+    limiter.acquire()
+
+    order = []
+
+    def worker(name, priority):
+        limiter.acquire(priority=priority)
+        order.append(name)
+
+    def start(name, priority, queued):
+        thread = threading.Thread(target=worker, args=(name, priority), daemon=True)
+        thread.start()
+        deadline = time.monotonic() + 5
+        while len(limiter.waiting) < queued and time.monotonic() < deadline:
+            time.sleep(0.001)
+        assert len(limiter.waiting) == queued
+        return thread
+
+    threads = [start("background", PRIORITY_BACKGROUND, 1), start("chat", PRIORITY_CHAT, 2)]
+    gate.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert order == ["chat", "background"]
+    assert clock.now == pytest.approx(120.0)
+    assert limiter.waiting == []
+
+
+# ---------- AIMD ----------
+
+def test_throttle_halves_rate_and_pauses():
+    clock = FakeClock()
+    limiter = make_limiter(clock, rpm=60, tpm=1_000_000, min_factor=0.1)
+
+    limiter.throttled(pause=5.0)
+    assert limiter.factor == 0.5
+    assert limiter.acquire() == pytest.approx(5.0)
+
+    # 降速后补充速度减半：用完额度后每 2 秒补 1 次
+    limiter.requests = 0.0
+    assert limiter.acquire() == pytest.approx(2.0)
+
+
+def test_throttle_floor_and_additive_recovery():
+    clock = FakeClock()
+    limiter = make_limiter(clock, min_factor=0.1)
+    for _ in range(10):
+        limiter.throttled(pause=0)
+    assert limiter.factor == 0.1
+    assert limiter.stats["throttled"] == 10
+
+    limiter.succeeded()
+    assert limiter.factor == pytest.approx(0.15)
+    for _ in range(100):
+        limiter.succeeded()
+    assert limiter.factor == 1.0
+
+
+# ---------- 重试 ----------
+
+class FlakyClient:
+    def __init__(self, errors, result="ok"):
+        self.errors = list(errors)
+        self.result = result
+        self.calls = 0
+
+    def __call__(self, *args, **kwargs):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return self.result
+
+
+def make_scheduler(clock, **kwargs):
+    limiter = make_limiter(clock, rpm=1000, tpm=1_000_000)
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        clock.sleep(seconds)
+
+    scheduler = RetryScheduler(limiter, sleep=sleep, rng=random.Random(7), **kwargs)
+    return scheduler, sleeps
+
+
+def test_retries_throttle_with_backoff_then_succeeds():
+    clock = FakeClock()
+    scheduler, sleeps = make_scheduler(clock, base_delay=2.0, max_delay=60.0)
+    client = FlakyClient([ResourceExhausted("quota"), ResourceExhausted("quota")])
+
+    assert scheduler.call(client, "prompt", tokens=10) == "ok"
+
+    assert client.calls == 3
+    assert scheduler.stats == {"calls": 3, "retries": 2, "failed": 0}
+    # 第 n 次重试等 base * 2^n，抖动在 [一半, 全部] 之间
+    assert 1.0 <= sleeps[0] <= 2.0
+    assert 2.0 <= sleeps[1] <= 4.0
+    # 两次 429 各减半，成功后加回 0.05
+    assert scheduler.limiter.factor == pytest.approx(0.3)
+    assert scheduler.limiter.stats["throttled"] == 2
+
+
+def test_server_errors_retry_without_throttling():
+    clock = FakeClock()
+    scheduler, sleeps = make_scheduler(clock)
+    client = FlakyClient([Exception("503 Service Unavailable")])
+
+    assert scheduler.call(client) == "ok"
+    assert scheduler.limiter.factor == 1.0
+    assert len(sleeps) == 1
+
+
+def test_gives_up_after_max_retries():
+    clock = FakeClock()
+    scheduler, sleeps = make_scheduler(clock, max_retries=2)
+    client = FlakyClient([ResourceExhausted("quota")] * 5)
+
+    with pytest.raises(ResourceExhausted):
+        scheduler.call(client)
+    assert client.calls == 3
+    assert len(sleeps) == 2
+    assert scheduler.stats == {"calls": 3, "retries": 2, "failed": 1}
+
+
+def test_non_retryable_error_raises_immediately():
+    clock = FakeClock()
+    scheduler, sleeps = make_scheduler(clock)
+    client = FlakyClient([ValueError("bad request")])
+
+    with pytest.raises(ValueError):
+        scheduler.call(client)
+    assert client.calls == 1
+    assert sleeps == []
+
+
+def test_backoff_is_capped():
+    scheduler, _ = make_scheduler(FakeClock(), base_delay=2.0, max_delay=10.0)
+    assert all(5.0 <= scheduler.backoff(attempt) <= 10.0 for attempt in range(3, 10))
+
+
+def test_error_classification():
+    assert is_throttle(ResourceExhausted("x"))
+    assert is_throttle(Exception("429 Too Many Requests"))
+    assert not is_throttle(Exception("503"))
+    assert is_retryable(Exception("502 Bad Gateway"))
+    assert not is_retryable(ValueError("invalid argument"))
+
+
+# ---------- LimitedModel ----------
+
+class FakeUsage:
+    prompt_token_count = 120
+    candidates_token_count = 30
+    total_token_count = 150
+
+
+class FakeResponse:
+    usage_metadata = FakeUsage()
+    text = "{}"
+
+
+class FakeModel:
+    model_name = "fake"
+
+    def __init__(self, errors=()):
+        self.client = FlakyClient(errors, FakeResponse())
+
+    def generate_content(self, prompt, **kwargs):
+        return self.client(prompt, **kwargs)
+
+
+def test_limited_model_reports_usage_and_passes_attributes():
+    clock = FakeClock()
+    scheduler, _ = make_scheduler(clock)
+    observed = []
+    model = LimitedModel(FakeModel([ResourceExhausted("quota")]), scheduler,
+                         observer=lambda *args: observed.append(args))
+
+    response = model.generate_content("x" * 40)
+
+    assert response.text == "{}"
+    assert model.model_name == "fake"
+    assert len(observed) == 1
+    assert observed[0][1:] == (120, 30)
+    assert scheduler.stats["retries"] == 1
@@ -0,0 +1,149 @@
+import numpy as np
+
+from fakes import InMemorySupabase
+from token_estimate import estimate_tokens
+from vector_index import HashingEmbedder, VectorIndex, build_context, refresh_from_db
+
+DIM = 256
+
+
+def make_row(i, title, category="₿ Crypto", created_at=None):
+    return {
+        "id": i,
+        "title": title,
+        "url": f"https://example.com/{i}",
+        "content_summary": f"summary {title}",
+        "category": category,
+        "created_at": created_at or f"2024-01-01T00:00:{i:02d}+00:00",
+    }
+
+
+def build_index(rows, embedder):
+    index = VectorIndex(dim=DIM)
+    index.add(rows, embedder([row["title"] for row in rows]))
+    return index
+
+
+def test_hashing_embedder_is_deterministic():
+    embedder = HashingEmbedder(dim=DIM)
+    first = embedder(["bitcoin etf approval"])
+    assert first == embedder(["bitcoin etf approval"])
+    assert len(first[0]) == DIM
+    assert first != embedder(["fed rates inflation"])
+
+
+def test_search_returns_top_k_by_similarity():
+    embedder = HashingEmbedder(dim=DIM)
+    rows = [
+        make_row(1, "bitcoin etf approval"),
+        make_row(2, "bitcoin etf"),
+        make_row(3, "fed rates inflation"),
+        make_row(4, "nvidia chip demand"),
+    ]
+    index = build_index(rows, embedder)
+
+    results = index.search(embedder(["bitcoin etf approval"])[0], k=2)
+
+    assert [row["id"] for _, row in results] == [1, 2]
+    assert results[0][0] >= results[1][0]
+    assert abs(results[0][0] - 1.0) < 1e-5
+
+
+def test_search_k_larger_than_index():
+    embedder = HashingEmbedder(dim=DIM)
+    index = build_index([make_row(1, "bitcoin"), make_row(2, "oil")], embedder)
+    assert len(index.search(embedder(["bitcoin"])[0], k=10)) == 2
+
+
+def test_add_skips_duplicate_ids_zero_and_bad_vectors():
+    index = VectorIndex(dim=DIM)
+    vec = np.ones(DIM).tolist()
+
+    assert index.add([make_row(1, "a")], [vec]) == 1
+    assert index.add([make_row(1, "a again")], [vec]) == 0
+    assert index.add([make_row(2, "zero")], [[0.0] * DIM]) == 0
+    assert index.add([make_row(3, "short")], [[1.0] * (DIM - 1)]) == 0
+    assert index.add([make_row(4, "missing")], [None]) == 0
+
+    assert len(index) == 1
+    assert index.matrix.shape == (1, DIM)
+    assert index.ids == {1}
+
+
+def test_search_empty_index():
+    assert VectorIndex(dim=DIM).search(np.ones(DIM)) == []
+
+
+def test_category_mask_excludes_other_categories():
+    embedder = HashingEmbedder(dim=DIM)
+    rows = [
+        make_row(1, "bitcoin etf approval", category="₿ Crypto"),
+        make_row(2, "bitcoin etf approval news", category="💰 Macro & Market"),
+        make_row(3, "fed rates", category="💰 Macro & Market"),
+    ]
+    index = build_index(rows, embedder)
+
+    results = index.search(embedder(["bitcoin etf approval"])[0], k=3, categories=["💰 Macro & Market"])
+
+    assert [row["id"] for _, row in results] == [2, 3]
+    assert all(np.isfinite(score) for score, _ in results)
+
+
+def test_category_mask_with_no_match_returns_nothing():
+    embedder = HashingEmbedder(dim=DIM)
+    index = build_index([make_row(1, "bitcoin")], embedder)
+    assert index.search(embedder(["bitcoin"])[0], categories=["🤖 AI & Tech"]) == []
+
+
+def test_build_context_stops_at_budget():
+    rows = [make_row(i, f"headline number {i}") for i in range(10)]
+    line_cost = estimate_tokens(f"- {rows[0]['created_at']}: {rows[0]['title']} "
+                                f"(Summary: {rows[0]['content_summary']})\n")
+
+    text, used = build_context(rows, token_budget=line_cost * 3)
+
+    assert text.count("\n") == 3
+    assert used <= line_cost * 3
+    assert "headline number 2" in text and "headline number 3" not in text
+
+
+def test_build_context_always_keeps_first_row():
+    rows = [make_row(1, "a very long headline " * 50)]
+    text, used = build_context(rows, token_budget=1)
+    assert text.count("\n") == 1
+    assert used > 1
+
+
+def seed_db(client, rows, embedder):
+    for row in rows:
+        stored = dict(row, embedding=str(embedder([row["title"]])[0]) if row["title"] else None)
+        client.tables.setdefault("news", []).append(stored)
+
+
+def test_refresh_from_db_loads_incrementally():
+    embedder = HashingEmbedder(dim=DIM)
+    client = InMemorySupabase()
+    seed_db(client, [make_row(1, "bitcoin"), make_row(2, "oil"), make_row(3, None)], embedder)
+    now = [1000.0]
+    index = VectorIndex(dim=DIM)
+
+    # 没有 embedding 的行不加载，embedding 以 pgvector 字符串的形式返回
+    assert refresh_from_db(index, client, min_interval=60, clock=lambda: now[0]) == 2
+    assert index.latest_created_at == "2024-01-01T00:00:02+00:00"
+    assert all("embedding" not in row for row in index.rows)
+
+    # 间隔内不查库
+    seed_db(client, [make_row(4, "nvidia chip")], embedder)
+    calls = client.total_calls()
+    assert refresh_from_db(index, client, min_interval=60, clock=lambda: now[0] + 10) == 0
+    assert client.total_calls() == calls
+
+    # 之后只拉比最新一条更新的行
+    now[0] += 61
+    assert refresh_from_db(index, client, min_interval=60, clock=lambda: now[0]) == 1
+    assert sorted(index.ids) == [1, 2, 4]
+    assert index.search(embedder(["nvidia chip"])[0], k=1)[0][1]["id"] == 4
+
+    now[0] += 61
+    assert refresh_from_db(index, client, min_interval=60, clock=lambda: now[0]) == 0
+    assert len(index) == 3
@@ -0,0 +1,13 @@
+import re
+
+# ================= token 估算 =================
+# 限流 (rate_limiter)、上下文预算 (vector_index) 和 embedding 调用共用；不调 API，只求量级差不多。
+
+_CJK_RE = re.compile(r"[\u4e00-\u9fff]")
+
+
+def estimate_tokens(text):
+    """粗略估计 token 数：中文按字算，其余按 4 个字符一个 token"""
+    text = text or ""
+    cjk = len(_CJK_RE.findall(text))
+    return cjk + (len(text) - cjk) // 4 + 1
@@ -0,0 +1,88 @@
+import re
+import json
+from batch_summarizer import clean_json_text
+
+# ================= 批量翻译 =================
+# news_cloud 入库时一次调用生成整批摘要的中英文版本，存进 summary_cn / summary_en / key_stats_cn / key_stats_en；
+# app.py 只对没有这些列的老数据按需批量翻译。
+
+LANG_NAMES = {"CN": "Chinese (Simplified)", "EN": "English"}
+
+
+def has_chinese(text):
+    return bool(re.search(r'[\u4e00-\u9fff]', text or ""))
+
+
+def needs_translation(text, target_lang_code):
+    """目标是中文但文本没有中文，或目标是英文但文本有中文"""
+    if not text:
+        return False
+    if target_lang_code == "CN":
+        return not has_chinese(text)
+    return has_chinese(text)
+
+
+def _parse_array(text, expected):
+    items = json.loads(clean_json_text(text))
+    if isinstance(items, dict):
+        items = items.get("items", [])
+    if not isinstance(items, list) or len(items) != expected:
+        raise ValueError(f"期望 {expected} 条，实际返回 {len(items) if isinstance(items, list) else '非数组'}")
+    return items
+
+
+def translate_texts(model, texts, target_lang_code):
+    """一次调用翻译多段文本，返回与输入对齐的列表；失败时原样返回"""
+    if not texts:
+        return []
+    prompt = (
+        f"Translate each string in the following JSON array to {LANG_NAMES[target_lang_code]}. "
+        "Keep markdown and {{...}} markers unchanged. "
+        "Return only a JSON array of translated strings in the same order.\n\n"
+        + json.dumps(list(texts), ensure_ascii=False)
+    )
+    try:
+        response = model.generate_content(prompt)
+        items = _parse_array(response.text, len(texts))
+        return [str(item).strip() if item else original for item, original in zip(items, texts)]
+    except Exception as e:
+        print(f"⚠️ 批量翻译失败: {e}")
+        return list(texts)
+
+
+def translate_summaries(model, summaries):
+    """
+    summaries: [{"summary", "key_stats"}, ...] (AI 摘要结果)
+    一次调用返回与输入对齐的 [{"summary_cn", "summary_en", "key_stats_cn", "key_stats_en"}, ...]，
+    失败的位置为 None (入库时这些列留空，前端回退到按需翻译)。
+    """
+    if not summaries:
+        return []
+    payload = [
+        {"id": i, "summary": s["summary"], "key_stats": s["key_stats"]}
+        for i, s in enumerate(summaries)
+    ]
+    prompt = (
+        "For each item in the following JSON array, produce Chinese (Simplified) and English versions "
+        "of both fields. Keep {{...}} markers around the same numbers and keep line breaks in key_stats. "
+        "Return only a JSON array in the same order, each element shaped like "
+        '{"id": ..., "summary_cn": "...", "summary_en": "...", "key_stats_cn": "...", "key_stats_en": "..."}.\n\n'
+        + json.dumps(payload, ensure_ascii=False)
+    )
+    try:
+        response = model.generate_content(prompt)
+        items = _parse_array(response.text, len(summaries))
+    except Exception as e:
+        print(f"⚠️ 批量翻译失败: {e}")
+        return [None] * len(summaries)
+
+    fields = ("summary_cn", "summary_en", "key_stats_cn", "key_stats_en")
+    by_id = {str(item.get("id")): item for item in items if isinstance(item, dict)}
+    results = []
+    for i in range(len(summaries)):
+        item = by_id.get(str(i))
+        if item and all(isinstance(item.get(f), str) for f in fields):
+            results.append({f: item[f].strip() for f in fields})
+        else:
+            results.append(None)
+    return results
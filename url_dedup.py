@@ -0,0 +1,140 @@
+import os
+import time
+import sqlite3
+import threading
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+# ================= URL 去重 =================
+# 先把所有频道的候选链接归一化，再用少量 in_ 批量查询 Supabase，
+# 并在本地 SQLite 里记住已经处理过的链接，下次运行直接跳过。
+
+# 常见的追踪参数，去掉之后同一篇文章的不同链接就能对上
+TRACKING_PARAM_PREFIXES = ("utm_",)
+TRACKING_PARAMS = {
+    "fbclid", "gclid", "dclid", "msclkid", "mc_cid", "mc_eid",
+    "cmpid", "ref", "ref_src", "src", "mod", "taid", "__source", "guccounter",
+}
+
+
+def normalize_url(url):
+    """小写协议和域名，去掉追踪参数、片段和末尾斜杠，剩余参数排序"""
+    if not url:
+        return url
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    netloc = parts.netloc.lower()
+    if (scheme == "http" and netloc.endswith(":80")) or (scheme == "https" and netloc.endswith(":443")):
+        netloc = netloc.rsplit(":", 1)[0]
+
+    query = [
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if k.lower() not in TRACKING_PARAMS and not k.lower().startswith(TRACKING_PARAM_PREFIXES)
+    ]
+    query.sort()
+
+    path = parts.path or "/"
+    if len(path) > 1:
+        path = path.rstrip("/")
+    return urlunsplit((scheme, netloc, path, urlencode(query), ""))
+
+
+class SeenUrlStore:
+    """本地已处理链接索引 (SQLite)，跨次运行保留"""
+
+    def __init__(self, path):
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        # 入库回调会在线程池里调用，连接共享所以要加锁
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS seen (url TEXT PRIMARY KEY, seen_at REAL)")
+        self.conn.commit()
+
+    def contains_many(self, urls):
+        found = set()
+        urls = list(urls)
+        for i in range(0, len(urls), 500):
+            chunk = urls[i:i + 500]
+            marks = ",".join("?" * len(chunk))
+            with self.lock:
+                rows = self.conn.execute(f"SELECT url FROM seen WHERE url IN ({marks})", chunk).fetchall()
+            found.update(row[0] for row in rows)
+        return found
+
+    def add_many(self, urls):
+        now = time.time()
+        with self.lock:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO seen (url, seen_at) VALUES (?, ?)",
+                [(u, now) for u in urls],
+            )
+            self.conn.commit()
+
+    def add(self, url):
+        self.add_many([url])
+
+    def close(self):
+        self.conn.close()
+
+
+def query_existing_urls(client, urls, chunk_size=50, retries=2, table="news"):
+    """
+    批量查询数据库里已有的链接。查询失败会重试，仍失败则抛出异常，
+    由调用方决定跳过（而不是像以前那样当作不存在，白白重复下载和调用 AI）。
+    """
+    existing = set()
+    urls = list(urls)
+    for i in range(0, len(urls), chunk_size):
+        chunk = urls[i:i + chunk_size]
+        for attempt in range(retries + 1):
+            try:
+                response = client.table(table).select("url").in_("url", chunk).execute()
+                existing.update(row["url"] for row in response.data)
+                break
+            except Exception:
+                if attempt == retries:
+                    raise
+                time.sleep(2 ** attempt)
+    return existing
+
+
+def filter_new_entries(client, candidates, store=None, chunk_size=50, on_known=None):
+    """
+    candidates: [(feed_config, url), ...]，url 传 RSS 里的原始链接 (老数据存的是原始链接，要一起查)
+    返回 [(feed_config, normalized_url), ...]，已去掉本批重复、本地已见过、数据库已存在的链接。
+    on_known(normalized_urls): 确认已经处理过 (本地见过或数据库已有) 的链接；查询失败时不调用
+    """
+    picked = {}
+    raw_by_norm = {}
+    for config, url in candidates:
+        norm = normalize_url(url)
+        if norm not in picked:
+            picked[norm] = config
+            raw_by_norm[norm] = set()
+        raw_by_norm[norm].add(url)
+
+    local_seen = store.contains_many(picked) if store else set()
+    pending = [norm for norm in picked if norm not in local_seen]
+
+    # 老数据存的是原始链接，所以原始和归一化的一起查
+    lookup = set(pending)
+    for norm in pending:
+        lookup.update(raw_by_norm[norm])
+    try:
+        existing = query_existing_urls(client, sorted(lookup), chunk_size=chunk_size)
+    except Exception as e:
+        print(f"⚠️ 去重查询失败，本轮跳过 {len(pending)} 条候选: {e}")
+        return []
+
+    in_db = [norm for norm in pending if norm in existing or raw_by_norm[norm] & existing]
+    if store and in_db:
+        store.add_many(in_db)
+    known = [norm for norm in picked if norm in local_seen] + in_db
+    if on_known and known:
+        on_known(known)
+
+    skipped = len(candidates) - len(pending) + len(in_db)
+    print(f"🔎 去重: 候选 {len(candidates)} 条，跳过 {skipped} 条，待处理 {len(pending) - len(in_db)} 条")
+    in_db = set(in_db)
+    return [(picked[norm], norm) for norm in pending if norm not in in_db]
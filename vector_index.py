@@ -0,0 +1,153 @@
+import re
+import json
+import time
+import hashlib
+import threading
+import numpy as np
+from token_estimate import estimate_tokens
+
+# ================= 向量检索 =================
+# news_cloud 入库时给每条新闻算 embedding；app.py 把它们装进内存里的 NumPy 矩阵，
+# 聊天时按问题检索 top-k 相关新闻，并按 token 预算拼上下文，而不是固定塞最近 10 条。
+
+EMBEDDING_MODEL = "models/text-embedding-004"
+EMBEDDING_DIM = 768
+
+
+def embedding_text(title, summary, key_stats="", tags=None):
+    """用于算 embedding 的文本：标题 + 摘要 + 关键数据 + 标签"""
+    parts = [title or "", summary or "", key_stats or ""]
+    if tags:
+        parts.append(" ".join(f"#{tag}" for tag in tags))
+    return "\n".join(p for p in parts if p)
+
+
+class GeminiEmbedder:
+
+    def __init__(self, genai_module, model_name=EMBEDDING_MODEL):
+        self.genai = genai_module
+        self.model_name = model_name
+
+    def __call__(self, texts, task_type="retrieval_document"):
+        if not texts:
+            return []
+        result = self.genai.embed_content(model=self.model_name, content=list(texts), task_type=task_type)
+        return result["embedding"]
+
+
+class HashingEmbedder:
+    """确定性的本地 embedder (词袋特征哈希)，不调用任何 API，用于测试和离线基准"""
+
+    def __init__(self, dim=EMBEDDING_DIM):
+        self.dim = dim
+
+    def __call__(self, texts, task_type="retrieval_document"):
+        vectors = []
+        for text in texts:
+            vec = np.zeros(self.dim, dtype=np.float32)
+            for token in re.findall(r"[a-z0-9]+|[\u4e00-\u9fff]", (text or "").lower()):
+                h = int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "big")
+                vec[h % self.dim] += 1.0 if (h >> 63) else -1.0
+            vectors.append(vec.tolist())
+        return vectors
+
+
+def parse_vector(value):
+    """Supabase 返回的 pgvector 是 "[0.1,0.2,...]" 字符串"""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = json.loads(value)
+    return np.asarray(value, dtype=np.float32)
+
+
+class VectorIndex:
+    """暴力余弦检索，几千条新闻在毫秒级"""
+
+    def __init__(self, dim=EMBEDDING_DIM):
+        self.dim = dim
+        self.matrix = np.zeros((0, dim), dtype=np.float32)
+        self.rows = []
+        self.ids = set()
+        self.lock = threading.Lock()
+        self.last_search_ms = 0.0
+        self.latest_created_at = None
+        self.refreshed_at = 0.0
+
+    def __len__(self):
+        return len(self.rows)
+
+    def add(self, rows, vectors):
+        with self.lock:
+            fresh_rows, fresh_vecs = [], []
+            for row, vec in zip(rows, vectors):
+                if vec is None or row["id"] in self.ids or len(vec) != self.dim:
+                    continue
+                norm = np.linalg.norm(vec)
+                if not norm:
+                    continue
+                fresh_rows.append(row)
+                fresh_vecs.append(np.asarray(vec, dtype=np.float32) / norm)
+                self.ids.add(row["id"])
+            if not fresh_rows:
+                return 0
+            # 换成新矩阵而不是原地修改，正在检索的线程拿到的旧引用不受影响
+            self.matrix = np.vstack([self.matrix, np.stack(fresh_vecs)])
+            self.rows = self.rows + fresh_rows
+        return len(fresh_rows)
+
+    def search(self, query_vector, k=8, categories=None):
+        """返回 [(相似度, row), ...]，按相似度从高到低"""
+        started = time.perf_counter()
+        with self.lock:
+            matrix, rows = self.matrix, self.rows
+        if not rows:
+            self.last_search_ms = (time.perf_counter() - started) * 1000
+            return []
+        query = np.asarray(query_vector, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1.0)
+        scores = matrix @ query
+        if categories:
+            mask = np.array([row.get("category") in categories for row in rows])
+            scores = np.where(mask, scores, -np.inf)
+        k = min(k, len(rows))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        results = [(float(scores[i]), rows[i]) for i in top if np.isfinite(scores[i])]
+        self.last_search_ms = (time.perf_counter() - started) * 1000
+        return results
+
+
+INDEX_COLUMNS = "id, title, url, content_summary, category, created_at, embedding"
+
+
+def refresh_from_db(index, client, limit=2000, min_interval=60, clock=time.time):
+    """增量加载：只拉比索引里最新一条更新、且已经有 embedding 的行"""
+    now = clock()
+    if now - index.refreshed_at < min_interval:
+        return 0
+    index.refreshed_at = now
+    query = client.table("news").select(INDEX_COLUMNS).not_.is_("embedding", "null")
+    if index.latest_created_at:
+        query = query.gt("created_at", index.latest_created_at)
+    rows = query.order("created_at", desc=True).limit(limit).execute().data
+    if not rows:
+        return 0
+    vectors = [parse_vector(row.pop("embedding")) for row in rows]
+    added = index.add(rows, vectors)
+    index.latest_created_at = max(row["created_at"] for row in rows)
+    return added
+
+
+def build_context(rows, token_budget=3000):
+    """按顺序拼接新闻，超过 token 预算就停"""
+    lines = []
+    used = 0
+    for n in rows:
+        line = f"- {n.get('created_at')}: {n.get('title')} (Summary: {n.get('content_summary')})\n"
+        cost = estimate_tokens(line)
+        if used + cost > token_budget and lines:
+            break
+        lines.append(line)
+        used += cost
+    return "".join(lines), used